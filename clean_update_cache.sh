@@ -1,5 +1,7 @@
 #!/bin/bash
 cd cache;
-git clean -f .;
+# Keep the SQLite caches (cache.db, generations.db and their WAL files)
+git clean -f -e '*.db' -e '*.db-*' .;
 cd ..;
 git submodule update;
+python migrate_cache.py --cache_path cache;
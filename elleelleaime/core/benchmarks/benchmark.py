@@ -8,9 +8,12 @@ class Benchmark(ABC):
 
 
 import pathlib
+import subprocess
+import threading
 
 from typing import Dict, List, Optional
 from elleelleaime.core.benchmarks.bug import Bug
+from elleelleaime.core.caching.index import BenchmarkIndex
 
 
 class Benchmark(ABC):
@@ -18,10 +21,12 @@ class Benchmark(ABC):
     The abstract class for representing a benchmark.
     """
 
-    def __init__(self, identifier: str, path: pathlib.Path) -> None:
+    def __init__(self, identifier: str, path: pathlib.Path, lazy: bool = False) -> None:
         self.identifier: str = identifier
         self.path: pathlib.Path = path.absolute()
         self.bugs: Dict[str, Bug] = dict()
+        self.lazy: bool = lazy
+        self.__bugs_lock: threading.Lock = threading.Lock()
 
     def get_identifier(self) -> str:
         return self.identifier
@@ -32,11 +37,45 @@ class Benchmark(ABC):
     def get_bin(self, options: str = "") -> Optional[str]:
         return None
 
+    def get_version(self) -> Optional[str]:
+        """
+        Returns an identifier of the benchmark version (the commit of its repository),
+        or None if it cannot be determined.
+        """
+        run = subprocess.run(
+            f"git -C {self.path} rev-parse HEAD",
+            shell=True,
+            capture_output=True,
+            check=False,
+        )
+        if run.returncode != 0:
+            return None
+        return run.stdout.decode("utf-8").strip()
+
+    def get_index(self) -> BenchmarkIndex:
+        """
+        Returns the persistent metadata index of the benchmark, keyed by its version.
+        """
+        return BenchmarkIndex(
+            pathlib.Path(self.path.parent, ".index", f"{self.identifier}.json"),
+            self.get_version(),
+        )
+
     def get_bugs(self) -> List[Bug]:
         return sorted(list(self.bugs.values()))
 
     def get_bug(self, identifier) -> Optional[Bug]:
-        return self.bugs[identifier]
+        """
+        Returns the bug with the given identifier. In lazy mode, bugs that have not been
+        loaded yet are materialized on demand, without initializing the whole benchmark.
+        """
+        if self.lazy and identifier not in self.bugs:
+            with self.__bugs_lock:
+                if identifier not in self.bugs:
+                    bug = self.load_bug(identifier)
+                    if bug is not None:
+                        self.add_bug(bug)
+        return self.bugs.get(identifier)
 
     def add_bug(self, bug: Bug) -> None:
         assert bug.get_identifier() not in self.bugs
@@ -45,3 +84,11 @@ class Benchmark(ABC):
     @abstractmethod
     def initialize(self) -> None:
         pass
+
+    @abstractmethod
+    def load_bug(self, identifier: str) -> Optional[Bug]:
+        """
+        Loads a single bug (its diff, failing tests and metadata) of the benchmark.
+        Returns None if the bug does not exist.
+        """
+        pass
@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional
 from io import StringIO
 from elleelleaime.core.benchmarks.benchmark import Benchmark
 from elleelleaime.core.benchmarks.defects4j.defects4jbug import Defects4JBug
@@ -16,8 +16,12 @@ class Defects4J(Benchmark):
     The class for representing the Defects4J benchmark.
     """
 
-    def __init__(self, path: Path = Path("benchmarks/defects4j").absolute()) -> None:
-        super().__init__("defects4j", path)
+    def __init__(
+        self, path: Path = Path("benchmarks/defects4j").absolute(), lazy: bool = False
+    ) -> None:
+        super().__init__("defects4j", path, lazy)
+        self.__entries: Optional[Dict[str, dict]] = None
+        self.__failing_tests: Dict[str, pd.DataFrame] = {}
 
     def get_bin(self, options: str = "") -> Optional[str]:
         return f'{Path(self.path, "framework/bin/defects4j")}'
@@ -25,9 +29,61 @@ class Defects4J(Benchmark):
     def initialize(self) -> None:
         """
         Initializes the Defects4J benchmark object by collecting the list of all projects and bugs.
+        The collected metadata is stored in a persistent index keyed by the Defects4J commit,
+        so that the framework is only queried when the index is missing or outdated.
         """
         logging.info("Initializing Defects4J benchmark...")
 
+        index = self.get_index()
+        entries = index.load()
+        if entries is None:
+            entries = self.__collect_entries()
+            index.save(entries)
+        else:
+            logging.info("Loaded %3d bugs from index" % len(entries))
+
+        for entry in entries.values():
+            self.add_bug(self.__make_bug(entry))
+
+    def load_bug(self, identifier: str) -> Optional[Defects4JBug]:
+        """
+        Loads a single Defects4J bug, from the index if it is up-to-date,
+        otherwise by only querying the framework for the bug's project.
+        """
+        if self.__entries is None:
+            self.__entries = self.get_index().load() or {}
+        if identifier in self.__entries:
+            return self.__make_bug(self.__entries[identifier])
+
+        # Fallback to querying the framework for this bug only
+        pid, _, bid = identifier.rpartition("-")
+        if (
+            not bid.isdigit()
+            or not Path(
+                self.path, f"framework/projects/{pid}/patches/{bid}.src.patch"
+            ).exists()
+        ):
+            return None
+        if pid not in self.__failing_tests:
+            self.__failing_tests[pid] = self.__query_failing_tests(pid)
+        df = self.__failing_tests[pid]
+        if int(bid) not in df["bid"].values:
+            return None
+        return self.__make_bug(self.__collect_entry(pid, int(bid), df))
+
+    def __make_bug(self, entry: dict) -> Defects4JBug:
+        return Defects4JBug(
+            self,
+            entry["pid"],
+            entry["bid"],
+            entry["ground_truth"],
+            entry["failing_tests"],
+        )
+
+    def __collect_entries(self) -> Dict[str, dict]:
+        """
+        Queries the Defects4J framework for the metadata of all bugs.
+        """
         # Get all project ids
         run = subprocess.run(
             f"{self.get_bin()} pids",
@@ -50,39 +106,57 @@ class Defects4J(Benchmark):
             bugs[pid] = {int(bid.decode("utf-8")) for bid in run.stdout.split()}
             logging.info("Found %3d bugs for project %s" % (len(bugs[pid]), pid))
 
-        # Initialize dataset
+        # Collect the metadata of each bug
+        entries = {}
         for pid in pids:
-            # Extract failing test and trigger cause
-            run = subprocess.run(
-                f"{self.get_bin()} query -p {pid} -q 'tests.trigger,tests.trigger.cause'",
-                shell=True,
-                capture_output=True,
-                check=True,
-            )
-            data = run.stdout.decode("utf-8")
-            df = pd.read_csv(StringIO(data), sep=",", names=["bid", "tests", "errors"])
-
+            df = self.__query_failing_tests(pid)
             for bid in bugs[pid]:
-                # Extract ground truth diff
-                diff_path = f"benchmarks/defects4j/framework/projects/{pid}/patches/{bid}.src.patch"
-                with open(diff_path, "r", encoding="ISO-8859-1") as diff_file:
-                    diff = diff_file.read()
-
-                # Extract failing test cases and trigger causes
-                failing_test_cases = df[df["bid"] == bid]["tests"].values[0]
-                trigger_cause = df[df["bid"] == bid]["errors"].values[0]
-
-                failing_tests = {}
-                for failing_test_case in failing_test_cases.split(";"):
-                    cause = trigger_cause.split(f"{failing_test_case} --> ")[1]
-                    # The trigger cause list elements are separated by ";" but sometimes this char is also included in the element itself and is not espaced
-                    # To avoid this we check if there are more any remaining elements and remove them from the string.
-                    if " --> " in cause:
-                        while " --> " in cause:
-                            cause = cause.split(" --> ")[1]
-                        for test in failing_test_case.split(";"):
-                            if test in cause:
-                                cause = cause.replace(test, "")
-                    failing_tests[failing_test_case] = cause.strip()
-
-                self.add_bug(Defects4JBug(self, pid, bid, diff, failing_tests))
+                entries[f"{pid}-{bid}"] = self.__collect_entry(pid, bid, df)
+
+        return entries
+
+    def __query_failing_tests(self, pid: str) -> pd.DataFrame:
+        """
+        Extracts the failing tests and trigger causes of all bugs of a project.
+        """
+        run = subprocess.run(
+            f"{self.get_bin()} query -p {pid} -q 'tests.trigger,tests.trigger.cause'",
+            shell=True,
+            capture_output=True,
+            check=True,
+        )
+        data = run.stdout.decode("utf-8")
+        return pd.read_csv(StringIO(data), sep=",", names=["bid", "tests", "errors"])
+
+    def __collect_entry(self, pid: str, bid: int, df: pd.DataFrame) -> dict:
+        """
+        Collects the ground truth diff and the failing tests of a single bug.
+        """
+        # Extract ground truth diff
+        diff_path = Path(self.path, f"framework/projects/{pid}/patches/{bid}.src.patch")
+        with open(diff_path, "r", encoding="ISO-8859-1") as diff_file:
+            diff = diff_file.read()
+
+        # Extract failing test cases and trigger causes
+        failing_test_cases = df[df["bid"] == bid]["tests"].values[0]
+        trigger_cause = df[df["bid"] == bid]["errors"].values[0]
+
+        failing_tests = {}
+        for failing_test_case in failing_test_cases.split(";"):
+            cause = trigger_cause.split(f"{failing_test_case} --> ")[1]
+            # The trigger cause list elements are separated by ";" but sometimes this char is also included in the element itself and is not espaced
+            # To avoid this we check if there are more any remaining elements and remove them from the string.
+            if " --> " in cause:
+                while " --> " in cause:
+                    cause = cause.split(" --> ")[1]
+                for test in failing_test_case.split(";"):
+                    if test in cause:
+                        cause = cause.replace(test, "")
+            failing_tests[failing_test_case] = cause.strip()
+
+        return {
+            "pid": pid,
+            "bid": bid,
+            "ground_truth": diff,
+            "failing_tests": failing_tests,
+        }
@@ -3,6 +3,8 @@ import shutil
 import re
 import os
 
+from typing import Optional
+
 from elleelleaime.core.benchmarks.benchmark import Benchmark
 from elleelleaime.core.benchmarks.bug import RichBug
 from elleelleaime.core.benchmarks.test_result import TestResult
@@ -24,6 +26,7 @@ class Defects4JBug(RichBug):
     ) -> None:
         self.pid = pid
         self.bid = bid
+        self.__src_test_dir: Optional[str] = None
         super().__init__(
             benchmark,
             f"{pid}-{bid}",
@@ -86,11 +89,14 @@ class Defects4JBug(RichBug):
         return TestResult(run.returncode == 0 and m != None and int(m.group(1)) == 0)
 
     def get_src_test_dir(self, path: str) -> str:
-        run = subprocess.run(
-            f"cd {path} && {self.benchmark.get_bin()} export -p dir.src.tests",
-            shell=True,
-            capture_output=True,
-            check=True,
-        )
+        # The test directory (relative to the checkout) does not change between checkouts of the bug
+        if self.__src_test_dir is None:
+            run = subprocess.run(
+                f"cd {path} && {self.benchmark.get_bin()} export -p dir.src.tests",
+                shell=True,
+                capture_output=True,
+                check=True,
+            )
+            self.__src_test_dir = run.stdout.decode("utf-8").strip()
 
-        return run.stdout.decode("utf-8").strip()
+        return self.__src_test_dir
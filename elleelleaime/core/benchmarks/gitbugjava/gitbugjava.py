@@ -2,7 +2,8 @@ from pathlib import Path
 from elleelleaime.core.benchmarks.benchmark import Benchmark
 from elleelleaime.core.benchmarks.gitbugjava.gitbugjavabug import GitBugJavaBug
 
-from typing import Optional
+from typing import Dict, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import subprocess
 import logging
@@ -16,8 +17,14 @@ class GitBugJava(Benchmark):
     The class for representing the GitBug-Java benchmark.
     """
 
-    def __init__(self, path: Path = Path("benchmarks/gitbug-java").absolute()) -> None:
-        super().__init__("gitbugjava", path)
+    # Number of concurrent gitbug-java processes used when (re)building the index
+    N_WORKERS: int = min(16, os.cpu_count() or 1)
+
+    def __init__(
+        self, path: Path = Path("benchmarks/gitbug-java").absolute(), lazy: bool = False
+    ) -> None:
+        super().__init__("gitbugjava", path, lazy)
+        self.__entries: Optional[Dict[str, dict]] = None
         self.bin = f"cd {self.path} && poetry run {path.joinpath('gitbug-java')}"
 
     def get_bin(self, options: str = "") -> Optional[str]:
@@ -44,50 +51,103 @@ class GitBugJava(Benchmark):
     def initialize(self) -> None:
         """
         Initializes the GitBug-Java benchmark object by collecting the list of all projects and bugs.
+        The parsed bug information is stored in a persistent index keyed by the GitBug-Java commit,
+        so that no gitbug-java command needs to be run when the index is up-to-date.
         """
         logging.info("Initializing GitBug-Java benchmark...")
 
+        index = self.get_index()
+        entries = index.load()
+        if entries is None:
+            entries = self.__collect_entries()
+            index.save(entries)
+        else:
+            logging.info("Loaded %3d bugs from index" % len(entries))
+
+        for bid, entry in entries.items():
+            self.add_bug(
+                GitBugJavaBug(self, bid, entry["ground_truth"], entry["failing_tests"])
+            )
+
+    def load_bug(self, identifier: str) -> Optional[GitBugJavaBug]:
+        """
+        Loads a single GitBug-Java bug, from the index if it is up-to-date,
+        otherwise by running the info command for it only.
+        """
+        if self.__entries is None:
+            self.__entries = self.get_index().load() or {}
+        if identifier in self.__entries:
+            entry = self.__entries[identifier]
+        else:
+            entry = self.__collect_entry(identifier, check=False)
+            if entry is None:
+                return None
+        return GitBugJavaBug(
+            self, identifier, entry["ground_truth"], entry["failing_tests"]
+        )
+
+    def __collect_entries(self) -> Dict[str, dict]:
+        """
+        Runs the info command for all bugs, in parallel, and parses its output.
+        """
         # Get all bug ids
         run = self.run_command("bids")
         bids = {bid.decode("utf-8") for bid in run.stdout.split()}
         logging.info("Found %3d bugs" % len(bids))
 
-        for bid in tqdm.tqdm(bids, "Loading GitBug-Java"):
-            # Run info command
-            run = self.run_command(
-                f"info {bid}",
-                check=True,
+        # Each info command pays the poetry and interpreter start-up cost, so we run them concurrently
+        entries = {}
+        with ThreadPoolExecutor(max_workers=self.N_WORKERS) as executor:
+            futures = {executor.submit(self.__collect_entry, bid): bid for bid in bids}
+            for future in tqdm.tqdm(
+                as_completed(futures), "Loading GitBug-Java", total=len(futures)
+            ):
+                entries[futures[future]] = future.result()
+
+        return entries
+
+    def __collect_entry(self, bid: str, check: bool = True) -> Optional[dict]:
+        """
+        Runs the info command for a single bug and parses its output.
+        """
+        run = self.run_command(f"info {bid}", check=check)
+        if run.returncode != 0:
+            return None
+        diff, failing_tests = self.__parse_info(run.stdout.decode("utf-8"))
+        return {"ground_truth": diff, "failing_tests": failing_tests}
+
+    def __parse_info(self, stdout: str) -> Tuple[str, Dict[str, str]]:
+        """
+        Parses the output of the info command into the ground truth diff and the failing tests.
+        """
+        # Get diff (after "### Bug Patch", between triple ticks)
+        diff = stdout.split("### Bug Patch")[1].split("```diff")[1].split("```")[0]
+
+        # Get failing tests
+        # The info command prints out the failing tests in the following format
+        # - failing test
+        #   - type of failure
+        #   - failure message
+        failing_tests = {}
+        stdout = stdout.split("### Failing Tests")[1]
+        for test in re.split(r"(^-)", stdout):
+            # Split the three lines
+            info = test.strip().split("\n")
+
+            # Extract failing test class and method
+            failing_test_case = info[0].replace("-", "", 1).strip()
+            failing_test_case = (
+                failing_test_case.replace(":", "::")
+                .replace("#", "::")
+                .replace("()", "")
             )
-            stdout = run.stdout.decode("utf-8")
-
-            # Get diff (after "### Bug Patch", between triple ticks)
-            diff = stdout.split("### Bug Patch")[1].split("```diff")[1].split("```")[0]
-
-            # Get failing tests
-            # The info command prints out the failing tests in the following format
-            # - failing test
-            #   - type of failure
-            #   - failure message
-            failing_tests = {}
-            stdout = stdout.split("### Failing Tests")[1]
-            for test in re.split(r"(^-)", stdout):
-                # Split the three lines
-                info = test.strip().split("\n")
-
-                # Extract failing test class and method
-                failing_test_case = info[0].replace("-", "", 1).strip()
-                failing_test_case = (
-                    failing_test_case.replace(":", "::")
-                    .replace("#", "::")
-                    .replace("()", "")
-                )
-                # Remove value between '$' and '::' if it exists (happens for jitterted tests)
-                failing_test_case = re.sub(r"\$.*?::", "::", failing_test_case)
-
-                # Extract cause
-                cause = info[2].replace("-", "", 1).strip()
-                if cause == "None":
-                    cause = info[1].replace("-", "", 1).strip()
-                failing_tests[failing_test_case] = cause
-
-            self.add_bug(GitBugJavaBug(self, bid, diff, failing_tests))
+            # Remove value between '$' and '::' if it exists (happens for jitterted tests)
+            failing_test_case = re.sub(r"\$.*?::", "::", failing_test_case)
+
+            # Extract cause
+            cause = info[2].replace("-", "", 1).strip()
+            if cause == "None":
+                cause = info[1].replace("-", "", 1).strip()
+            failing_tests[failing_test_case] = cause
+
+        return diff, failing_tests
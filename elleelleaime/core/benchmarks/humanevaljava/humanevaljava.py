@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Optional
 from unidiff import PatchSet
 from elleelleaime.core.benchmarks.benchmark import Benchmark
 from elleelleaime.core.benchmarks.humanevaljava.humanevaljavabug import HumanEvalJavaBug
@@ -13,9 +14,11 @@ class HumanEvalJava(Benchmark):
     """
 
     def __init__(
-        self, path: Path = Path("benchmarks/human-eval-java").absolute()
+        self,
+        path: Path = Path("benchmarks/human-eval-java").absolute(),
+        lazy: bool = False,
     ) -> None:
-        super().__init__("humanevaljava", path)
+        super().__init__("humanevaljava", path, lazy)
 
     def initialize(self) -> None:
         """
@@ -30,51 +33,53 @@ class HumanEvalJava(Benchmark):
         with open(locfile_path, "r") as locfile:
             # Each line is a sample
             for line in locfile.readlines():
-                # Assert that the bug exists
-                bid = line.split()[0]
-                assert Path(
-                    self.get_path(),
-                    "src",
-                    "main",
-                    "java",
-                    "humaneval",
-                    "correct",
-                    f"{bid}.java",
-                ).exists()
-                assert Path(
-                    self.get_path(),
-                    "src",
-                    "main",
-                    "java",
-                    "humaneval",
-                    "buggy",
-                    f"{bid}.java",
-                ).exists()
+                self.add_bug(self.__load_sample(line.split()[0]))
 
-                # Compute the diff
-                # Note: we compute an inverted diff to be consistent with Defects4J
-                # Replace the package name temporarily to generate a clean diff
-                subprocess.run(
-                    f"sed -i 's/package humaneval\\.correct/package humaneval\\.buggy/g' {self.get_path()}/src/main/java/humaneval/correct/{bid}.java",
-                    shell=True,
-                    capture_output=True,
-                    check=True,
-                )
+    def load_bug(self, identifier: str) -> Optional[HumanEvalJavaBug]:
+        """
+        Loads a single HumanEvalJava bug.
+        """
+        if not (
+            self.__get_sample_path("correct", identifier).exists()
+            and self.__get_sample_path("buggy", identifier).exists()
+        ):
+            return None
+        return self.__load_sample(identifier)
 
-                run = subprocess.run(
-                    f"cd {self.get_path()} && diff --unified src/main/java/humaneval/correct/{bid}.java src/main/java/humaneval/buggy/{bid}.java",
-                    shell=True,
-                    capture_output=True,
-                )
-                diff = PatchSet(run.stdout.decode("utf-8"))
-                # Change the source file path to point to the buggy version
-                diff[0].source_file = f"src/main/java/humaneval/buggy/{bid}.java"
+    def __get_sample_path(self, version: str, bid: str) -> Path:
+        return Path(
+            self.get_path(), "src", "main", "java", "humaneval", version, f"{bid}.java"
+        )
 
-                run = subprocess.run(
-                    f"sed -i 's/package humaneval\\.buggy/package humaneval\\.correct/g' {self.get_path()}/src/main/java/humaneval/correct/{bid}.java",
-                    shell=True,
-                    capture_output=True,
-                    check=True,
-                )
+    def __load_sample(self, bid: str) -> HumanEvalJavaBug:
+        # Assert that the bug exists
+        assert self.__get_sample_path("correct", bid).exists()
+        assert self.__get_sample_path("buggy", bid).exists()
+
+        # Compute the diff
+        # Note: we compute an inverted diff to be consistent with Defects4J
+        # Replace the package name temporarily to generate a clean diff
+        subprocess.run(
+            f"sed -i 's/package humaneval\\.correct/package humaneval\\.buggy/g' {self.get_path()}/src/main/java/humaneval/correct/{bid}.java",
+            shell=True,
+            capture_output=True,
+            check=True,
+        )
+
+        run = subprocess.run(
+            f"cd {self.get_path()} && diff --unified src/main/java/humaneval/correct/{bid}.java src/main/java/humaneval/buggy/{bid}.java",
+            shell=True,
+            capture_output=True,
+        )
+        diff = PatchSet(run.stdout.decode("utf-8"))
+        # Change the source file path to point to the buggy version
+        diff[0].source_file = f"src/main/java/humaneval/buggy/{bid}.java"
+
+        run = subprocess.run(
+            f"sed -i 's/package humaneval\\.buggy/package humaneval\\.correct/g' {self.get_path()}/src/main/java/humaneval/correct/{bid}.java",
+            shell=True,
+            capture_output=True,
+            check=True,
+        )
 
-                self.add_bug(HumanEvalJavaBug(self, bid, str(diff)))
+        return HumanEvalJavaBug(self, bid, str(diff))
@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Optional
 from unidiff import PatchSet
 from elleelleaime.core.benchmarks.benchmark import Benchmark
 from elleelleaime.core.benchmarks.quixbugs.quixbugsbug import QuixBugsBug
@@ -12,8 +13,10 @@ class QuixBugs(Benchmark):
     The class for representing the QuixBugs benchmark.
     """
 
-    def __init__(self, path: Path = Path("benchmarks/quixbugs").absolute()) -> None:
-        super().__init__("quixbugs", path)
+    def __init__(
+        self, path: Path = Path("benchmarks/quixbugs").absolute(), lazy: bool = False
+    ) -> None:
+        super().__init__("quixbugs", path, lazy)
 
     def initialize(self) -> None:
         """
@@ -29,21 +32,35 @@ class QuixBugs(Benchmark):
         ]
 
         for algo in algos:
-            buggy_file = Path(self.path, "java_programs", f"{algo}.java")
-            fixed_file = Path(self.path, "correct_java_programs", f"{algo}.java")
-            # Assert that the bug exists
-            assert buggy_file.exists()
-            assert fixed_file.exists()
-
-            # Compute the diff
-            # Note: we compute an inverted diff to be consistent with Defects4J
-            run = subprocess.run(
-                f"cd {self.get_path()} && diff --unified {fixed_file.relative_to(self.path)} {buggy_file.relative_to(self.path)}",
-                shell=True,
-                capture_output=True,
-            )
-            diff = PatchSet(run.stdout.decode("utf-8"))
-            # Change the source file path to point to the buggy version
-            diff[0].source_file = f"{buggy_file.relative_to(self.path)}"
-
-            self.add_bug(QuixBugsBug(self, algo, str(diff)))
+            self.add_bug(self.__load_algo(algo))
+
+    def load_bug(self, identifier: str) -> Optional[QuixBugsBug]:
+        """
+        Loads a single QuixBugs bug.
+        """
+        if not (
+            identifier.isupper()
+            and Path(self.path, "java_programs", f"{identifier}.java").exists()
+        ):
+            return None
+        return self.__load_algo(identifier)
+
+    def __load_algo(self, algo: str) -> QuixBugsBug:
+        buggy_file = Path(self.path, "java_programs", f"{algo}.java")
+        fixed_file = Path(self.path, "correct_java_programs", f"{algo}.java")
+        # Assert that the bug exists
+        assert buggy_file.exists()
+        assert fixed_file.exists()
+
+        # Compute the diff
+        # Note: we compute an inverted diff to be consistent with Defects4J
+        run = subprocess.run(
+            f"cd {self.get_path()} && diff --unified {fixed_file.relative_to(self.path)} {buggy_file.relative_to(self.path)}",
+            shell=True,
+            capture_output=True,
+        )
+        diff = PatchSet(run.stdout.decode("utf-8"))
+        # Change the source file path to point to the buggy version
+        diff[0].source_file = f"{buggy_file.relative_to(self.path)}"
+
+        return QuixBugsBug(self, algo, str(diff))
@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Optional, Tuple
 from unidiff import PatchSet
 from elleelleaime.core.benchmarks.benchmark import Benchmark
 from elleelleaime.core.benchmarks.runbugrun.runbugrunbug import RunBugRunBug
@@ -18,14 +19,18 @@ class RunBugRun(Benchmark):
     The class for representing the RunBugRun benchmark.
     """
 
-    def __init__(self, path: Path = Path("benchmarks/run_bug_run").absolute()) -> None:
-        super().__init__("runbugrun", path)
+    def __init__(
+        self, path: Path = Path("benchmarks/run_bug_run").absolute(), lazy: bool = False
+    ) -> None:
+        super().__init__("runbugrun", path, lazy)
+        self.__data: Optional[Tuple[pd.DataFrame, pd.DataFrame]] = None
 
-    def initialize(self) -> None:
+    def __load_data(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
         """
-        Initializes the RunBugRun benchmark object by collecting all the bugs.
+        Loads the submissions and tests of the benchmark, and prepares the buggy and fixed directories.
         """
-        logging.info("Initializing RunBugRun benchmark...")
+        if self.__data is not None:
+            return self.__data
 
         python_path = Path(self.get_path(), "python_valid0.jsonl")
         test_path = Path(self.get_path(), "tests_all.jsonl")
@@ -47,6 +52,17 @@ class RunBugRun(Benchmark):
             check=True,
         )
 
+        self.__data = (python_df, test_df)
+        return self.__data
+
+    def initialize(self) -> None:
+        """
+        Initializes the RunBugRun benchmark object by collecting all the bugs.
+        """
+        logging.info("Initializing RunBugRun benchmark...")
+
+        python_df, test_df = self.__load_data()
+
         buggy_submissions = python_df.drop_duplicates(
             subset=["buggy_submission_id"]
         )  # .head(105)
@@ -70,46 +86,87 @@ class RunBugRun(Benchmark):
             fixed_code,
             errors,
         ) in pbar:
-            buggy_file = Path(self.path, "buggy", f"{prob_id}_{buggy_submission_id}.py")
-            fixed_file = Path(
-                self.path, "fixed", f"{prob_id}_{buggy_submission_id}.py"
-            )  # using buggy id for both to maintain file correspondence
-
-            pbar.set_postfix({"file": buggy_file})
+            pbar.set_postfix({"file": f"{prob_id}_{buggy_submission_id}.py"})
             pbar.update()
 
-            with open(buggy_file, "w") as f:
-                f.write(buggy_code)
-                f.write("\n")
+            bug = self.__load_submission(
+                prob_id, buggy_submission_id, buggy_code, fixed_code, errors, test_df
+            )
+            if bug is not None:
+                self.add_bug(bug)
+
+    def load_bug(self, identifier: str) -> Optional[RunBugRunBug]:
+        """
+        Loads a single RunBugRun bug, only executing the test cases of its submission.
+        """
+        python_df, test_df = self.__load_data()
+
+        prob_id, _, buggy_submission_id = identifier.rpartition("_")
+        submissions = python_df[python_df.index == prob_id]
+        submissions = submissions[
+            submissions["buggy_submission_id"].astype(str) == buggy_submission_id
+        ]
+        if len(submissions) == 0:
+            return None
+
+        submission = submissions.iloc[0]
+        return self.__load_submission(
+            prob_id,
+            submission["buggy_submission_id"],
+            submission["buggy_code"],
+            submission["fixed_code"],
+            submission["errors"],
+            test_df,
+        )
 
-            with open(fixed_file, "w") as f:
-                f.write(fixed_code)
-                f.write("\n")
+    def __load_submission(
+        self,
+        prob_id,
+        buggy_submission_id,
+        buggy_code,
+        fixed_code,
+        errors,
+        test_df,
+    ) -> Optional[RunBugRunBug]:
+        """
+        Writes the buggy and fixed submissions to disk and builds the corresponding bug.
+        Returns None if the buggy submission does not fail any test case.
+        """
+        buggy_file = Path(self.path, "buggy", f"{prob_id}_{buggy_submission_id}.py")
+        fixed_file = Path(
+            self.path, "fixed", f"{prob_id}_{buggy_submission_id}.py"
+        )  # using buggy id for both to maintain file correspondence
+
+        with open(buggy_file, "w") as f:
+            f.write(buggy_code)
+            f.write("\n")
+
+        with open(fixed_file, "w") as f:
+            f.write(fixed_code)
+            f.write("\n")
+
+        run = subprocess.run(
+            f"""cd {self.get_path()} && 
+            diff --unified {fixed_file.relative_to(self.path)} {buggy_file.relative_to(self.path)}""",
+            shell=True,
+            capture_output=True,
+        )
 
-            run = subprocess.run(
-                f"""cd {self.get_path()} && 
-                diff --unified {fixed_file.relative_to(self.path)} {buggy_file.relative_to(self.path)}""",
-                shell=True,
-                capture_output=True,
-            )
+        diff = PatchSet(run.stdout.decode("utf-8"))
+        # Change the source file path to point to the buggy version
+        diff[0].source_file = f"{buggy_file.relative_to(self.path)}"
 
-            diff = PatchSet(run.stdout.decode("utf-8"))
-            # Change the source file path to point to the buggy version
-            diff[0].source_file = f"{buggy_file.relative_to(self.path)}"
+        test_rows = test_df[test_df.problem_id == prob_id][["input", "output"]]
+        failing_tests = self.get_failing_tests(buggy_file, errors, test_rows, prob_id)
+        if not failing_tests:
+            return None
 
-            test_rows = test_df[test_df.problem_id == prob_id][["input", "output"]]
-            failing_tests = self.get_failing_tests(
-                buggy_file, errors, test_rows, prob_id
-            )
-            if failing_tests:
-                self.add_bug(
-                    RunBugRunBug(
-                        self,
-                        f"{prob_id}_{buggy_submission_id}",
-                        str(diff),
-                        failing_tests,
-                    )
-                )
+        return RunBugRunBug(
+            self,
+            f"{prob_id}_{buggy_submission_id}",
+            str(diff),
+            failing_tests,
+        )
 
     def get_failing_tests(self, buggy_file, errors, test_rows, prob_id):
         failing_tests = {}
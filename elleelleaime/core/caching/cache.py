@@ -1,71 +1,220 @@
+import copy
 import json
 import hashlib
 import logging
+import sqlite3
+import threading
 
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional, Tuple
 
 from elleelleaime.core.utils.benchmarks import get_benchmark
 from elleelleaime.core.benchmarks.bug import Bug
 
 
+class _Memo:
+    """
+    Bounded in-memory LRU of cache lookups, including lookups that found nothing.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.entries: OrderedDict[Tuple[str, str, str, str], Optional[dict]] = (
+            OrderedDict()
+        )
+        self.statistics: Dict[str, int] = {"hits": 0, "misses": 0, "evictions": 0}
+
+
 class Cache:
+    """
+    Cache of patch evaluations, keyed by benchmark, bug and generation.
+
+    Evaluations are stored in a single SQLite database (`cache.db` in `cache_path`) in WAL mode,
+    so that the threads (and processes) of an evaluation can read and write concurrently.
+    Each thread uses its own connection.
+
+    Lookups are memoized in a bounded LRU shared by all the instances of the process,
+    which also remembers the generations that are not cached.
+    """
+
+    DB_NAME = "cache.db"
+    MEMO_SIZE = 16384
+
+    __MEMO: _Memo = _Memo(MEMO_SIZE)
+
     def __init__(self, cache_path: str):
         self.cache_path = cache_path
+        self.db_path = Path(cache_path, self.DB_NAME)
+        self.__local = threading.local()
+
+    def __get_connection(self) -> sqlite3.Connection:
+        connection = getattr(self.__local, "connection", None)
+        if connection is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            # Note: autocommit mode, each statement is its own transaction
+            connection = sqlite3.connect(self.db_path, timeout=60, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS evaluations (
+                    benchmark TEXT NOT NULL,
+                    bid TEXT NOT NULL,
+                    hash TEXT NOT NULL,
+                    evaluation TEXT NOT NULL,
+                    PRIMARY KEY (benchmark, bid, hash)
+                ) WITHOUT ROWID
+                """
+            )
+            self.__local.connection = connection
+        return connection
 
     def __hash_generation(self, generation: str) -> str:
         """Hash generation to create a unique identifier for the patch"""
         return hashlib.sha256(generation.encode()).hexdigest()
 
+    @classmethod
+    def get_memo_statistics(cls) -> Dict[str, int]:
+        """
+        Returns the number of hits, misses and evictions of the in-memory memo.
+        """
+        with cls.__MEMO.lock:
+            return dict(cls.__MEMO.statistics)
+
     def load_from_cache(
         self, benchmark: str, bid: str, generation: str
     ) -> Optional[dict]:
-        # Compute directory, check if it exists
-        bug_path = Path(self.cache_path, benchmark, bid)
-        if not bug_path.exists():
-            return None
+        key = (str(self.db_path), benchmark, bid, generation)
+        with self.__MEMO.lock:
+            if key in self.__MEMO.entries:
+                self.__MEMO.entries.move_to_end(key)
+                self.__MEMO.statistics["hits"] += 1
+                evaluation = self.__MEMO.entries[key]
+                # Note: callers may modify the evaluation, which must not change the memo
+                return copy.deepcopy(evaluation)
+            self.__MEMO.statistics["misses"] += 1
+
+        evaluation = self.__load(benchmark, bid, generation)
+
+        with self.__MEMO.lock:
+            self.__MEMO.entries[key] = evaluation
+            while len(self.__MEMO.entries) > self.__MEMO.max_size:
+                self.__MEMO.entries.popitem(last=False)
+                self.__MEMO.statistics["evictions"] += 1
 
-        # Check if the generation is cached
-        generation_hash = self.__hash_generation(generation)
-        if not (bug_path / generation_hash).exists():
+        return copy.deepcopy(evaluation)
+
+    def __load(self, benchmark: str, bid: str, generation: str) -> Optional[dict]:
+        row = (
+            self.__get_connection()
+            .execute(
+                "SELECT evaluation FROM evaluations WHERE benchmark = ? AND bid = ? AND hash = ?",
+                (benchmark, bid, self.__hash_generation(generation)),
+            )
+            .fetchone()
+        )
+        if row is None:
             return None
 
         # Load the cached evaluation
         logging.info(f"Loading evaluation from cache for {bid}")
-        with open(bug_path / generation_hash, "r") as f:
-            evaluation = json.load(f)
-
-        return evaluation
+        return json.loads(row[0])
 
     def load_from_cache_from_bug(self, bug: Bug, generation: str) -> Optional[dict]:
         return self.load_from_cache(
             bug.benchmark.get_identifier(), bug.get_identifier(), generation
         )
 
+    def __save_hashed(
+        self, benchmark: str, bid: str, generation_hash: str, evaluation: dict
+    ) -> bool:
+        """
+        Saves the evaluation if it does not exist yet. Returns whether it was saved.
+        """
+        connection = self.__get_connection()
+        cursor = connection.execute(
+            "INSERT OR IGNORE INTO evaluations VALUES (?, ?, ?, ?)",
+            (benchmark, bid, generation_hash, json.dumps(evaluation)),
+        )
+        if cursor.rowcount > 0:
+            return True
+
+        # Check if the existing evaluation is the same as the new one
+        row = connection.execute(
+            "SELECT evaluation FROM evaluations WHERE benchmark = ? AND bid = ? AND hash = ?",
+            (benchmark, bid, generation_hash),
+        ).fetchone()
+        if row is not None and json.loads(row[0]) != evaluation:
+            logging.error(
+                f"Evaluation for {bid} and generation {evaluation.get('generation')} already exists but is different. Hash: {generation_hash}"
+            )
+        return False
+
     def save_to_cache(
         self, benchmark: str, bid: str, generation: str, evaluation: dict
     ):
-        # Compute directory, check if it exists
-        bug_path = Path(self.cache_path, benchmark, bid)
-        if not bug_path.exists():
-            bug_path.mkdir(parents=True)
-
-        # Check if the evaluation already exists
-        evaluation_path = bug_path / self.__hash_generation(generation)
-        if evaluation_path.exists():
-            with open(evaluation_path, "r") as f:
-                existing_evaluation = json.load(f)
-                # Check if the existing evaluation is the same as the new one
-                if existing_evaluation != evaluation:
-                    logging.error(
-                        f"Evaluation for {bid} and generation {generation} already exists but is different. Hash: {self.__hash_generation(generation)}"
-                    )
-        else:
-            # Save the evaluation if it does not exist
-            with open(evaluation_path, "w") as f:
-                json.dump(evaluation, f, indent=4)
+        # Forget the memoized lookup (e.g. a cached miss)
+        with self.__MEMO.lock:
+            self.__MEMO.entries.pop(
+                (str(self.db_path), benchmark, bid, generation), None
+            )
+        self.__save_hashed(
+            benchmark, bid, self.__hash_generation(generation), evaluation
+        )
 
     def save_to_cache_from_bug(self, bug: Bug, generation: str, evaluation: dict):
         self.save_to_cache(
             bug.benchmark.get_identifier(), bug.get_identifier(), generation, evaluation
         )
+
+    def migrate(self, remove: bool = False) -> int:
+        """
+        Imports the evaluations stored with the legacy layout, one JSON file per generation
+        under `cache_path/<benchmark>/<bid>/<sha256(generation)>`, into the database.
+        If remove is set, the imported files are deleted.
+
+        Returns the number of imported evaluations.
+        """
+        imported = 0
+        # Import all evaluations in a single transaction
+        connection = self.__get_connection()
+        connection.execute("BEGIN")
+        evaluation_paths = []
+        for evaluation_path in sorted(Path(self.cache_path).glob("*/*/*")):
+            if not evaluation_path.is_file() or evaluation_path.name.startswith("."):
+                continue
+            benchmark, bid = (
+                evaluation_path.parent.parent.name,
+                evaluation_path.parent.name,
+            )
+            try:
+                with open(evaluation_path, "r") as f:
+                    evaluation = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logging.warning(
+                    f"Could not read cached evaluation {evaluation_path}: {e}"
+                )
+                continue
+
+            if self.__save_hashed(benchmark, bid, evaluation_path.name, evaluation):
+                imported += 1
+            evaluation_paths.append(evaluation_path)
+        connection.execute("COMMIT")
+
+        # Only remove the files once they are safely stored in the database
+        if remove:
+            for evaluation_path in evaluation_paths:
+                evaluation_path.unlink()
+
+        return imported
+
+    def close(self):
+        """
+        Closes the connection of the calling thread.
+        """
+        connection = getattr(self.__local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self.__local.connection = None
@@ -0,0 +1,184 @@
+import atexit
+import getpass
+import logging
+import shutil
+import subprocess
+import tempfile
+import threading
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from elleelleaime.core.benchmarks.bug import Bug
+
+
+class _PooledBug:
+    def __init__(self, pristine_path: Path) -> None:
+        self.pristine_path = pristine_path
+        self.ready = False
+        self.lock = threading.Lock()
+        self.idle: List[Path] = []
+        self.in_use: int = 0
+
+
+class CheckoutPool:
+    """
+    Pool of warm working copies of bugs.
+
+    Each bug version is checked out only once, into a pristine directory that is never modified.
+    Working copies are cloned from it (using reflinks when the filesystem supports them, and a
+    regular copy otherwise) and, once released, are reset by restoring only the files that were
+    modified, so that they can be reused by later candidates of the same bug.
+
+    At most `max_bugs` bug versions are kept in the pool: when that limit is reached, the least
+    recently used bug without working copies in use is evicted.
+    """
+
+    def __init__(self, root: Optional[Path] = None, max_bugs: int = 32) -> None:
+        self.root = root or Path(
+            tempfile.gettempdir(),
+            f"elleelleaime-{getpass.getuser()}",
+            "pool",
+            str(uuid4()),
+        )
+        self.max_bugs = max_bugs
+        self.__lock = threading.Lock()
+        self.__bugs: OrderedDict[Tuple[str, str, bool], _PooledBug] = OrderedDict()
+        self.__copies: Dict[Path, Tuple[str, str, bool]] = {}
+        self.__cleanup_registered = False
+
+    def __key(self, bug: Bug, fixed: bool) -> Tuple[str, str, bool]:
+        return (bug.benchmark.get_identifier(), bug.get_identifier(), fixed)
+
+    def __get_pooled_bug(self, bug: Bug, fixed: bool) -> _PooledBug:
+        key = self.__key(bug, fixed)
+        with self.__lock:
+            if not self.__cleanup_registered:
+                atexit.register(self.clear)
+                self.__cleanup_registered = True
+
+            if key in self.__bugs:
+                self.__bugs.move_to_end(key)
+                pooled_bug = self.__bugs[key]
+                pooled_bug.in_use += 1
+                return pooled_bug
+
+            self.__evict()
+            pooled_bug = _PooledBug(
+                Path(
+                    self.root,
+                    f"{bug.benchmark.get_identifier()}-{bug.get_identifier()}-{'fixed' if fixed else 'buggy'}",
+                    "pristine",
+                )
+            )
+            pooled_bug.in_use += 1
+            self.__bugs[key] = pooled_bug
+            return pooled_bug
+
+    def __evict(self) -> None:
+        """
+        Evicts the least recently used bugs without copies in use. Must be called with the lock held.
+        """
+        for key in list(self.__bugs.keys()):
+            if len(self.__bugs) < self.max_bugs:
+                return
+            if self.__bugs[key].in_use == 0:
+                shutil.rmtree(self.__bugs[key].pristine_path.parent, ignore_errors=True)
+                del self.__bugs[key]
+
+    def __clone(self, source: Path, target: Path) -> None:
+        """
+        Clones a directory, sharing data blocks with the source if the filesystem supports reflinks.
+        Note: hardlinks cannot be used since candidate files are modified in place.
+        """
+        run = subprocess.run(
+            f'cp -a --reflink=auto "{source}" "{target}"',
+            shell=True,
+            capture_output=True,
+        )
+        if run.returncode != 0:
+            shutil.rmtree(target, ignore_errors=True)
+            shutil.copytree(source, target, symlinks=True)
+
+    def acquire(self, bug: Bug, fixed: bool = False) -> str:
+        """
+        Returns the path to a working copy of the bug, checking out the bug if it is not pooled yet.
+        The working copy must be given back with `release`.
+        """
+        pooled_bug = self.__get_pooled_bug(bug, fixed)
+        try:
+            with pooled_bug.lock:
+                # Checkout the pristine version of the bug only once
+                if not pooled_bug.ready:
+                    pooled_bug.pristine_path.parent.mkdir(parents=True, exist_ok=True)
+                    bug.checkout(str(pooled_bug.pristine_path), fixed=fixed)
+                    pooled_bug.ready = True
+
+                # Reuse an idle working copy if there is one
+                if pooled_bug.idle:
+                    path = pooled_bug.idle.pop()
+                    with self.__lock:
+                        self.__copies[path] = self.__key(bug, fixed)
+                    return str(path)
+
+            path = Path(pooled_bug.pristine_path.parent, str(uuid4()))
+            self.__clone(pooled_bug.pristine_path, path)
+            with self.__lock:
+                self.__copies[path] = self.__key(bug, fixed)
+            return str(path)
+        except Exception:
+            with self.__lock:
+                pooled_bug.in_use -= 1
+            raise
+
+    def release(self, path: str, modified_files: List[str]) -> None:
+        """
+        Gives back a working copy to the pool, restoring the given files (relative to the working copy).
+        """
+        with self.__lock:
+            key = self.__copies.pop(Path(path))
+            pooled_bug = self.__bugs[key]
+
+        try:
+            for modified_file in modified_files:
+                # Note: copyfile gives the restored file a new mtime, so that build tools recompile it
+                shutil.copyfile(
+                    Path(pooled_bug.pristine_path, modified_file),
+                    Path(path, modified_file),
+                )
+        except OSError as e:
+            logging.warning(f"Could not reset working copy {path}: {e}")
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            with pooled_bug.lock:
+                pooled_bug.idle.append(Path(path))
+        finally:
+            with self.__lock:
+                pooled_bug.in_use -= 1
+
+    def discard(self, path: str) -> None:
+        """
+        Removes a working copy whose state is unknown (e.g. after a failed evaluation).
+        """
+        with self.__lock:
+            key = self.__copies.pop(Path(path))
+            self.__bugs[key].in_use -= 1
+        shutil.rmtree(path, ignore_errors=True)
+
+    def clear(self, bug: Optional[Bug] = None) -> None:
+        """
+        Removes the pooled checkouts of the given bug, or of all bugs if no bug is given.
+        """
+        with self.__lock:
+            for key in list(self.__bugs.keys()):
+                if bug is not None and key[:2] != self.__key(bug, False)[:2]:
+                    continue
+                if self.__bugs[key].in_use == 0:
+                    shutil.rmtree(
+                        self.__bugs[key].pristine_path.parent, ignore_errors=True
+                    )
+                    del self.__bugs[key]
+            if bug is None and len(self.__bugs) == 0:
+                shutil.rmtree(self.root, ignore_errors=True)
@@ -0,0 +1,88 @@
+import json
+import hashlib
+import sqlite3
+import threading
+
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+class GenerationCache:
+    """
+    Content-addressed cache of generations, keyed by the hash of the normalized request
+    (strategy, model, prompt and generation parameters), so that generations are reused
+    across candidate files and benchmarks.
+
+    Generations are stored in a single SQLite database (`generations.db` in `cache_path`)
+    in WAL mode, with one connection per thread.
+    """
+
+    DB_NAME = "generations.db"
+
+    __STATISTICS: Dict[str, int] = {"hits": 0, "misses": 0}
+    __STATISTICS_LOCK: threading.Lock = threading.Lock()
+
+    def __init__(self, cache_path: str):
+        self.cache_path = cache_path
+        self.db_path = Path(cache_path, self.DB_NAME)
+        self.__local = threading.local()
+
+    def __get_connection(self) -> sqlite3.Connection:
+        connection = getattr(self.__local, "connection", None)
+        if connection is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            # Note: autocommit mode, each statement is its own transaction
+            connection = sqlite3.connect(self.db_path, timeout=60, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS generations (
+                    hash TEXT PRIMARY KEY,
+                    generation TEXT NOT NULL
+                ) WITHOUT ROWID
+                """
+            )
+            self.__local.connection = connection
+        return connection
+
+    @staticmethod
+    def get_key(request: dict) -> str:
+        """
+        Returns the key of a request, which does not depend on the order of its parameters.
+        """
+        normalized = json.dumps(request, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(normalized.encode()).hexdigest()
+
+    @classmethod
+    def get_statistics(cls) -> Dict[str, int]:
+        """
+        Returns the number of hits and misses of the lookups of the process.
+        """
+        with cls.__STATISTICS_LOCK:
+            return dict(cls.__STATISTICS)
+
+    def load(self, key: str) -> Optional[Any]:
+        row = (
+            self.__get_connection()
+            .execute("SELECT generation FROM generations WHERE hash = ?", (key,))
+            .fetchone()
+        )
+        with self.__STATISTICS_LOCK:
+            self.__STATISTICS["hits" if row is not None else "misses"] += 1
+        return json.loads(row[0]) if row is not None else None
+
+    def save(self, key: str, generation: Any) -> None:
+        self.__get_connection().execute(
+            "INSERT OR IGNORE INTO generations VALUES (?, ?)",
+            (key, json.dumps(generation)),
+        )
+
+    def close(self):
+        """
+        Closes the connection of the calling thread.
+        """
+        connection = getattr(self.__local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self.__local.connection = None
@@ -0,0 +1,56 @@
+import os
+import json
+import logging
+
+from pathlib import Path
+from typing import Any, Optional
+
+
+class BenchmarkIndex:
+    """
+    Persistent on-disk index of benchmark metadata.
+
+    The index is stored as a single JSON file and is only considered valid if it was
+    written with the same index format version and the same key (e.g. the commit of
+    the benchmark framework) it is being loaded with.
+    """
+
+    VERSION = 1
+
+    def __init__(self, index_path: Path, key: Optional[str]) -> None:
+        self.index_path = index_path
+        self.key = key
+
+    def load(self) -> Optional[Any]:
+        """
+        Loads the indexed data, returning None if the index is missing or stale.
+        """
+        if self.key is None or not self.index_path.exists():
+            return None
+
+        try:
+            with open(self.index_path, "r") as f:
+                index = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logging.warning(f"Could not read benchmark index {self.index_path}: {e}")
+            return None
+
+        if index.get("version") != self.VERSION or index.get("key") != self.key:
+            logging.info(f"Benchmark index {self.index_path} is stale, rebuilding...")
+            return None
+
+        return index["data"]
+
+    def save(self, data: Any) -> None:
+        """
+        Saves the data to the index. The index is written atomically, so concurrent
+        readers never observe a partially written file.
+        """
+        if self.key is None:
+            return
+
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"version": self.VERSION, "key": self.key, "data": data}, f)
+        os.replace(tmp_path, self.index_path)
@@ -16,8 +16,8 @@ benchmarks = {
 }
 
 
-def get_benchmark(benchmark: str) -> Optional[Benchmark]:
+def get_benchmark(benchmark: str, lazy: bool = False) -> Optional[Benchmark]:
     for b in benchmarks:
         if benchmark.lower() == b.lower():
-            return benchmarks[b]()
+            return benchmarks[b](lazy=lazy)
     return None
@@ -0,0 +1,79 @@
+import java.io.BufferedReader;
+import java.io.ByteArrayOutputStream;
+import java.io.InputStreamReader;
+import java.io.OutputStream;
+import java.io.PrintStream;
+import java.lang.reflect.InvocationTargetException;
+import java.lang.reflect.Method;
+import java.nio.charset.StandardCharsets;
+import java.security.Permission;
+import java.util.jar.JarFile;
+
+/**
+ * Runs the main class of a jar repeatedly in the same JVM, so that JVM start-up and warm-up are
+ * only paid once.
+ *
+ * Usage: java -cp tool.jar JarServer.java tool.jar
+ *
+ * Each request is a line of tab-separated arguments read from stdin. Each response is a header
+ * line "<exit status> <length>" followed by <length> bytes of the standard output of the run.
+ */
+public class JarServer {
+
+    static class ExitException extends SecurityException {
+        final int status;
+
+        ExitException(int status) {
+            super("System.exit(" + status + ")");
+            this.status = status;
+        }
+    }
+
+    public static void main(String[] args) throws Exception {
+        String mainClassName;
+        try (JarFile jar = new JarFile(args[0])) {
+            mainClassName = jar.getManifest().getMainAttributes().getValue("Main-Class");
+        }
+        Method main = Class.forName(mainClassName).getMethod("main", String[].class);
+
+        // Turn System.exit calls of the tool into exceptions
+        System.setSecurityManager(
+                new SecurityManager() {
+                    @Override
+                    public void checkPermission(Permission permission) {}
+
+                    @Override
+                    public void checkExit(int status) {
+                        throw new ExitException(status);
+                    }
+                });
+
+        PrintStream out = System.out;
+        PrintStream err = new PrintStream(OutputStream.nullOutputStream());
+        BufferedReader in =
+                new BufferedReader(new InputStreamReader(System.in, StandardCharsets.UTF_8));
+
+        String line;
+        while ((line = in.readLine()) != null) {
+            ByteArrayOutputStream buffer = new ByteArrayOutputStream();
+            System.setOut(new PrintStream(buffer, true, "UTF-8"));
+            System.setErr(err);
+
+            int status = 0;
+            try {
+                main.invoke(null, (Object) (line.isEmpty() ? new String[0] : line.split("\t", -1)));
+            } catch (InvocationTargetException e) {
+                Throwable cause = e.getCause();
+                status = cause instanceof ExitException ? ((ExitException) cause).status : 1;
+            } catch (ExitException e) {
+                status = e.status;
+            }
+
+            System.out.flush();
+            byte[] bytes = buffer.toByteArray();
+            out.print(status + " " + bytes.length + "\n");
+            out.write(bytes);
+            out.flush();
+        }
+    }
+}
@@ -1,13 +1,14 @@
-from typing import Optional, Tuple, List
+from typing import Dict, Optional, Tuple, List
 from unidiff import PatchSet
-from uuid import uuid4
 from pathlib import Path
+import functools
 import logging
-import getpass, tempfile, difflib, shutil
-import subprocess
+import difflib
 import re
 
 from elleelleaime.core.benchmarks.bug import Bug, RichBug
+from elleelleaime.core.utils.java.server import get_jar_server
+from elleelleaime.core.utils.workspace import BugWorkspace
 
 
 def compute_diff(
@@ -140,34 +141,27 @@ def get_modified_target_lines(diff: PatchSet) -> List[int]:
     return added_lines if len(added_lines) > 0 else context_lines
 
 
-def extract_single_function(bug: Bug) -> Optional[Tuple[str, str]]:
+def extract_single_function(
+    bug: Bug, workspace: Optional[BugWorkspace] = None
+) -> Optional[Tuple[str, str]]:
     """
     Extracts the buggy and fixed code of single-function bugs.
     Returns None is bug is not single-function
 
     Args:
         bug (Bug): THe bug to extract the code from
+        workspace (Optional[BugWorkspace]): The checkouts of the bug to use, if shared with other extraction steps
 
     Returns:
         Optional[Tuple[str, str]]: None if the bug is not single-function, otherwise a tuple of the form (buggy_code, fixed_code)
     """
-    buggy_path = Path(
-        tempfile.gettempdir(),
-        f"elleelleaime-{getpass.getuser()}",
-        bug.get_identifier(),
-        str(uuid4()),
-    )
-    fixed_path = Path(
-        tempfile.gettempdir(),
-        f"elleelleaime-{getpass.getuser()}",
-        bug.get_identifier(),
-        str(uuid4()),
-    )
+    own_workspace = workspace is None
+    workspace = workspace or BugWorkspace(bug)
 
     try:
         # Checkout the buggy and fixed versions of the bug
-        bug.checkout(str(buggy_path), fixed=False)
-        bug.checkout(str(fixed_path), fixed=True)
+        buggy_path = workspace.get_path(fixed=False)
+        fixed_path = workspace.get_path(fixed=True)
 
         # Note: this diff is inverted, i.e. the target file is the buggy file
         diff = PatchSet(bug.get_ground_truth())
@@ -183,31 +177,25 @@ def extract_single_function(bug: Bug) -> Optional[Tuple[str, str]]:
             fixed_file_path = Path(fixed_path, get_target_filename(diff))
             modified_fixed_lines = get_modified_target_lines(diff)
 
-        # Run code extractor for the buggy function
-        lines_args = " ".join([f"--lines {line}" for line in modified_buggy_lines])
-        run = subprocess.run(
-            f'docker run --rm --volume ".:/elleelleaime" --volume "{buggy_file_path.parent.absolute()}:{buggy_file_path.parent.absolute()}" --workdir "/elleelleaime"'
-            + f" openjdk:11 java -jar extractor.jar -i {buggy_file_path.absolute()} {lines_args}",
-            shell=True,
-            capture_output=True,
+        # Run code extractor for the buggy and fixed functions
+        buggy_lines_args = [
+            arg for line in modified_buggy_lines for arg in ["--lines", str(line)]
+        ]
+        fixed_lines_args = [
+            arg for line in modified_fixed_lines for arg in ["--lines", str(line)]
+        ]
+        (buggy_status, buggy_code), (fixed_status, fixed_code) = get_jar_server(
+            "extractor.jar"
+        ).run_batch(
+            [
+                ["-i", str(buggy_file_path.absolute())] + buggy_lines_args,
+                ["-i", str(fixed_file_path.absolute())] + fixed_lines_args,
+            ]
         )
-        if run.returncode != 0:
+        if buggy_status != 0:
             buggy_code = ""
-        else:
-            buggy_code = run.stdout.decode("utf-8")
-
-        # Run code extractor for the fixed function
-        lines_args = " ".join([f"--lines {line}" for line in modified_fixed_lines])
-        run = subprocess.run(
-            f'docker run --rm --volume ".:/elleelleaime" --volume "{fixed_file_path.parent.absolute()}:{fixed_file_path.parent.absolute()}" --workdir "/elleelleaime"'
-            + f" openjdk:11 java -jar extractor.jar -i {fixed_file_path.absolute()} {lines_args}",
-            shell=True,
-            capture_output=True,
-        )
-        if run.returncode != 0:
+        if fixed_status != 0:
             fixed_code = ""
-        else:
-            fixed_code = run.stdout.decode("utf-8")
 
         # HACK: sometimes we are not able to properly retrieve the code at the function-level
         # This happens in cases suchas Closure-46 where a whole function is removed
@@ -236,25 +224,51 @@ def extract_single_function(bug: Bug) -> Optional[Tuple[str, str]]:
 
     finally:
         # Remove the checked-out bugs
-        shutil.rmtree(buggy_path, ignore_errors=True)
-        shutil.rmtree(fixed_path, ignore_errors=True)
+        if own_workspace:
+            workspace.close()
+
+
+@functools.lru_cache(maxsize=32)
+def index_test_classes(base_test_dir: Path) -> Dict[str, List[Path]]:
+    """
+    Indexes the Java files under the base test directory by class name.
+    The index is built with a single walk of the directory and memoized per directory.
+    """
+    index: Dict[str, List[Path]] = {}
+    for java_file in base_test_dir.rglob("*.java"):
+        index.setdefault(java_file.stem, []).append(java_file)
+    return index
 
 
 def find_test_class(path: Path, bug, class_name: str) -> Optional[Path]:
     # Get the base test directory
     base_test_dir = Path(path, bug.get_src_test_dir(str(path)))
 
-    # Convert class name to the relative path format
-    class_relative_path = f"{class_name.replace('.', '/')}.java"
+    # Nested and inner classes (e.g. a.b.Outer$Inner) are declared in the file of their top-level class
+    class_name = class_name.split("$")[0]
 
-    # Iterate through all the subdirectories under the base test directory
+    # Inner classes may also be named with dots (e.g. a.b.Outer.Inner), so enclosing classes are tried next
+    parts = class_name.split(".")
+    names = [class_name] + [
+        ".".join(parts[:i])
+        for i in range(len(parts) - 1, 0, -1)
+        if parts[i - 1][:1].isupper()
+    ]
+
+    index = index_test_classes(base_test_dir)
     candidates = []
-    for java_file in base_test_dir.rglob("*.java"):
-        # Check if the file ends with the class relative path
-        if java_file.as_posix().endswith(class_relative_path):
-            candidates.append(
-                java_file
-            )  # Return the full path to the matched Java file
+    for name in names:
+        # Convert class name to the relative path format
+        class_relative_path = f"{name.replace('.', '/')}.java"
+
+        # Look up the files of the class, and check that they end with the class relative path
+        candidates = [
+            java_file
+            for java_file in index.get(name.split(".")[-1], [])
+            if java_file.as_posix().endswith(f"/{class_relative_path}")
+        ]
+        if len(candidates) > 0:
+            break
 
     if len(candidates) == 0:
         logging.error(f"No test class found for {class_name}")
@@ -266,49 +280,50 @@ def find_test_class(path: Path, bug, class_name: str) -> Optional[Path]:
         return None
 
 
-def extract_failing_test_cases(bug: RichBug) -> dict[str, str]:
+def extract_failing_test_cases(
+    bug: RichBug, workspace: Optional[BugWorkspace] = None
+) -> dict[str, str]:
     """
     Extracts the code of the failing test cases of a bug.
 
     Args:
         bug (Bug): The bug to extract the failing test cases from
+        workspace (Optional[BugWorkspace]): The checkouts of the bug to use, if shared with other extraction steps
 
     Returns:
         dict[str, str]: A dictionary mapping failing test cases to their code
     """
-    failing_test_cases = {}
     failing_tests = bug.get_failing_tests()
 
-    for failing_test in failing_tests:
-        class_name, method_name = failing_test.split("::")
+    own_workspace = workspace is None
+    workspace = workspace or BugWorkspace(bug)
 
-        path = Path(
-            tempfile.gettempdir(),
-            f"elleelleaime-{getpass.getuser()}",
-            bug.get_identifier(),
-            str(uuid4()),
-        )
-        try:
-            bug.checkout(str(path), fixed=False)
+    try:
+        # All failing tests are extracted from the same checkout of the buggy version
+        path = workspace.get_path(fixed=False)
+
+        batch = []
+        for failing_test in failing_tests:
+            class_name, method_name = failing_test.split("::")
             test_class_path = find_test_class(path, bug, class_name)
             if test_class_path is None:
                 return {}
-
-            # Run code extractor for the failing test case
-            run = subprocess.run(
-                f'docker run --rm --volume ".:/elleelleaime" --volume "{test_class_path.parent.absolute()}:{test_class_path.parent.absolute()}" --workdir "/elleelleaime"'
-                + f" openjdk:11 java -jar extractor.jar -i {test_class_path.absolute()} --method {method_name}",
-                shell=True,
-                capture_output=True,
+            batch.append(
+                ["-i", str(test_class_path.absolute()), "--method", method_name]
             )
-            if run.returncode == 0:
-                failing_test_cases[failing_test] = run.stdout.decode("utf-8")
-            else:
+
+        # Run code extractor for the failing test cases
+        failing_test_cases = {}
+        runs = get_jar_server("extractor.jar").run_batch(batch) if batch else []
+        for failing_test, (status, test_code) in zip(failing_tests, runs):
+            if status != 0:
                 return {}
-        finally:
-            shutil.rmtree(path, ignore_errors=True)
+            failing_test_cases[failing_test] = test_code
 
-    return failing_test_cases
+        return failing_test_cases
+    finally:
+        if own_workspace:
+            workspace.close()
 
 
 def remove_java_comments(source: str) -> Optional[str]:
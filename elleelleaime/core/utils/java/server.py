@@ -0,0 +1,239 @@
+import atexit
+import logging
+import os
+import select
+import subprocess
+import tempfile
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from uuid import uuid4
+
+
+class JavaContainer:
+    """
+    Long-lived openjdk:11 container in which Java tools are run with `docker exec`,
+    instead of starting a new container per call.
+
+    Only the given paths (e.g. a jar) and the temporary directory, where bugs are checked out,
+    are mounted, at the same paths as on the host.
+
+    The container runs `cat` on the stdin of the `docker run` client, so that it stops (and is
+    removed) as soon as this process exits, even if it is killed before running `atexit` hooks.
+    """
+
+    IMAGE = "openjdk:11"
+
+    def __init__(self, paths: List[Path]) -> None:
+        self.paths = [path.absolute() for path in paths]
+        self.name = f"elleelleaime-java-{uuid4()}"
+        self.__lock = threading.Lock()
+        self.__process: Optional[subprocess.Popen] = None
+
+    def __wait_running(self, timeout: float = 60) -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            assert self.__process is not None
+            if self.__process.poll() is not None:
+                raise RuntimeError(
+                    f"Could not start Java container: exited with {self.__process.returncode}"
+                )
+            run = subprocess.run(
+                f"docker container inspect -f '{{{{.State.Running}}}}' {self.name}",
+                shell=True,
+                capture_output=True,
+            )
+            if run.stdout.decode("utf-8").strip() == "true":
+                return
+            time.sleep(0.1)
+        raise RuntimeError(f"Java container did not start in {timeout} seconds")
+
+    def get_container_id(self) -> str:
+        with self.__lock:
+            if self.__process is None:
+                volumes = " ".join(
+                    f'--volume "{path}:{path}:ro"' for path in self.paths
+                )
+                self.__process = subprocess.Popen(
+                    f"docker run -i --rm --init --name {self.name} {volumes}"
+                    + f' --volume "{tempfile.gettempdir()}:{tempfile.gettempdir()}"'
+                    + f" {self.IMAGE} cat",
+                    shell=True,
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                )
+                atexit.register(self.stop)
+                try:
+                    self.__wait_running()
+                except RuntimeError:
+                    self.__stop()
+                    raise
+            return self.name
+
+    def popen(self, command: str) -> subprocess.Popen:
+        """
+        Starts the command in the container, with pipes to its stdin and stdout.
+        The first line of its stdout is the PID of the command in the container (see kill).
+        """
+        return subprocess.Popen(
+            f"docker exec -i {self.get_container_id()} sh -c 'echo $$ && exec {command}'",
+            shell=True,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+
+    def kill(self, pid: int) -> None:
+        """
+        Kills a command started with popen, inside the container.
+        Note: killing the local `docker exec` client does not stop the command.
+        """
+        subprocess.run(
+            f"docker exec {self.get_container_id()} sh -c 'kill -9 {pid}'",
+            shell=True,
+            capture_output=True,
+        )
+
+    def __stop(self) -> None:
+        if self.__process is not None:
+            subprocess.run(f"docker rm -f {self.name}", shell=True, capture_output=True)
+            self.__process.kill()
+            self.__process = None
+
+    def stop(self) -> None:
+        with self.__lock:
+            self.__stop()
+
+
+@dataclass
+class _Worker:
+    process: subprocess.Popen
+    # PID of the JVM in the container
+    pid: Optional[int] = None
+
+
+class JarServer:
+    """
+    Runs the main class of a jar in a pool of long-lived JVMs (see JarServer.java),
+    so that each call pays neither container nor JVM start-up.
+
+    Each JVM handles one call at a time; up to `max_workers` JVMs are started on demand.
+    A JVM that fails or times out is killed inside the container.
+    """
+
+    SERVER_SOURCE = Path("elleelleaime", "core", "utils", "java", "JarServer.java")
+
+    def __init__(
+        self, container: JavaContainer, jar: str, max_workers: Optional[int] = None
+    ) -> None:
+        self.container = container
+        self.jar = jar
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self.__idle: List[_Worker] = []
+        self.__workers = threading.BoundedSemaphore(self.max_workers)
+        self.__lock = threading.Lock()
+
+    def __start_worker(self) -> _Worker:
+        jar = Path(self.jar).absolute()
+        worker = _Worker(
+            self.container.popen(
+                f"java -cp {jar} {self.SERVER_SOURCE.absolute().as_posix()} {jar}"
+            )
+        )
+        assert worker.process.stdout is not None
+        ready, _, _ = select.select([worker.process.stdout], [], [], 60)
+        line = worker.process.stdout.readline() if ready else b""
+        if not line.strip().isdigit():
+            worker.process.kill()
+            raise EOFError(f"{self.jar} server did not start")
+        worker.pid = int(line)
+        return worker
+
+    def __kill_worker(self, worker: _Worker) -> None:
+        if worker.pid is not None:
+            self.container.kill(worker.pid)
+        worker.process.kill()
+
+    def __call(
+        self, worker: _Worker, args: List[str], timeout: float
+    ) -> Tuple[int, str]:
+        stdin, stdout = worker.process.stdin, worker.process.stdout
+        assert stdin is not None and stdout is not None
+        stdin.write(("\t".join(args) + "\n").encode("utf-8"))
+        stdin.flush()
+
+        # Note: the first call also waits for the JVM to start
+        ready, _, _ = select.select([stdout], [], [], timeout)
+        if not ready:
+            raise TimeoutError(f"{self.jar} did not answer in {timeout} seconds")
+        header = stdout.readline().decode("utf-8").split()
+        if len(header) != 2:
+            raise EOFError(f"{self.jar} server exited unexpectedly")
+        status, length = int(header[0]), int(header[1])
+        return status, stdout.read(length).decode("utf-8")
+
+    def run(self, args: List[str], timeout: float = 5 * 60) -> Tuple[int, str]:
+        """
+        Runs the jar with the given arguments (which must not contain tabs or newlines).
+        Returns the exit status and the standard output of the run.
+        """
+        with self.__workers:
+            with self.__lock:
+                worker = self.__idle.pop() if self.__idle else None
+
+            try:
+                if worker is None:
+                    worker = self.__start_worker()
+                result = self.__call(worker, args, timeout)
+            except (RuntimeError, OSError, ValueError, EOFError, TimeoutError) as e:
+                logging.warning(f"Failed to run {self.jar} with {args}: {e}")
+                if worker is not None:
+                    self.__kill_worker(worker)
+                return 1, ""
+
+            with self.__lock:
+                self.__idle.append(worker)
+            return result
+
+    def run_batch(
+        self, batch: List[List[str]], timeout: float = 5 * 60
+    ) -> List[Tuple[int, str]]:
+        """
+        Runs the jar with each of the given arguments, spreading the runs over the pool of JVMs.
+        Results are returned in order.
+        """
+        if len(batch) == 1:
+            return [self.run(batch[0], timeout)]
+        with ThreadPoolExecutor(
+            max_workers=min(len(batch), self.max_workers)
+        ) as executor:
+            return list(executor.map(lambda args: self.run(args, timeout), batch))
+
+    def close(self) -> None:
+        with self.__lock:
+            for worker in self.__idle:
+                self.__kill_worker(worker)
+            self.__idle = []
+        self.container.stop()
+
+
+__SERVERS: Dict[str, JarServer] = {}
+__SERVERS_LOCK = threading.Lock()
+
+
+def get_jar_server(jar: str) -> JarServer:
+    """
+    Returns the server running the given jar (relative to the current directory),
+    in its own container where only the jar and JarServer.java are mounted.
+    """
+    with __SERVERS_LOCK:
+        if jar not in __SERVERS:
+            container = JavaContainer([Path(jar), JarServer.SERVER_SOURCE])
+            __SERVERS[jar] = JarServer(container, jar)
+            atexit.register(__SERVERS[jar].close)
+        return __SERVERS[jar]
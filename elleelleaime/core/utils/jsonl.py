@@ -1,7 +1,10 @@
-from typing import Iterable, Dict
+from typing import Iterable, Dict, List
 import gzip
 import json
 import os
+import threading
+import time
+import zlib
 
 """
 Code from HumanEval:
@@ -44,3 +47,113 @@ def write_jsonl(filename: str, data: Iterable[Dict], append: bool = False):
         with open(filename, mode) as fp:
             for x in data:
                 fp.write((json.dumps(x) + "\n").encode("utf-8"))
+
+
+class JsonlWriter:
+    """
+    Incrementally writes dictionaries to jsonl (or jsonl.gz), so that the records written so far
+    survive a crash. Records are buffered and flushed to disk (and fsync'd) every `sync_every`
+    records or `sync_interval` seconds, whichever comes first. A background thread flushes the
+    buffer when no record was written for `sync_interval` seconds.
+
+    Each flush of a gz file is written as a separate gzip member, which `stream_jsonl` reads back
+    transparently.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        append: bool = False,
+        sync_every: int = 16,
+        sync_interval: float = 30.0,
+    ):
+        self.filename = os.path.expanduser(filename)
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.__lock = threading.Lock()
+        self.__buffer: List[bytes] = []
+        self.__last_sync = time.monotonic()
+        self.__fp = open(self.filename, "ab" if append else "wb")
+        self.__closed = threading.Event()
+        self.__sync_thread = threading.Thread(target=self.__sync_loop, daemon=True)
+        self.__sync_thread.start()
+
+    def __sync_loop(self):
+        while True:
+            with self.__lock:
+                timeout = self.__last_sync + self.sync_interval - time.monotonic()
+            if self.__closed.wait(max(timeout, 0)):
+                return
+            with self.__lock:
+                if time.monotonic() - self.__last_sync >= self.sync_interval:
+                    self.__flush()
+
+    def write(self, x: Dict):
+        with self.__lock:
+            self.__buffer.append((json.dumps(x) + "\n").encode("utf-8"))
+            if (
+                len(self.__buffer) >= self.sync_every
+                or time.monotonic() - self.__last_sync >= self.sync_interval
+            ):
+                self.__flush()
+
+    def flush(self):
+        with self.__lock:
+            self.__flush()
+
+    def __flush(self):
+        if self.__buffer:
+            data = b"".join(self.__buffer)
+            if self.filename.endswith(".gz"):
+                data = gzip.compress(data)
+            self.__fp.write(data)
+            self.__fp.flush()
+            os.fsync(self.__fp.fileno())
+            self.__buffer = []
+        self.__last_sync = time.monotonic()
+
+    def close(self):
+        self.__closed.set()
+        self.__sync_thread.join()
+        with self.__lock:
+            self.__flush()
+            self.__fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def recover_jsonl(filename: str) -> List[Dict]:
+    """
+    Reads the complete records of a jsonl (or jsonl.gz) file that may have been cut short by a crash.
+    If the file ends with an incomplete record, it is rewritten without it, so that it can be appended to.
+    """
+    records = []
+    corrupted = False
+    try:
+        if filename.endswith(".gz"):
+            fp = gzip.open(filename, "rt")
+        else:
+            fp = open(filename, "r")
+        with fp:
+            for line in fp:
+                if not line.endswith("\n"):
+                    corrupted = True
+                    break
+                if any(not x.isspace() for x in line):
+                    records.append(json.loads(line))
+    except (EOFError, OSError, zlib.error, UnicodeDecodeError, json.JSONDecodeError):
+        corrupted = True
+
+    if corrupted:
+        # Note: the temporary file keeps the extension, so that it is written with the same format
+        tmp_filename = os.path.join(
+            os.path.dirname(filename), f".{os.getpid()}.{os.path.basename(filename)}"
+        )
+        write_jsonl(tmp_filename, records)
+        os.replace(tmp_filename, filename)
+
+    return records
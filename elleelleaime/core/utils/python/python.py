@@ -7,6 +7,8 @@ import getpass, tempfile, difflib, shutil
 import subprocess
 import re
 import ast
+import io
+import tokenize
 
 from elleelleaime.core.benchmarks.bug import Bug, RichBug
 
@@ -82,3 +84,24 @@ def extract_single_function(bug: Bug) -> Optional[Tuple[str, str]]:
         # Remove the checked-out bugs
         shutil.rmtree(buggy_path, ignore_errors=True)
         shutil.rmtree(fixed_path, ignore_errors=True)
+
+
+def remove_python_comments(source: str) -> Optional[str]:
+    """
+    Removes the `#` comments of Python source code, keeping the indentation and the strings.
+    Returns None if the source cannot be tokenized (e.g. unbalanced brackets).
+    """
+    try:
+        lines = source.splitlines(keepends=True)
+        for token in tokenize.generate_tokens(io.StringIO(source).readline):
+            if token.type == tokenize.COMMENT:
+                row, col = token.start
+                line = lines[row - 1]
+                newline = line[len(line.rstrip("\r\n")) :]
+                lines[row - 1] = line[:col] + newline
+        return "".join(lines)
+    except (tokenize.TokenError, IndentationError, SyntaxError) as e:
+        logging.warning(
+            f"Failed to remove_python_comments from\n```\n{source}\n```\nwith error: {e}"
+        )
+        return None
@@ -0,0 +1,56 @@
+import getpass
+import shutil
+import tempfile
+import threading
+
+from pathlib import Path
+from typing import Dict
+from uuid import uuid4
+
+from elleelleaime.core.benchmarks.bug import Bug
+
+
+class BugWorkspace:
+    """
+    Read-only checkouts of a bug shared by all the extraction steps of a sample,
+    so that each version of the bug is checked out at most once.
+
+    Versions are checked out on first use and removed when the workspace is closed:
+
+        with BugWorkspace(bug) as workspace:
+            buggy_path = workspace.get_path(fixed=False)
+    """
+
+    def __init__(self, bug: Bug) -> None:
+        self.bug = bug
+        self.root = Path(
+            tempfile.gettempdir(),
+            f"elleelleaime-{getpass.getuser()}",
+            bug.get_identifier(),
+            str(uuid4()),
+        )
+        self.__paths: Dict[bool, Path] = {}
+        self.__lock = threading.Lock()
+
+    def get_path(self, fixed: bool = False) -> Path:
+        """
+        Returns the path to the checkout of the buggy (or fixed) version of the bug.
+        The checkout must not be modified.
+        """
+        with self.__lock:
+            if fixed not in self.__paths:
+                path = Path(self.root, "fixed" if fixed else "buggy")
+                self.bug.checkout(str(path), fixed=fixed)
+                self.__paths[fixed] = path
+            return self.__paths[fixed]
+
+    def close(self) -> None:
+        with self.__lock:
+            shutil.rmtree(self.root, ignore_errors=True)
+            self.__paths = {}
+
+    def __enter__(self) -> "BugWorkspace":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
@@ -0,0 +1,133 @@
+import os
+import json
+import logging
+import threading
+
+from collections import deque
+from typing import Callable, Deque, Dict, Generic, Hashable, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+def split_sample(sample: dict) -> List[dict]:
+    """
+    Splits a sample into units holding a single generation each, so that the generations of a
+    sample can be evaluated concurrently. Evaluating the units and concatenating their evaluations,
+    in order, is equivalent to evaluating the whole sample.
+
+    :param sample: The sample to split.
+    :return: A list of samples, each with a single generation.
+    """
+    generation = sample.get("generation")
+    # Lists of generations (one per sample requested from the model)
+    if isinstance(generation, list) and len(generation) > 1:
+        return [dict(sample, generation=[g]) for g in generation]
+    # Single completions holding several choices (e.g. OpenAI, Mistral)
+    if (
+        isinstance(generation, dict)
+        and isinstance(generation.get("choices"), list)
+        and len(generation["choices"]) > 1
+    ):
+        return [
+            dict(sample, generation=dict(generation, choices=[choice]))
+            for choice in generation["choices"]
+        ]
+    return [sample]
+
+
+class DurationHistory:
+    """
+    Keeps track of how long evaluating a generation of each bug takes, across runs.
+    """
+
+    # Weight of the latest duration in the moving average
+    ALPHA: float = 0.5
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.__lock = threading.Lock()
+        self.__durations: Dict[str, float] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    self.__durations = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logging.warning(f"Could not read evaluation durations {path}: {e}")
+
+    def estimate(self, identifier: str) -> float:
+        """
+        Returns the expected duration (in seconds) of evaluating a generation of the bug.
+        Bugs without history are expected to be the longest, so that they are scheduled first.
+        """
+        return self.__durations.get(identifier, float("inf"))
+
+    def record(self, identifier: str, duration: float) -> None:
+        with self.__lock:
+            if identifier in self.__durations:
+                duration = (
+                    self.ALPHA * duration
+                    + (1 - self.ALPHA) * self.__durations[identifier]
+                )
+            self.__durations[identifier] = duration
+
+    def save(self) -> None:
+        with self.__lock:
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.__durations, f, indent=4, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+
+class AffinityQueue(Generic[T]):
+    """
+    Work queue of (bug, generation) units that keeps the units of each bug affine to a worker,
+    so that a worker reuses the warm checkouts of its bug and workers do not contend on the
+    same bug.
+
+    Bugs are claimed longest-expected-first (expected duration of a unit times number of units).
+    A worker keeps taking the units of its bug, and claims the next unclaimed bug once its bug
+    has no pending units. When all bugs are claimed, idle workers take units of the bug with the
+    most expected remaining work, so that the tail is still spread across workers.
+    """
+
+    def __init__(
+        self, units: List[T], key: Callable[[T], str], estimate: Callable[[str], float]
+    ) -> None:
+        self.__lock = threading.Lock()
+        self.__estimate = estimate
+        self.__pending: Dict[str, Deque[T]] = {}
+        for unit in units:
+            self.__pending.setdefault(key(unit), deque()).append(unit)
+        self.__unclaimed: Deque[str] = deque(
+            sorted(self.__pending, key=lambda k: (-self.__remaining(k), k))
+        )
+        self.__claims: Dict[Hashable, str] = {}
+
+    def __remaining(self, key: str) -> float:
+        return self.__estimate(key) * len(self.__pending[key])
+
+    def get(self, worker: Hashable) -> Optional[T]:
+        """
+        Returns the next unit for the worker, or None if there is no pending unit left.
+        """
+        with self.__lock:
+            key = self.__claims.get(worker)
+            if key is None or not self.__pending[key]:
+                if self.__unclaimed:
+                    key = self.__unclaimed.popleft()
+                else:
+                    busy = [k for k, units in self.__pending.items() if units]
+                    if not busy:
+                        return None
+                    key = max(busy, key=self.__remaining)
+                self.__claims[worker] = key
+            return self.__pending[key].popleft()
+
+    def clear(self) -> None:
+        """
+        Drops all the pending units.
+        """
+        with self.__lock:
+            self.__unclaimed.clear()
+            for units in self.__pending.values():
+                units.clear()
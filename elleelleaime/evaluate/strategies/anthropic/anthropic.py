@@ -18,6 +18,10 @@ class AnthropicEvaluationStrategy(InstructEvaluationStrategy):
         """
         evaluation = []
 
+        # Samples that failed to generate are recorded as {"error": ...}
+        if not generation or "content" not in generation:
+            return [None]
+
         for content in generation["content"]:
             message = content["text"]
             candidate_patch = self.extract_patch_from_message(message)
@@ -37,7 +41,13 @@ class AnthropicEvaluationStrategy(InstructEvaluationStrategy):
         if sample["generation"] is None:
             return evaluation
 
-        for generation in sample["generation"]:
+        # Prompts that failed to generate are recorded as a single {"error": ...}
+        generations = (
+            sample["generation"]
+            if isinstance(sample["generation"], list)
+            else [sample["generation"]]
+        )
+        for generation in generations:
             evaluation.extend(self.__evaluate_generation(bug, sample, generation))
 
         return evaluation
@@ -21,7 +21,17 @@ class GoogleEvaluationStrategy(InstructEvaluationStrategy):
         if sample["generation"] is None:
             return evaluation
 
-        for generation in sample["generation"]:
+        # Prompts that failed to generate are recorded as a single {"error": ...}
+        generations = (
+            sample["generation"]
+            if isinstance(sample["generation"], list)
+            else [sample["generation"]]
+        )
+        for generation in generations:
+            # Samples that failed to generate are recorded as {"error": ...}
+            if not generation or "candidates" not in generation:
+                evaluation.append(None)
+                continue
             for candidate in generation["candidates"]:
                 if "content" not in candidate:
                     evaluation.append(None)
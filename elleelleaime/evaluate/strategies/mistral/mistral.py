@@ -18,6 +18,10 @@ class MistralEvaluationStrategy(InstructEvaluationStrategy):
         """
         evaluation = []
 
+        # Prompts that failed to generate are recorded as {"error": ...}
+        if not generation or "choices" not in generation:
+            return [None]
+
         for choice in generation["choices"]:
             message = choice["message"]["content"]
             candidate_patch = self.extract_patch_from_message(message)
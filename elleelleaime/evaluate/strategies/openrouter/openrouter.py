@@ -18,8 +18,9 @@ class OpenRouterEvaluationStrategy(InstructEvaluationStrategy):
         """
         evaluation = []
 
+        # Samples that failed to generate are recorded as {"error": ...}
         if not generation or "choices" not in generation:
-            return evaluation
+            return [None]
 
         for choice in generation["choices"]:
             message = choice["message"]["content"]
@@ -1,13 +1,23 @@
+import hashlib
+import logging
 import tempfile
-import subprocess
+import threading
 
 from abc import ABC, abstractmethod
-from typing import Any, List, Optional, final
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, final
 
 from elleelleaime.core.benchmarks.bug import Bug
+from elleelleaime.core.utils.java.server import get_jar_server
 
 
 class PatchEvaluationStrategy(ABC):
+    # AST match results, keyed by the hash of the fixed and candidate codes
+    __AST_MATCHES: Dict[str, bool] = {}
+    __AST_MATCH_LOCK: threading.Lock = threading.Lock()
+    # Number of runs of the AST matcher before a failed pair is reported as a mismatch
+    AST_MATCH_ATTEMPTS: int = 2
+
     def __init__(self, **kwargs):
         pass
 
@@ -26,29 +36,65 @@ class PatchEvaluationStrategy(ABC):
         return None
 
     def ast_match(self, fixed_code: str, candidate_code: str) -> bool:
-        # Write the fixed code to a temporary file
-        fixed_code_file = tempfile.NamedTemporaryFile(
-            mode="w", suffix=".java", delete=True
-        )
-        fixed_code_file.write(fixed_code)
-        fixed_code_file.flush()
-
-        # Write the candidate code to a temporary file
-        candidate_code_file = tempfile.NamedTemporaryFile(
-            mode="w", suffix=".java", delete=True
-        )
-        candidate_code_file.write(candidate_code)
-        candidate_code_file.flush()
-
-        # Run the AST matcher on the two files
-        run = subprocess.run(
-            f'docker run --rm --volume ".:/elleelleaime" --volume "{tempfile.gettempdir()}:{tempfile.gettempdir()}" --workdir "/elleelleaime" openjdk:11 java -jar gumtree-spoon-ast-diff.jar {fixed_code_file.name} {candidate_code_file.name}',
-            shell=True,
-            capture_output=True,
-        )
-
-        # Return True if "no AST change" in the output
-        return "no AST change" in run.stdout.decode("utf-8")
+        return self.ast_match_batch([(fixed_code, candidate_code)])[0]
+
+    def ast_match_batch(self, pairs: List[Tuple[str, str]]) -> List[bool]:
+        """
+        Returns, for each (fixed_code, candidate_code) pair, whether the candidate has the same AST
+        as the fixed code. Results are cached by content hash for the lifetime of the process.
+        Failed runs of the AST matcher (e.g. a JVM timeout) are retried once, and are not cached,
+        so that they are reported as mismatches only for this call.
+        """
+        keys = [
+            hashlib.sha256(
+                f"{len(fixed_code)}:{fixed_code}{candidate_code}".encode()
+            ).hexdigest()
+            for fixed_code, candidate_code in pairs
+        ]
+        with PatchEvaluationStrategy.__AST_MATCH_LOCK:
+            missing = {
+                key: pair
+                for key, pair in zip(keys, pairs)
+                if key not in PatchEvaluationStrategy.__AST_MATCHES
+            }
+
+        for _ in range(self.AST_MATCH_ATTEMPTS):
+            if not missing:
+                break
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                # Write the fixed and candidate codes to temporary files
+                batch = []
+                for key, (fixed_code, candidate_code) in missing.items():
+                    fixed_code_path = Path(tmp_dir, f"{key}_fixed.java")
+                    fixed_code_path.write_text(fixed_code)
+                    candidate_code_path = Path(tmp_dir, f"{key}_candidate.java")
+                    candidate_code_path.write_text(candidate_code)
+                    batch.append([str(fixed_code_path), str(candidate_code_path)])
+
+                # Run the AST matcher on the pairs of files
+                runs = get_jar_server("gumtree-spoon-ast-diff.jar").run_batch(batch)
+
+            failed = {}
+            with PatchEvaluationStrategy.__AST_MATCH_LOCK:
+                for (key, pair), (status, output) in zip(missing.items(), runs):
+                    if status != 0:
+                        failed[key] = pair
+                        continue
+                    # The candidate matches if "no AST change" is in the output
+                    PatchEvaluationStrategy.__AST_MATCHES[key] = (
+                        "no AST change" in output
+                    )
+            missing = failed
+
+        if missing:
+            logging.warning(
+                f"AST matching failed for {len(missing)} candidates, reporting them as mismatches"
+            )
+
+        with PatchEvaluationStrategy.__AST_MATCH_LOCK:
+            return [
+                PatchEvaluationStrategy.__AST_MATCHES.get(key, False) for key in keys
+            ]
 
     @final
     def evaluate(self, bug: Bug, sample: dict) -> Optional[List[dict]]:
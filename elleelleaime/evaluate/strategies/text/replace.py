@@ -1,18 +1,27 @@
-from typing import Optional, List
+from typing import Dict, Optional, List, Tuple
 from unidiff import PatchSet
 from pathlib import Path
 from uuid import uuid4
 
-import os, tempfile, shutil, logging, getpass
+import os, tempfile, shutil, logging, getpass, threading
 
 from elleelleaime.evaluate.strategies.strategy import PatchEvaluationStrategy
 from elleelleaime.core.benchmarks.bug import Bug
 from elleelleaime.core.utils.java.java import remove_empty_lines, remove_java_comments
+from elleelleaime.core.utils.python.python import remove_python_comments
 from elleelleaime.core.caching.cache import Cache
+from elleelleaime.core.caching.checkout import CheckoutPool
 
 
 class ReplaceEvaluationStrategy(PatchEvaluationStrategy):
 
+    # The checkout pool is shared by all instances, since a strategy is instantiated per sample
+    __CHECKOUT_POOL: CheckoutPool = CheckoutPool()
+
+    # Number of candidates evaluated and of candidates whose evaluation was reused from an equivalent one
+    __DEDUP_STATISTICS: Dict[str, int] = {"evaluated": 0, "deduplicated": 0}
+    __DEDUP_STATISTICS_LOCK: threading.Lock = threading.Lock()
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.use_cache = kwargs.get("use_cache", True)
@@ -21,6 +30,55 @@ class ReplaceEvaluationStrategy(PatchEvaluationStrategy):
         )
         if self.use_cache:
             self.cache = Cache(self.cache_path)
+        self.use_checkout_pool = kwargs.get("use_checkout_pool", True)
+        self.__evaluations: Dict[Tuple[str, str, str, str], Optional[dict]] = {}
+        self.__evaluation_locks: Dict[Tuple[str, str, str, str], threading.Lock] = {}
+        self.__evaluation_locks_lock = threading.Lock()
+
+    @classmethod
+    def get_dedup_statistics(cls) -> Dict[str, int]:
+        """
+        Returns how many candidates were evaluated, and how many reused the evaluation
+        of an equivalent candidate (i.e. how many builds and test runs were saved).
+        """
+        with cls.__DEDUP_STATISTICS_LOCK:
+            return dict(cls.__DEDUP_STATISTICS)
+
+    def __update_dedup_statistics(self, key: str) -> None:
+        with self.__DEDUP_STATISTICS_LOCK:
+            self.__DEDUP_STATISTICS[key] += 1
+
+    # Comment removal of the languages whose candidates are deduplicated, by file extension
+    __REMOVE_COMMENTS = {
+        ".java": remove_java_comments,
+        ".py": remove_python_comments,
+    }
+
+    @staticmethod
+    def get_language(bug: Bug) -> str:
+        """
+        Returns the extension of the file modified by the ground truth of the bug (e.g. ".java").
+        """
+        return Path(PatchSet(bug.get_ground_truth())[0].path).suffix
+
+    def normalize_generation(
+        self, generation: str, language: str = ".java"
+    ) -> Optional[str]:
+        """
+        Normalizes the generation so that candidates which only differ in comments,
+        empty lines, or trailing whitespace have the same normalized form.
+        Comments are removed according to the language (file extension) of the bug,
+        and None is returned for the other languages, whose candidates are not deduplicated.
+        Note: indentation is kept, since it is meaningful in Python (and since the generation
+        replaces the buggy code in place, even a common indentation changes the candidate).
+        """
+        if language not in self.__REMOVE_COMMENTS:
+            return None
+        generation_no_comments = self.__REMOVE_COMMENTS[language](generation)
+        if generation_no_comments is None:
+            return None
+        generation_no_comments = remove_empty_lines(generation_no_comments)
+        return "\n".join(line.rstrip() for line in generation_no_comments.splitlines())
 
     def evaluate_generation(
         self, bug: Bug, sample: dict, generation: Optional[str]
@@ -46,14 +104,44 @@ class ReplaceEvaluationStrategy(PatchEvaluationStrategy):
                     f"Evaluation for {bug.get_identifier()} not found in cache."
                 )
 
-        # Otherwise, we evaluate the generation
-        buggy_path = os.path.join(
-            tempfile.gettempdir(),
-            f"elleelleaime-{getpass.getuser()}",
+        # Candidates equivalent to an already evaluated one reuse its evaluation
+        normalized_generation = self.normalize_generation(
+            generation, self.get_language(bug)
+        )
+        if normalized_generation is None:
+            return self.__evaluate_generation(bug, sample, generation, result)
+
+        key = (
             bug.get_identifier(),
-            str(uuid4()),
+            sample["buggy_code"],
+            sample["fixed_code"],
+            normalized_generation,
         )
+        with self.__evaluation_locks_lock:
+            lock = self.__evaluation_locks.setdefault(key, threading.Lock())
+        with lock:
+            if key not in self.__evaluations:
+                self.__evaluations[key] = self.__evaluate_generation(
+                    bug, sample, generation, result
+                )
+                self.__update_dedup_statistics("evaluated")
+                return self.__evaluations[key]
+
+            self.__update_dedup_statistics("deduplicated")
+            evaluation = self.__evaluations[key]
+            if evaluation is None:
+                return None
+            evaluation = dict(evaluation, generation=generation)
+            if self.use_cache:
+                self.cache.save_to_cache_from_bug(bug, generation, evaluation)
+            return evaluation
 
+    def __evaluate_generation(
+        self, bug: Bug, sample: dict, generation: str, result: dict
+    ) -> Optional[dict]:
+        """
+        Evaluates the generation by checking for exact matches, compiling, testing and checking for AST matches.
+        """
         # Remove comments and empty lines from the generated code and the fixed code
         generation_no_comments = remove_java_comments(generation)
         if generation_no_comments is None:
@@ -90,32 +178,29 @@ class ReplaceEvaluationStrategy(PatchEvaluationStrategy):
                 self.cache.save_to_cache_from_bug(bug, generation, result)
             return result
 
+        # Note: this diff is inverted, i.e. the target file is the buggy file
+        diff = PatchSet(bug.get_ground_truth())
+
+        # Locate the buggy file
+        if bug.is_ground_truth_inverted():
+            buggy_file = (
+                diff[0].target_file[2:]
+                if diff[0].target_file.startswith("b/")
+                else diff[0].target_file
+            )
+        else:
+            buggy_file = (
+                diff[0].source_file[2:]
+                if diff[0].source_file.startswith("a/")
+                else diff[0].source_file
+            )
+
+        # Checkout the buggy code
+        buggy_path = self.__checkout(bug)
+        success = False
         try:
-            # Note: this diff is inverted, i.e. the target file is the buggy file
-            diff = PatchSet(bug.get_ground_truth())
-
-            # Checkout the buggy code
-            bug.checkout(buggy_path, fixed=False)
-
-            # Locate and load the buggy file
-            if bug.is_ground_truth_inverted():
-                buggy_file_path = os.path.join(
-                    buggy_path,
-                    (
-                        diff[0].target_file[2:]
-                        if diff[0].target_file.startswith("b/")
-                        else diff[0].target_file
-                    ),
-                )
-            else:
-                buggy_file_path = os.path.join(
-                    buggy_path,
-                    (
-                        diff[0].source_file[2:]
-                        if diff[0].source_file.startswith("a/")
-                        else diff[0].source_file
-                    ),
-                )
+            # Load the buggy file
+            buggy_file_path = os.path.join(buggy_path, buggy_file)
 
             with open(buggy_file_path, "r", encoding="ISO-8859-1") as f:
                 buggy_code = f.read()
@@ -156,9 +241,37 @@ class ReplaceEvaluationStrategy(PatchEvaluationStrategy):
             # Save the evaluation to the cache
             if self.use_cache:
                 self.cache.save_to_cache_from_bug(bug, generation, result)
+            success = True
             return result
         finally:
+            self.__release(buggy_path, buggy_file, success)
+
+    def __checkout(self, bug: Bug) -> str:
+        """
+        Returns the path to a working copy of the buggy version of the bug.
+        """
+        if self.use_checkout_pool:
+            return self.__CHECKOUT_POOL.acquire(bug, fixed=False)
+
+        buggy_path = os.path.join(
+            tempfile.gettempdir(),
+            f"elleelleaime-{getpass.getuser()}",
+            bug.get_identifier(),
+            str(uuid4()),
+        )
+        bug.checkout(buggy_path, fixed=False)
+        return buggy_path
+
+    def __release(self, buggy_path: str, buggy_file: str, success: bool) -> None:
+        """
+        Releases the working copy, resetting the buggy file if it is given back to the checkout pool.
+        """
+        if not self.use_checkout_pool:
             shutil.rmtree(buggy_path)
+        elif success:
+            self.__CHECKOUT_POOL.release(buggy_path, [buggy_file])
+        else:
+            self.__CHECKOUT_POOL.discard(buggy_path)
 
     def _evaluate_impl(self, bug: Bug, sample: dict) -> Optional[List[dict]]:
         """
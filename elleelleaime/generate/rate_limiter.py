@@ -0,0 +1,223 @@
+import re
+import time
+import asyncio
+import threading
+
+from typing import Dict, Mapping, Optional, Tuple
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap estimate of the number of tokens of a text (~4 characters per token),
+    used to reserve tokens-per-minute budget before the request is sent.
+    """
+    return len(text) // 4 + 1
+
+
+def _parse_duration(value: str) -> Optional[float]:
+    """
+    Parses a duration in seconds, either a plain number ("20") or in the Go format
+    used by the OpenAI headers ("1m30s", "250ms").
+    """
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    matches = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value)
+    if not matches:
+        return None
+    units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(float(amount) * units[unit] for amount, unit in matches)
+
+
+class _Bucket:
+    """
+    Token bucket refilled continuously at `limit` units per minute.
+    """
+
+    def __init__(self, limit: float) -> None:
+        self.limit = limit
+        self.level = limit
+
+    @property
+    def rate(self) -> float:
+        return self.limit / 60
+
+    def refill(self, elapsed: float) -> None:
+        self.level = min(self.limit, self.level + elapsed * self.rate)
+
+    def wait_time(self, amount: float) -> float:
+        # Requests larger than the bucket only need a full bucket, and drive it negative
+        needed = min(amount, self.limit)
+        if self.level >= needed:
+            return 0.0
+        return (needed - self.level) / self.rate
+
+
+class RateLimiter:
+    """
+    Client-side rate limiter enforcing both requests-per-minute and tokens-per-minute.
+
+    Each request reserves one request and its estimated tokens before being sent, waiting
+    until both budgets allow it. Limits start from the configured values (or are unbounded),
+    and are then adjusted from the rate-limit headers of the responses (OpenAI and Anthropic
+    formats), so that the local budget follows what the provider reports as remaining.
+    A `retry-after` header pauses all requests for the given time.
+
+    Limiters are thread-safe, and `get_shared` returns one limiter per key (e.g. provider
+    and model), so that all the generation workers of a process share the same budget.
+    """
+
+    # Fraction of the provider limits that is used, to stay just under them
+    HEADROOM = 0.95
+
+    REQUESTS_LIMIT_HEADERS = (
+        "x-ratelimit-limit-requests",
+        "anthropic-ratelimit-requests-limit",
+    )
+    REQUESTS_REMAINING_HEADERS = (
+        "x-ratelimit-remaining-requests",
+        "anthropic-ratelimit-requests-remaining",
+    )
+    TOKENS_LIMIT_HEADERS = (
+        "x-ratelimit-limit-tokens",
+        "anthropic-ratelimit-tokens-limit",
+    )
+    TOKENS_REMAINING_HEADERS = (
+        "x-ratelimit-remaining-tokens",
+        "anthropic-ratelimit-tokens-remaining",
+    )
+
+    __SHARED: Dict[Tuple[str, ...], "RateLimiter"] = {}
+    __SHARED_LOCK = threading.Lock()
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+    ) -> None:
+        self.lock = threading.Lock()
+        self.requests = (
+            _Bucket(requests_per_minute * self.HEADROOM)
+            if requests_per_minute
+            else None
+        )
+        self.tokens = (
+            _Bucket(tokens_per_minute * self.HEADROOM) if tokens_per_minute else None
+        )
+        self.paused_until = 0.0
+        self.last_refill = time.monotonic()
+
+    @classmethod
+    def get_shared(
+        cls,
+        *key: str,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+    ) -> "RateLimiter":
+        """
+        Returns the limiter shared by all the callers using the same key.
+        """
+        with cls.__SHARED_LOCK:
+            if key not in cls.__SHARED:
+                cls.__SHARED[key] = RateLimiter(requests_per_minute, tokens_per_minute)
+            return cls.__SHARED[key]
+
+    def __refill(self, now: float) -> None:
+        elapsed = now - self.last_refill
+        self.last_refill = now
+        for bucket in (self.requests, self.tokens):
+            if bucket is not None:
+                bucket.refill(elapsed)
+
+    def try_acquire(self, tokens: int = 0) -> float:
+        """
+        Reserves one request and `tokens` tokens if the budgets allow it, returning 0.
+        Otherwise, reserves nothing and returns the time to wait before trying again.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.__refill(now)
+
+            wait = max(0.0, self.paused_until - now)
+            if self.requests is not None:
+                wait = max(wait, self.requests.wait_time(1))
+            if self.tokens is not None:
+                wait = max(wait, self.tokens.wait_time(tokens))
+            if wait > 0:
+                return wait
+
+            if self.requests is not None:
+                self.requests.level -= 1
+            if self.tokens is not None:
+                self.tokens.level -= tokens
+            return 0.0
+
+    def acquire(self, tokens: int = 0) -> None:
+        """
+        Blocks until one request and `tokens` tokens are reserved.
+        """
+        while (wait := self.try_acquire(tokens)) > 0:
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: int = 0) -> None:
+        """
+        Waits, without blocking the event loop, until one request and `tokens` tokens are reserved.
+        """
+        while (wait := self.try_acquire(tokens)) > 0:
+            await asyncio.sleep(wait)
+
+    def update(self, headers: Optional[Mapping[str, str]]) -> None:
+        """
+        Adjusts the limits and the remaining budgets from the rate-limit headers of a response.
+        """
+        if not headers:
+            return
+        headers = {k.lower(): v for k, v in headers.items()}
+
+        def get(names: Tuple[str, ...]) -> Optional[float]:
+            for name in names:
+                if name in headers:
+                    try:
+                        return float(headers[name])
+                    except ValueError:
+                        return None
+            return None
+
+        with self.lock:
+            self.__refill(time.monotonic())
+            self.requests = self.__update_bucket(
+                self.requests,
+                get(self.REQUESTS_LIMIT_HEADERS),
+                get(self.REQUESTS_REMAINING_HEADERS),
+            )
+            self.tokens = self.__update_bucket(
+                self.tokens,
+                get(self.TOKENS_LIMIT_HEADERS),
+                get(self.TOKENS_REMAINING_HEADERS),
+            )
+
+            retry_after = headers.get("retry-after")
+            delay = _parse_duration(retry_after) if retry_after else None
+            if delay:
+                self.paused_until = max(self.paused_until, time.monotonic() + delay)
+
+    def __update_bucket(
+        self,
+        bucket: Optional[_Bucket],
+        limit: Optional[float],
+        remaining: Optional[float],
+    ) -> Optional[_Bucket]:
+        if limit:
+            limit = limit * self.HEADROOM
+            if bucket is None:
+                bucket = _Bucket(limit)
+            else:
+                bucket.limit = limit
+                bucket.level = min(bucket.level, limit)
+        if bucket is not None and remaining is not None:
+            # Never spend more than what the provider reports as remaining (minus the headroom)
+            reserve = bucket.limit * (1 - self.HEADROOM) / self.HEADROOM
+            bucket.level = min(bucket.level, remaining - reserve)
+        return bucket
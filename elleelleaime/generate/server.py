@@ -0,0 +1,149 @@
+from dataclasses import dataclass, field
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, List, Optional, Tuple, Union
+
+from elleelleaime.generate.strategies.strategy import PatchGenerationStrategy
+
+import os
+import queue
+import getpass
+import logging
+import tempfile
+import threading
+
+
+# Unix socket in a directory only accessible by the user
+DEFAULT_ADDRESS = os.path.join(
+    tempfile.gettempdir(), f"elleelleaime-{getpass.getuser()}", "model-server.sock"
+)
+
+
+def parse_address(address: str) -> Union[str, Tuple[str, int]]:
+    """
+    Parses a server address, either "host:port" (TCP) or the path of a Unix socket.
+    """
+    host, _, port = address.rpartition(":")
+    if host and port.isdigit():
+        return host, int(port)
+    return address
+
+
+@dataclass
+class _Request:
+    prompts: List[str]
+    result: Any = None
+    done: threading.Event = field(default_factory=threading.Event)
+
+
+class ModelServer:
+    """
+    Serves the generations of a single strategy instance (e.g. a HuggingFace model, whose
+    weights are then loaded once) to any number of clients (see ModelServerClient).
+
+    Clients send lists of prompts over a multiprocessing connection and receive the list of
+    their generations, or {"error": ...}. A single generation loop batches the pending
+    requests of all clients together: whenever the model is free, it generates all the
+    queued prompts (up to max_batch_prompts) in one call to the strategy.
+
+    Connections are authenticated with authkey, since requests are unpickled by the server.
+    Unix sockets are only accessible by the user running the server (mode 0600).
+    """
+
+    def __init__(
+        self,
+        strategy: PatchGenerationStrategy,
+        authkey: str,
+        address: str = DEFAULT_ADDRESS,
+        max_batch_prompts: int = 16,
+    ) -> None:
+        self.strategy = strategy
+        self.address = parse_address(address)
+        self.authkey = authkey.encode("utf-8")
+        self.max_batch_prompts = max_batch_prompts
+        self.__queue: "queue.Queue[_Request]" = queue.Queue()
+        self.__ready = threading.Event()
+        self.__closed = False
+
+    def __next_batch(self) -> List[_Request]:
+        requests = [self.__queue.get()]
+        n_prompts = len(requests[0].prompts)
+        while n_prompts < self.max_batch_prompts:
+            try:
+                request = self.__queue.get_nowait()
+            except queue.Empty:
+                break
+            requests.append(request)
+            n_prompts += len(request.prompts)
+        return requests
+
+    def __generation_loop(self) -> None:
+        while True:
+            requests = self.__next_batch()
+            prompts = [prompt for request in requests for prompt in request.prompts]
+            logging.info(
+                f"Generating {len(prompts)} prompts from {len(requests)} requests..."
+            )
+            try:
+                generations = self.strategy.generate(prompts)
+                offset = 0
+                for request in requests:
+                    request.result = generations[offset : offset + len(request.prompts)]
+                    offset += len(request.prompts)
+            except Exception as e:
+                logging.error(f"Failed to generate {len(prompts)} prompts: {e}")
+                for request in requests:
+                    request.result = {"error": f"{type(e).__name__}: {e}"}
+            for request in requests:
+                request.done.set()
+
+    def __handle(self, connection: Connection) -> None:
+        with connection:
+            while True:
+                try:
+                    prompts = connection.recv()
+                except (EOFError, OSError):
+                    return
+                request = _Request(prompts)
+                self.__queue.put(request)
+                request.done.wait()
+                connection.send(request.result)
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until the server accepts connections.
+        """
+        return self.__ready.wait(timeout)
+
+    def serve_forever(self) -> None:
+        threading.Thread(target=self.__generation_loop, daemon=True).start()
+        if isinstance(self.address, str):
+            os.makedirs(
+                os.path.dirname(os.path.abspath(self.address)),
+                mode=0o700,
+                exist_ok=True,
+            )
+        with Listener(self.address, authkey=self.authkey) as listener:
+            if isinstance(self.address, str):
+                os.chmod(self.address, 0o600)
+            self.__ready.set()
+            logging.info(f"Model server listening on {listener.address}")
+            while True:
+                try:
+                    connection = listener.accept()
+                except Exception as e:
+                    logging.warning(f"Rejected connection: {e}")
+                    continue
+                if self.__closed:
+                    connection.close()
+                    return
+                threading.Thread(
+                    target=self.__handle, args=(connection,), daemon=True
+                ).start()
+
+    def close(self) -> None:
+        """
+        Stops accepting connections, by waking up the listener with a last connection.
+        """
+        self.__closed = True
+        if self.__ready.is_set():
+            Client(self.address, authkey=self.authkey).close()
@@ -1,48 +1,108 @@
-from elleelleaime.generate.strategies.strategy import PatchGenerationStrategy
+from elleelleaime.generate.strategies.strategy import BatchPatchGenerationStrategy
+from elleelleaime.generate.rate_limiter import estimate_tokens
 
 from dotenv import load_dotenv
 from typing import Any, List
 
 import os
+import asyncio
+import logging
 import anthropic
 import backoff
 
 
-class AnthropicModels(PatchGenerationStrategy):
+class AnthropicModels(BatchPatchGenerationStrategy):
+    MAX_IN_FLIGHT = 32
+
     def __init__(self, model_name: str, max_tokens: int, **kwargs) -> None:
-        self.model_name = model_name
+        super().__init__(model_name, **kwargs)
         self.max_tokens = max_tokens
         self.temperature = kwargs.get("temperature", 0.0)
-        self.n_samples = kwargs.get("n_samples", 1)
+        self.base_url = kwargs.get("base_url", None)
 
         load_dotenv()
-        self.client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+
+    def _request_parameters(self) -> dict:
+        return {
+            "temperature": self.temperature,
+            "n_samples": self.n_samples,
+            "max_tokens": self.max_tokens,
+            "base_url": self.base_url,
+        }
+
+    def _create_client(self) -> Any:
+        return anthropic.AsyncAnthropic(
+            api_key=os.getenv("ANTHROPIC_API_KEY"), base_url=self.base_url
+        )
 
     @backoff.on_exception(
         backoff.expo,
         Exception,
         max_tries=5,
-        raise_on_giveup=False,
     )
-    def _completions_with_backoff(self, **kwargs):
-        return self.client.messages.create(**kwargs)
-
-    def _generate_impl(self, chunk: List[str]) -> Any:
-        result = []
-
-        for prompt in chunk:
-            result_sample = []
-            for _ in range(self.n_samples):
-                completion = self._completions_with_backoff(
-                    model=self.model_name,
-                    max_tokens=self.max_tokens,
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=self.temperature,
-                )
-                if completion:
-                    result_sample.append(completion.to_dict())
-                else:
-                    result_sample.append(completion)
-            result.append(result_sample)
-
-        return result
+    async def _completions_with_backoff(self, tokens: int = 0, **kwargs):
+        # The raw response exposes the rate-limit headers to the rate limiter
+        response = await self._request(
+            lambda: self._get_client().messages.with_raw_response.create(**kwargs),
+            tokens=tokens,
+        )
+        return response.parse()
+
+    async def _agenerate_prompt(self, prompt: str) -> Any:
+        async def generate_sample(index: int) -> dict:
+            completion = await self._completions_with_backoff(
+                tokens=estimate_tokens(prompt),
+                model=self.model_name,
+                max_tokens=self.max_tokens,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=self.temperature,
+            )
+            return completion.to_dict()
+
+        return await self._agenerate_samples(generate_sample)
+
+    async def _agenerate_batch(self, chunk: List[str]) -> List[Any]:
+        requests = [
+            {
+                "custom_id": f"{i}-{j}",
+                "params": {
+                    "model": self.model_name,
+                    "max_tokens": self.max_tokens,
+                    "messages": [{"role": "user", "content": prompt}],
+                    "temperature": self.temperature,
+                },
+            }
+            for i, prompt in enumerate(chunk)
+            for j in range(self.n_samples)
+        ]
+
+        client = self._get_client()
+        # Anthropic takes the requests inline, the file is kept as a record of the batch
+        self._write_batch_requests(requests)
+        batch = await self._request(
+            lambda: client.messages.batches.create(requests=requests)
+        )
+        batch_id = batch.id
+        logging.info(f"Submitted batch {batch_id} with {len(requests)} requests")
+
+        while batch.processing_status != "ended":
+            await asyncio.sleep(self.batch_poll_interval)
+            batch = await self._request(
+                lambda: client.messages.batches.retrieve(batch_id)
+            )
+        logging.info(f"Batch {batch_id} ended")
+
+        results = {}
+        async for result in await self._request(
+            lambda: client.messages.batches.results(batch_id)
+        ):
+            if result.result.type == "succeeded":
+                results[result.custom_id] = result.result.message.to_dict()
+            else:
+                results[result.custom_id] = {"error": result.result.to_dict()}
+
+        missing = {"error": f"Batch {batch_id} ended without a result"}
+        return [
+            [results.get(f"{i}-{j}", missing) for j in range(self.n_samples)]
+            for i in range(len(chunk))
+        ]
@@ -1,12 +1,12 @@
 import google.api_core
 import google.api_core.exceptions
-from elleelleaime.generate.strategies.strategy import PatchGenerationStrategy
+from elleelleaime.generate.strategies.strategy import AsyncPatchGenerationStrategy
+from elleelleaime.generate.rate_limiter import estimate_tokens
 
 from dotenv import load_dotenv
-from typing import Any, List
+from typing import Any
 
 import os
-import tqdm
 import google.generativeai as genai
 import google
 import backoff
@@ -14,12 +14,10 @@ import backoff
 import google.api
 
 
-class GoogleModels(PatchGenerationStrategy):
+class GoogleModels(AsyncPatchGenerationStrategy):
     def __init__(self, model_name: str, **kwargs) -> None:
-        self.model_name = model_name
-        self.model = genai.GenerativeModel(self.model_name)
+        super().__init__(model_name, **kwargs)
         self.temperature = kwargs.get("temperature", 0.0)
-        self.n_samples = kwargs.get("n_samples", 1)
 
         load_dotenv()
         genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
@@ -29,20 +27,22 @@ class GoogleModels(PatchGenerationStrategy):
             temperature=self.temperature,
         )
 
-    @backoff.on_exception(backoff.expo, google.api_core.exceptions.ResourceExhausted)
-    def __generate_with_backoff(self, prompt: str) -> dict:
-        completion = self.model.generate_content(
-            prompt, generation_config=self.__get_config()
+    def _create_client(self) -> Any:
+        return genai.GenerativeModel(self.model_name)
+
+    @backoff.on_exception(
+        backoff.expo, google.api_core.exceptions.ResourceExhausted, max_tries=5
+    )
+    async def __generate_with_backoff(self, prompt: str) -> dict:
+        completion = await self._request(
+            lambda: self._get_client().generate_content_async(
+                prompt, generation_config=self.__get_config()
+            ),
+            tokens=estimate_tokens(prompt),
         )
         return completion.to_dict()
 
-    def _generate_impl(self, chunk: List[str]) -> Any:
-        result = []
-
-        for prompt in tqdm.tqdm(chunk, "Generating patches for prompt..."):
-            p_results = []
-            for _ in range(self.n_samples):
-                p_results.append(self.__generate_with_backoff(prompt))
-            result.append(p_results)
-
-        return result
+    async def _agenerate_prompt(self, prompt: str) -> Any:
+        return await self._agenerate_samples(
+            lambda _: self.__generate_with_backoff(prompt)
+        )
@@ -0,0 +1,49 @@
+from typing import TYPE_CHECKING, List, Optional
+
+if TYPE_CHECKING:
+    from transformers import BatchEncoding
+    from transformers.tokenization_utils_base import PreTrainedTokenizerBase
+
+
+def length_bucketed_batches(
+    lengths: List[int], batch_size: int, max_batch_tokens: Optional[int] = None
+) -> List[List[int]]:
+    """
+    Groups the indices of the prompts with the given token lengths into batches.
+
+    Prompts are sorted by length, so that prompts of similar lengths are batched together
+    and little left padding is needed. Each batch has at most batch_size prompts and,
+    if max_batch_tokens is given, at most max_batch_tokens tokens once padded
+    (a prompt longer than the budget gets a batch of its own).
+    """
+    batches: List[List[int]] = []
+    batch: List[int] = []
+    for i in sorted(range(len(lengths)), key=lambda i: lengths[i]):
+        # Prompts are sorted, so the padded length of the batch is the length of the new prompt
+        if batch and (
+            len(batch) >= batch_size
+            or (
+                max_batch_tokens is not None
+                and lengths[i] * (len(batch) + 1) > max_batch_tokens
+            )
+        ):
+            batches.append(batch)
+            batch = []
+        batch.append(i)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def tokenize_batch(
+    tokenizer: "PreTrainedTokenizerBase", prompts: List[str]
+) -> "BatchEncoding":
+    """
+    Tokenizes the prompts into a padded batch of tensors (padded on the tokenizer's padding side).
+
+    Each prompt is tokenized on its own, exactly as when measuring its length: some tokenizers
+    only apply their prompt format to single strings (e.g. the CodeLlama tokenizer only builds the
+    <PRE>/<SUF>/<MID> infilling layout from a single prompt containing <FILL_ME>).
+    """
+    encodings = [tokenizer(prompt) for prompt in prompts]
+    return tokenizer.pad(encodings, padding=True, return_tensors="pt")
@@ -1,12 +1,23 @@
 from elleelleaime.generate.strategies.strategy import PatchGenerationStrategy
+from elleelleaime.generate.strategies.models.huggingface.prefix_cache import (
+    expansion_size,
+    prefill_shared_prefix,
+)
+from elleelleaime.generate.strategies.models.huggingface.runtime import (
+    GenerationStats,
+)
+from elleelleaime.generate.strategies.models.huggingface.stopping import (
+    FencedCodeBlockStoppingCriteria,
+)
 from dataclasses import dataclass
 from peft import PeftModel
-from transformers import AutoModelForCausalLM, AutoTokenizer
-from typing import Any, List
+from transformers import AutoModelForCausalLM, AutoTokenizer, StoppingCriteriaList
+from typing import Any, List, Optional
 
 import tqdm
 import torch
 import logging
+import threading
 
 
 @dataclass
@@ -56,6 +67,8 @@ class CodeLLaMAIntruct(PatchGenerationStrategy):
             kwargs.get("generation_strategy", "sampling")
         ]
         self.batch_size = kwargs.get("batch_size", 1)
+        # Prefill each prompt once and share its KV cache across samples and beams
+        self.share_prefix = kwargs.get("share_prefix", True)
         self.generate_settings.num_return_sequences = kwargs.get(
             "num_return_sequences", GenerateSettings.num_return_sequences
         )
@@ -68,31 +81,90 @@ class CodeLLaMAIntruct(PatchGenerationStrategy):
         self.generate_settings.max_length = kwargs.get(
             "max_length", GenerateSettings.max_length
         )
+        # Stop each sequence once its first code block is closed, since only that block is
+        # extracted when evaluating (disable it to evaluate the last code block)
+        self.stop_at_code_block = kwargs.get("stop_at_code_block", True)
+        # Speculative decoding, either with n-grams looked up in the prompt or with a draft model
+        self.prompt_lookup_num_tokens: Optional[int] = kwargs.get(
+            "prompt_lookup_num_tokens", None
+        )
+        self.assistant_model_name: Optional[str] = kwargs.get(
+            "assistant_model_name", None
+        )
+        assert (
+            self.prompt_lookup_num_tokens is None or self.assistant_model_name is None
+        ), "Prompt lookup and draft model decoding cannot be used together"
+        self.speculative = (
+            self.prompt_lookup_num_tokens is not None
+            or self.assistant_model_name is not None
+        )
+        assert (
+            not self.speculative or self.generate_settings.num_beams == 1
+        ), "Speculative decoding does not support beam search"
+        # Greedy speculative decoding would generate the same sequence num_return_sequences times
+        assert (
+            not self.speculative
+            or self.generate_settings.do_sample
+            or self.generate_settings.num_return_sequences == 1
+        ), "Speculative decoding needs sampling to generate more than one sequence"
+
+        self.__model: Any = None
+        self.__tokenizer: Any = None
+        self.__assistant_model: Any = None
+        self.__model_lock = threading.Lock()
 
     def __format_prompt(self, prompt: str) -> str:
         return f"<s>[INST] {prompt} [\\INST]"
 
-    def _generate_impl(self, chunk: List[str]) -> Any:
-        # Load model and tokenizer
-        m = AutoModelForCausalLM.from_pretrained(
-            self.model_name,
-            torch_dtype=torch.bfloat16,
-            device_map="auto",
-        )
-        # Load LoRA adapter if specified
-        if self.adapter_name:
-            m = PeftModel.from_pretrained(m, self.adapter_name)
-            m = m.merge_and_unload()
-        m.eval()
+    def __load_model(self) -> None:
+        """
+        Loads the model, tokenizer and draft model once, on the first generation.
+        """
+        with self.__model_lock:
+            if self.__model is not None:
+                return
+
+            # Load model and tokenizer
+            m = AutoModelForCausalLM.from_pretrained(
+                self.model_name,
+                torch_dtype=torch.bfloat16,
+                device_map="auto",
+            )
+            # Load LoRA adapter if specified
+            if self.adapter_name:
+                m = PeftModel.from_pretrained(m, self.adapter_name)
+                m = m.merge_and_unload()
+            m.eval()
+
+            tok = AutoTokenizer.from_pretrained(self.model_name)
+            tok.pad_token = tok.eos_token
+
+            logging.info(f"Model successfully loaded: {m}")
+
+            # Load the draft model, which must share the tokenizer of the model
+            if self.assistant_model_name:
+                self.__assistant_model = AutoModelForCausalLM.from_pretrained(
+                    self.assistant_model_name,
+                    torch_dtype=torch.bfloat16,
+                    device_map="auto",
+                )
+                self.__assistant_model.eval()
+                logging.info(
+                    f"Draft model successfully loaded: {self.assistant_model_name}"
+                )
 
-        tok = AutoTokenizer.from_pretrained(self.model_name)
-        tok.pad_token = tok.eos_token
+            self.__tokenizer = tok
+            self.__model = m
 
-        logging.info(f"Model successfully loaded: {m}")
+    def _generate_impl(self, chunk: List[str]) -> Any:
+        self.__load_model()
+        m, tok = self.__model, self.__tokenizer
+        assistant_model = self.__assistant_model
 
         # Generate patches
         logging.info(f"Starting generation: {self.generate_settings}")
         result = []
+        stats = GenerationStats()
         for prompt in tqdm.tqdm(chunk, "Generating patches...", total=len(chunk)):
             with torch.no_grad():
                 # Tokenize prompt
@@ -109,21 +181,68 @@ class CodeLLaMAIntruct(PatchGenerationStrategy):
 
                 # Generate patch
                 inputs = inputs.to("cuda")
-                outputs = m.generate(
-                    **inputs,
-                    max_length=self.generate_settings.max_length,
-                    num_beams=self.generate_settings.num_beams,
-                    num_return_sequences=self.generate_settings.num_return_sequences,
-                    early_stopping=self.generate_settings.early_stopping,
-                    do_sample=self.generate_settings.do_sample,
-                    temperature=self.generate_settings.temperature,
-                    use_cache=True,
+                stopping_criteria = (
+                    StoppingCriteriaList(
+                        [FencedCodeBlockStoppingCriteria(tok, input_length)]
+                    )
+                    if self.stop_at_code_block
+                    else None
                 )
+                start = stats.start()
+                if self.speculative:
+                    # Assisted generation only supports one sequence per call
+                    outputs = [
+                        m.generate(
+                            **inputs,
+                            assistant_model=assistant_model,
+                            prompt_lookup_num_tokens=self.prompt_lookup_num_tokens,
+                            stopping_criteria=stopping_criteria,
+                            max_length=self.generate_settings.max_length,
+                            do_sample=self.generate_settings.do_sample,
+                            temperature=self.generate_settings.temperature,
+                            use_cache=True,
+                            pad_token_id=tok.pad_token_id,
+                        )[0]
+                        for _ in range(self.generate_settings.num_return_sequences)
+                    ]
+                else:
+                    past_key_values = (
+                        prefill_shared_prefix(
+                            m,
+                            inputs,
+                            expansion_size(
+                                self.generate_settings.num_beams,
+                                self.generate_settings.num_return_sequences,
+                                self.generate_settings.do_sample,
+                            ),
+                        )
+                        if self.share_prefix
+                        else None
+                    )
+                    outputs = m.generate(
+                        **inputs,
+                        past_key_values=past_key_values,
+                        stopping_criteria=stopping_criteria,
+                        max_length=self.generate_settings.max_length,
+                        num_beams=self.generate_settings.num_beams,
+                        num_return_sequences=self.generate_settings.num_return_sequences,
+                        early_stopping=self.generate_settings.early_stopping,
+                        do_sample=self.generate_settings.do_sample,
+                        temperature=self.generate_settings.temperature,
+                        use_cache=True,
+                        pad_token_id=tok.pad_token_id,
+                    )
+                candidate_tokens = [
+                    int((output[input_length:] != tok.pad_token_id).sum().item())
+                    for output in outputs
+                ]
+                stats.add(start, sum(candidate_tokens), candidate_tokens)
 
                 # Decode outputs and save
                 responses = tok.batch_decode(outputs, skip_special_tokens=True)
                 responses = [r.split("[\\INST]")[1] for r in responses]
                 result.append(responses)
+        stats.log(self.__class__.__name__)
 
         # Return results
         return result
@@ -1,4 +1,14 @@
 from elleelleaime.generate.strategies.strategy import PatchGenerationStrategy
+from elleelleaime.generate.strategies.models.huggingface.batching import (
+    length_bucketed_batches,
+    tokenize_batch,
+)
+from elleelleaime.generate.strategies.models.huggingface.runtime import (
+    GenerationStats,
+    from_pretrained_kwargs,
+    quantize_model,
+    setup_threads,
+)
 from dataclasses import dataclass
 from transformers import AutoModelForCausalLM, AutoTokenizer
 from transformers.tokenization_utils_base import PreTrainedTokenizerBase
@@ -64,6 +74,12 @@ class DeepSeekFIM(PatchGenerationStrategy):
         self.generate_settings.temperature = kwargs.get(
             "temperature", GenerateSettings.temperature
         )
+        # Batching settings: prompts per batch, and padded prompt tokens per batch
+        self.batch_size = kwargs.get("batch_size", 1)
+        self.max_batch_tokens = kwargs.get("max_batch_tokens", None)
+        # Runtime settings: weight-only quantization (int8/int4) and intra-op threads
+        self.quantization = kwargs.get("quantization", None)
+        self.num_threads = kwargs.get("num_threads", None)
         self.__load_model()
 
     def __load_model(self):
@@ -71,8 +87,12 @@ class DeepSeekFIM(PatchGenerationStrategy):
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         self.context_size = self.generate_settings.max_length
 
+        setup_threads(self.num_threads)
+
         # Setup kwargs
-        kwargs = dict(
+        kwargs = from_pretrained_kwargs(
+            self.device,
+            self.quantization,
             device_map="auto",
         )
 
@@ -83,13 +103,21 @@ class DeepSeekFIM(PatchGenerationStrategy):
             self.__TOKENIZER: PreTrainedTokenizerBase = AutoTokenizer.from_pretrained(
                 self.model_name
             )
+            # Batched prompts are left padded, so that generation continues all of them
+            self.__TOKENIZER.padding_side = "left"
+            if self.__TOKENIZER.pad_token is None:
+                self.__TOKENIZER.pad_token = self.__TOKENIZER.eos_token
             self.__MODEL = AutoModelForCausalLM.from_pretrained(
                 self.model_name, **kwargs
             )
+            self.__MODEL = quantize_model(self.__MODEL, self.device, self.quantization)
             self.__MODEL.eval()
             self.__MODELS_LOADED = True
 
-    def __generate_patch(self, prompt: str) -> Optional[List[str]]:
+    def __prompt_length(self, prompt: str) -> Optional[int]:
+        """
+        Returns the number of tokens of the prompt, or None if the prompt cannot be generated.
+        """
         # Check if the prompt is valid
         if not (
             prompt.startswith("<｜fim▁begin｜>")
@@ -101,36 +129,71 @@ class DeepSeekFIM(PatchGenerationStrategy):
             logging.warning(f"Invalid prompt: {prompt}")
             return None
 
-        inputs = self.__TOKENIZER(prompt, return_tensors="pt").to(self.device)
-
-        input_len = inputs["input_ids"].shape[1]
+        input_len = len(self.__TOKENIZER(prompt)["input_ids"])
         if input_len >= self.context_size:
             logging.warning(
                 f"warning: input_len ({input_len}) is greater than the context window {self.context_size}"
             )
             return None
 
+        return input_len
+
+    def __generate_batch(
+        self, prompts: List[str], stats: GenerationStats
+    ) -> List[List[str]]:
+        inputs = tokenize_batch(self.__TOKENIZER, prompts).to(self.device)
+
+        # Prompts are left-padded to the longest one, whose length bounds the new tokens
+        input_len = inputs["input_ids"].shape[1]
+        start = stats.start()
         with torch.no_grad():
             generated_ids = self.__MODEL.generate(
                 **inputs,
-                max_length=self.generate_settings.max_length,
+                max_new_tokens=self.generate_settings.max_length - input_len,
                 num_beams=self.generate_settings.num_beams,
                 num_return_sequences=self.generate_settings.num_return_sequences,
                 early_stopping=self.generate_settings.early_stopping,
                 do_sample=self.generate_settings.do_sample,
                 temperature=self.generate_settings.temperature,
                 use_cache=True,
+                pad_token_id=self.__TOKENIZER.pad_token_id,
             )
 
         fillings_ids = generated_ids[:, input_len:]
+        stats.add(
+            start, int((fillings_ids != self.__TOKENIZER.pad_token_id).sum().item())
+        )
         fillings = self.__TOKENIZER.batch_decode(fillings_ids, skip_special_tokens=True)
 
-        # Reconstruct the function with the generated fillings
-        prompt = prompt.replace("<｜fim▁begin｜>", "").replace("<｜fim▁end｜>", "")
-        return [prompt.replace("<｜fim▁hole｜>", filling) for filling in fillings]
+        # The sequences of each prompt are contiguous in the output
+        n = self.generate_settings.num_return_sequences
+        result = []
+        for i, prompt in enumerate(prompts):
+            # Reconstruct the function with the generated fillings
+            prompt = prompt.replace("<｜fim▁begin｜>", "").replace("<｜fim▁end｜>", "")
+            result.append(
+                [
+                    prompt.replace("<｜fim▁hole｜>", filling)
+                    for filling in fillings[i * n : (i + 1) * n]
+                ]
+            )
+        return result
 
     def _generate_impl(self, prompts: List[str]) -> Any:
-        return [
-            self.__generate_patch(p)
-            for p in tqdm.tqdm(prompts, "Generating patches...", total=len(prompts))
-        ]
+        result: List[Optional[List[str]]] = [None] * len(prompts)
+
+        lengths = [self.__prompt_length(prompt) for prompt in prompts]
+        valid = [(i, length) for i, length in enumerate(lengths) if length is not None]
+        batches = length_bucketed_batches(
+            [length for _, length in valid], self.batch_size, self.max_batch_tokens
+        )
+
+        stats = GenerationStats()
+        for batch in tqdm.tqdm(batches, "Generating patches..."):
+            indices = [valid[j][0] for j in batch]
+            generations = self.__generate_batch([prompts[i] for i in indices], stats)
+            for i, generation in zip(indices, generations):
+                result[i] = generation
+        stats.log(self.__class__.__name__)
+
+        return result
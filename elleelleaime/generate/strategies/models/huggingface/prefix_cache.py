@@ -0,0 +1,49 @@
+from transformers import DynamicCache, PreTrainedModel
+from transformers.tokenization_utils_base import BatchEncoding
+from typing import Optional
+
+import torch
+
+
+def expansion_size(num_beams: int, num_return_sequences: int, do_sample: bool) -> int:
+    """
+    Returns the number of sequences `generate` expands each prompt into, or 0 if the
+    prompt cache cannot be shared for these settings (beam sampling).
+    """
+    if num_beams > 1:
+        return 0 if do_sample else num_beams
+    return num_return_sequences
+
+
+def prefill_shared_prefix(
+    model: PreTrainedModel, inputs: BatchEncoding, expand_size: int
+) -> Optional[DynamicCache]:
+    """
+    Runs the prefill of the prompts once and returns their KV cache, repeated for the
+    expand_size sequences (samples or beams) that `generate` derives from each prompt.
+
+    Passing the cache to `generate` as `past_key_values`, with the (unexpanded) inputs,
+    makes it only process the last prompt token of each sequence, instead of prefilling
+    every prompt expand_size times.
+    """
+    input_ids = inputs["input_ids"]
+    if expand_size <= 1 or input_ids.shape[1] < 2:
+        return None
+
+    # The last prompt token is left for generate, which needs it to produce the first logits
+    attention_mask = inputs["attention_mask"][:, :-1]
+    position_ids = attention_mask.long().cumsum(-1) - 1
+    position_ids.masked_fill_(attention_mask == 0, 1)
+
+    # Only the decoder is run, the prefill does not need the logits
+    cache = DynamicCache()
+    with torch.no_grad():
+        model.get_decoder()(
+            input_ids=input_ids[:, :-1],
+            attention_mask=attention_mask,
+            position_ids=position_ids,
+            past_key_values=cache,
+            use_cache=True,
+        )
+    cache.batch_repeat_interleave(expand_size)
+    return cache
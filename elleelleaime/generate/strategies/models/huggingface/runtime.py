@@ -0,0 +1,129 @@
+from dataclasses import dataclass, field
+from transformers import BitsAndBytesConfig, PreTrainedModel, TorchAoConfig
+from typing import List, Optional, Sequence
+
+import time
+import statistics
+import torch
+import logging
+import resource
+
+
+# Supported weight-only quantizations of the HuggingFace strategies
+QUANTIZATIONS = (None, "int8", "int4")
+
+
+def setup_threads(num_threads: Optional[int]) -> None:
+    """
+    Sets the number of threads used for intra-op parallelism (e.g. the matmuls on CPU).
+    """
+    if num_threads is not None:
+        torch.set_num_threads(num_threads)
+    logging.info(f"Using {torch.get_num_threads()} threads for intra-op parallelism")
+
+
+def from_pretrained_kwargs(
+    device: str, quantization: Optional[str], **default_kwargs
+) -> dict:
+    """
+    Returns the `from_pretrained` kwargs loading the model with the given weight-only quantization,
+    or the default kwargs if the model is not quantized.
+
+    On GPU, weights are quantized with bitsandbytes. On CPU, int8 weights are dynamically
+    quantized once loaded (see quantize_model), and int4 weights are quantized with torchao,
+    which then needs to be installed.
+    """
+    assert (
+        quantization in QUANTIZATIONS
+    ), f"Unknown quantization {quantization}, expected one of {QUANTIZATIONS}"
+
+    if quantization is None:
+        return default_kwargs
+
+    if device == "cuda":
+        return dict(
+            device_map="auto",
+            quantization_config=BitsAndBytesConfig(
+                load_in_8bit=quantization == "int8",
+                load_in_4bit=quantization == "int4",
+                bnb_4bit_compute_dtype=torch.bfloat16,
+            ),
+        )
+
+    if quantization == "int8":
+        # Dynamic quantization applies to float32 weights
+        return dict(torch_dtype=torch.float32, low_cpu_mem_usage=True)
+
+    # Optional dependency, only needed for int4 on CPU
+    from torchao.dtypes import Int4CPULayout
+
+    return dict(
+        torch_dtype=torch.bfloat16,
+        low_cpu_mem_usage=True,
+        quantization_config=TorchAoConfig(
+            "int4_weight_only", group_size=128, layout=Int4CPULayout()
+        ),
+    )
+
+
+def quantize_model(
+    model: PreTrainedModel, device: str, quantization: Optional[str]
+) -> PreTrainedModel:
+    """
+    Quantizes the loaded model, for the quantizations that are not applied when loading.
+    """
+    if device == "cpu" and quantization == "int8":
+        torch.ao.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+        )
+    return model
+
+
+def peak_rss_mb() -> float:
+    """
+    Returns the peak resident memory of the process, in MiB.
+    """
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+@dataclass
+class GenerationStats:
+    """
+    Throughput of the generation calls of a run, with the latency of each call and,
+    when given, the number of tokens generated for each candidate.
+    """
+
+    tokens: int = 0
+    seconds: float = 0.0
+    latencies: List[float] = field(default_factory=list)
+    candidate_tokens: List[int] = field(default_factory=list)
+
+    def start(self) -> float:
+        return time.perf_counter()
+
+    def add(
+        self, start: float, tokens: int, candidate_tokens: Sequence[int] = ()
+    ) -> None:
+        latency = time.perf_counter() - start
+        self.latencies.append(latency)
+        self.seconds += latency
+        self.tokens += tokens
+        self.candidate_tokens.extend(candidate_tokens)
+
+    def log(self, name: str) -> None:
+        tokens_per_second = self.tokens / self.seconds if self.seconds > 0 else 0.0
+        logging.info(
+            f"{name}: generated {self.tokens} tokens in {self.seconds:.1f}s "
+            f"({tokens_per_second:.1f} tokens/s), peak resident memory {peak_rss_mb():.0f} MiB"
+        )
+        if self.latencies:
+            logging.info(
+                f"{name}: median latency {statistics.median(self.latencies):.2f}s "
+                f"over {len(self.latencies)} generation calls"
+            )
+        if self.candidate_tokens:
+            logging.info(
+                f"{name}: median {statistics.median(self.candidate_tokens):.0f} tokens "
+                f"generated per candidate over {len(self.candidate_tokens)} candidates"
+            )
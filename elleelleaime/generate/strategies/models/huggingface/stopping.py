@@ -0,0 +1,39 @@
+from transformers import StoppingCriteria
+from transformers.tokenization_utils_base import PreTrainedTokenizerBase
+
+import re
+import torch
+
+
+class FencedCodeBlockStoppingCriteria(StoppingCriteria):
+    """
+    Stops each sequence once its generation contains a complete ```-fenced code block,
+    since InstructEvaluationStrategy only extracts the first code block of a message.
+
+    The generated text of a sequence is only decoded when its last tokens contain a backtick,
+    so the check stays cheap while no fence is being generated.
+    """
+
+    # Same code block pattern as InstructEvaluationStrategy.extract_patch_from_message
+    CODE_BLOCK = re.compile(r"```(\w*)\n([\s\S]*?)\n```")
+    # Number of tokens decoded to look for a backtick
+    TAIL_TOKENS = 4
+
+    def __init__(self, tokenizer: PreTrainedTokenizerBase, prompt_length: int) -> None:
+        self.tokenizer = tokenizer
+        self.prompt_length = prompt_length
+
+    def __call__(
+        self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs
+    ) -> torch.BoolTensor:
+        done = torch.zeros(
+            input_ids.shape[0], dtype=torch.bool, device=input_ids.device
+        )
+        generated_ids = input_ids[:, self.prompt_length :]
+        for i, ids in enumerate(generated_ids):
+            tail = self.tokenizer.decode(ids[-self.TAIL_TOKENS :])
+            if "`" not in tail:
+                continue
+            text = self.tokenizer.decode(ids, skip_special_tokens=True)
+            done[i] = self.CODE_BLOCK.search(text) is not None
+        return done
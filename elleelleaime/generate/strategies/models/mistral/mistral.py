@@ -1,21 +1,25 @@
-from elleelleaime.generate.strategies.strategy import PatchGenerationStrategy
+from elleelleaime.generate.strategies.strategy import AsyncPatchGenerationStrategy
+from elleelleaime.generate.rate_limiter import estimate_tokens
 
 from dotenv import load_dotenv
-from typing import Any, List
+from typing import Any
 
 import os
 import mistralai
 import backoff
 
 
-class MistralModels(PatchGenerationStrategy):
+class MistralModels(AsyncPatchGenerationStrategy):
+    SUPPORTS_SEED = True
+
     def __init__(self, model_name: str, **kwargs) -> None:
-        self.model_name = model_name
+        super().__init__(model_name, **kwargs)
         self.temperature = kwargs.get("temperature", 0.0)
-        self.n_samples = kwargs.get("n_samples", 1)
 
         load_dotenv()
-        self.client = mistralai.Mistral(os.getenv("MISTRAL_API_KEY", None))
+
+    def _create_client(self) -> Any:
+        return mistralai.Mistral(os.getenv("MISTRAL_API_KEY", None))
 
     @backoff.on_exception(
         backoff.expo,
@@ -24,22 +28,22 @@ class MistralModels(PatchGenerationStrategy):
             mistralai.models.HTTPValidationError,
             AssertionError,
         ),
+        max_tries=5,
     )
-    def _completions_with_backoff(self, **kwargs):
-        response = self.client.chat.complete(**kwargs)
+    async def _completions_with_backoff(self, tokens: int = 0, **kwargs):
+        response = await self._request(
+            lambda: self._get_client().chat.complete_async(**kwargs), tokens=tokens
+        )
         assert response is not None
         return response
 
-    def _generate_impl(self, chunk: List[str]) -> Any:
-        result = []
-
-        for prompt in chunk:
-            completion = self._completions_with_backoff(
-                model=self.model_name,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=self.temperature,
-                n=self.n_samples,
-            )
-            result.append(completion.model_dump())
-
-        return result
+    async def _agenerate_prompt(self, prompt: str) -> Any:
+        completion = await self._completions_with_backoff(
+            tokens=estimate_tokens(prompt),
+            model=self.model_name,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=self.temperature,
+            n=self.n_samples,
+            random_seed=self.seed,
+        )
+        return completion.model_dump()
@@ -1,52 +1,151 @@
-from elleelleaime.generate.strategies.strategy import PatchGenerationStrategy
+from elleelleaime.generate.strategies.strategy import BatchPatchGenerationStrategy
+from elleelleaime.generate.rate_limiter import estimate_tokens
 
 from dotenv import load_dotenv
 from typing import Any, List
 
 import os
+import json
+import asyncio
+import logging
 import openai
 import backoff
 
 
-class OpenAIChatCompletionModels(PatchGenerationStrategy):
+class OpenAIChatCompletionModels(BatchPatchGenerationStrategy):
+    MAX_IN_FLIGHT = 64
+    SUPPORTS_SEED = True
+
     def __init__(self, model_name: str, **kwargs) -> None:
-        self.model_name = model_name
+        super().__init__(model_name, **kwargs)
         self.temperature = kwargs.get("temperature", 0.0)
-        self.n_samples = kwargs.get("n_samples", 1)
         self.reasoning_effort = kwargs.get("reasoning_effort", "high")
         self.base_url = kwargs.get("base_url", None)
         self.batching = kwargs.get("batching", True)
 
         load_dotenv()
         openai.api_key = os.getenv("OPENAI_API_KEY")
-        self.client = openai.OpenAI(api_key=openai.api_key, base_url=self.base_url)
-
-    @backoff.on_exception(backoff.expo, Exception)
-    def _completions_with_backoff(self, **kwargs):
-        return self.client.chat.completions.create(**kwargs)
-
-    def _generate_impl(self, chunk: List[str]) -> Any:
-        result = []
-
-        for prompt in chunk:
-            if not self.batching:
-                result_sample = []
-                for _ in range(self.n_samples):
-                    completion = self._completions_with_backoff(
-                        model=self.model_name,
-                        messages=[{"role": "user", "content": prompt}],
-                        temperature=self.temperature,
-                        reasoning_effort=self.reasoning_effort,
-                    )
-                    result_sample.append(completion.to_dict())
-                result.append(result_sample)
-            else:
-                completion = self._completions_with_backoff(
+
+    def _request_parameters(self) -> dict:
+        return {
+            "temperature": self.temperature,
+            "n_samples": self.n_samples,
+            "reasoning_effort": self.reasoning_effort,
+            "batching": self.batching,
+            "base_url": self.base_url,
+            # Without batching, sample j is requested with seed + j
+            "seed_per_sample": not self.batching,
+        }
+
+    def _create_client(self) -> Any:
+        return openai.AsyncOpenAI(api_key=openai.api_key, base_url=self.base_url)
+
+    def __seed_kwargs(self, index: int = 0) -> dict:
+        seed = self._sample_seed(index)
+        return {"seed": seed} if seed is not None else {}
+
+    @backoff.on_exception(backoff.expo, Exception, max_tries=5)
+    async def _completions_with_backoff(self, tokens: int = 0, **kwargs):
+        # The raw response exposes the rate-limit headers to the rate limiter
+        response = await self._request(
+            lambda: self._get_client().chat.completions.with_raw_response.create(
+                **kwargs
+            ),
+            tokens=tokens,
+        )
+        return response.parse()
+
+    async def _agenerate_prompt(self, prompt: str) -> Any:
+        if not self.batching:
+
+            async def generate_sample(index: int) -> dict:
+                completion = await self._completions_with_backoff(
+                    tokens=estimate_tokens(prompt),
                     model=self.model_name,
                     messages=[{"role": "user", "content": prompt}],
                     temperature=self.temperature,
-                    n=self.n_samples,
+                    reasoning_effort=self.reasoning_effort,
+                    **self.__seed_kwargs(index),
                 )
-                result.append(completion.to_dict())
+                return completion.to_dict()
+
+            return await self._agenerate_samples(generate_sample)
+        else:
+            completion = await self._completions_with_backoff(
+                tokens=estimate_tokens(prompt),
+                model=self.model_name,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=self.temperature,
+                n=self.n_samples,
+                **self.__seed_kwargs(),
+            )
+            return completion.to_dict()
+
+    async def _agenerate_batch(self, chunk: List[str]) -> List[Any]:
+        # One request per sample, or one request with n samples when batching
+        n_requests = 1 if self.batching else self.n_samples
+        requests = []
+        for i, prompt in enumerate(chunk):
+            body = {
+                "model": self.model_name,
+                "messages": [{"role": "user", "content": prompt}],
+                "temperature": self.temperature,
+            }
+            if self.batching:
+                body["n"] = self.n_samples
+            else:
+                body["reasoning_effort"] = self.reasoning_effort
+            for j in range(n_requests):
+                requests.append(
+                    {
+                        "custom_id": f"{i}-{j}",
+                        "method": "POST",
+                        "url": "/v1/chat/completions",
+                        "body": {**body, **self.__seed_kwargs(j)},
+                    }
+                )
+
+        client = self._get_client()
+        batch_path = self._write_batch_requests(requests)
+        batch_file = await self._request(
+            lambda: client.files.create(file=batch_path, purpose="batch")
+        )
+        batch = await self._request(
+            lambda: client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h",
+            )
+        )
+        batch_id = batch.id
+        logging.info(f"Submitted batch {batch_id} with {len(requests)} requests")
+
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            await asyncio.sleep(self.batch_poll_interval)
+            batch = await self._request(lambda: client.batches.retrieve(batch_id))
+        logging.info(f"Batch {batch_id} {batch.status}")
+
+        # Successful requests are in the output file, failed ones in the error file
+        results = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            content = await self._request(lambda: client.files.content(file_id))
+            for line in content.text.splitlines():
+                if not line.strip():
+                    continue
+                result = json.loads(line)
+                response = result.get("response") or {}
+                if response.get("status_code") == 200:
+                    results[result["custom_id"]] = response["body"]
+                else:
+                    results[result["custom_id"]] = {
+                        "error": result.get("error") or response.get("body")
+                    }
 
-        return result
+        missing = {"error": f"Batch {batch_id} {batch.status} without a result"}
+        generations = []
+        for i in range(len(chunk)):
+            samples = [results.get(f"{i}-{j}", missing) for j in range(n_requests)]
+            generations.append(samples[0] if self.batching else samples)
+        return generations
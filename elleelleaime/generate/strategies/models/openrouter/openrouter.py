@@ -1,20 +1,22 @@
-import requests.exceptions
-from elleelleaime.generate.strategies.strategy import PatchGenerationStrategy
+from elleelleaime.generate.strategies.strategy import AsyncPatchGenerationStrategy
+from elleelleaime.generate.rate_limiter import estimate_tokens
 
 from dotenv import load_dotenv
-from typing import Any, List
+from typing import Any
 
 import os
-import requests
+import httpx
 import json
 import backoff
 
 
-class OpenRouterModels(PatchGenerationStrategy):
+class OpenRouterModels(AsyncPatchGenerationStrategy):
+    MAX_IN_FLIGHT = 64
+    SUPPORTS_SEED = True
+
     def __init__(self, model_name: str, **kwargs) -> None:
-        self.model_name = model_name
+        super().__init__(model_name, **kwargs)
         self.temperature = kwargs.get("temperature", 0.0)
-        self.n_samples = kwargs.get("n_samples", 1)
         self.include_reasoning = kwargs.get("include_reasoning", True)
         self.provider = kwargs.get("provider", None)
         self.provider_args = {
@@ -26,15 +28,19 @@ class OpenRouterModels(PatchGenerationStrategy):
         load_dotenv()
         self.openrouter_api_key = os.getenv("OPENROUTER_API_KEY")
 
-    @backoff.on_exception(
-        backoff.expo,
-        (requests.exceptions.RequestException, json.JSONDecodeError, Exception),
-        max_tries=5,
-        raise_on_giveup=False,
-    )
-    def _completions_with_backoff(self, **kwargs):
-        response = requests.post(
-            url="https://openrouter.ai/api/v1/chat/completions",
+    def _request_parameters(self) -> dict:
+        return {
+            "temperature": self.temperature,
+            "n_samples": self.n_samples,
+            "include_reasoning": self.include_reasoning,
+            "provider": self.provider,
+            # Sample j is requested with seed + j
+            "seed_per_sample": True,
+        }
+
+    def _create_client(self) -> Any:
+        return httpx.AsyncClient(
+            base_url="https://openrouter.ai/api/v1",
             headers={
                 "Authorization": f"Bearer {self.openrouter_api_key}",
                 # For including your app on openrouter.ai rankings.
@@ -42,7 +48,21 @@ class OpenRouterModels(PatchGenerationStrategy):
                 # Shows in rankings on openrouter.ai.
                 "X-Title": f"RepairBench",
             },
-            data=json.dumps(kwargs),
+            timeout=None,
+        )
+
+    @backoff.on_exception(
+        backoff.expo,
+        (httpx.HTTPError, json.JSONDecodeError, Exception),
+        max_tries=5,
+    )
+    async def _completions_with_backoff(self, tokens: int = 0, **kwargs):
+        response = await self._request(
+            lambda: self._get_client().post(
+                "/chat/completions",
+                content=json.dumps(kwargs),
+            ),
+            tokens=tokens,
         )
 
         response = response.json()
@@ -52,22 +72,22 @@ class OpenRouterModels(PatchGenerationStrategy):
 
         return response
 
-    def _generate_impl(self, chunk: List[str]) -> Any:
-        result = []
+    async def _agenerate_prompt(self, prompt: str) -> Any:
+        kwargs = {
+            "model": self.model_name,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": self.temperature,
+            "include_reasoning": self.include_reasoning,
+            "provider": self.provider_args,
+        }
+        kwargs = {k: v for k, v in kwargs.items() if v is not None}
 
-        for prompt in chunk:
-            result_sample = []
-            for _ in range(self.n_samples):
-                kwargs = {
-                    "model": self.model_name,
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": self.temperature,
-                    "include_reasoning": self.include_reasoning,
-                    "provider": self.provider_args,
-                }
-                kwargs = {k: v for k, v in kwargs.items() if v}
-                completion = self._completions_with_backoff(**kwargs)
-                result_sample.append(completion)
-            result.append(result_sample)
+        async def generate_sample(index: int) -> dict:
+            seed = self._sample_seed(index)
+            return await self._completions_with_backoff(
+                tokens=estimate_tokens(prompt),
+                **kwargs,
+                **({"seed": seed} if seed is not None else {}),
+            )
 
-        return result
+        return await self._agenerate_samples(generate_sample)
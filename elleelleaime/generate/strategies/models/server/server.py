@@ -0,0 +1,47 @@
+from elleelleaime.generate.strategies.strategy import PatchGenerationStrategy
+from elleelleaime.generate.server import parse_address
+
+from dotenv import load_dotenv
+from multiprocessing.connection import Client, Connection
+from typing import Any, List, Optional
+
+import os
+import threading
+
+
+class ModelServerClient(PatchGenerationStrategy):
+    """
+    Generates with a model served by a ModelServer (see serve_model.py), so that all the
+    workers share the weights loaded once by the server, and their prompts are batched together.
+
+    Connections are authenticated with the authkey kwarg, or the MODEL_SERVER_AUTHKEY
+    environment variable, which must match the authkey of the server.
+    """
+
+    def __init__(self, address: str, **kwargs) -> None:
+        self.address = parse_address(address)
+
+        load_dotenv()
+        authkey = kwargs.get("authkey", os.getenv("MODEL_SERVER_AUTHKEY"))
+        if not authkey:
+            raise ValueError(
+                "Missing authkey for the model server, set MODEL_SERVER_AUTHKEY to the key of serve_model.py"
+            )
+        self.authkey = authkey.encode("utf-8")
+        self.__connection: Optional[Connection] = None
+        self.__lock = threading.Lock()
+
+    def _generate_impl(self, chunk: List[str]) -> Any:
+        with self.__lock:
+            if self.__connection is None:
+                self.__connection = Client(self.address, authkey=self.authkey)
+            try:
+                self.__connection.send(chunk)
+                result = self.__connection.recv()
+            except (EOFError, OSError):
+                self.__connection = None
+                raise
+
+        if isinstance(result, dict) and "error" in result:
+            raise RuntimeError(f"Model server failed to generate: {result['error']}")
+        return result
@@ -1,4 +1,7 @@
-from elleelleaime.generate.strategies.strategy import PatchGenerationStrategy
+from elleelleaime.generate.strategies.strategy import (
+    PatchGenerationStrategy,
+    AsyncPatchGenerationStrategy,
+)
 from elleelleaime.generate.strategies.models.openai.openai import (
     OpenAIChatCompletionModels,
 )
@@ -23,6 +26,9 @@ from elleelleaime.generate.strategies.models.mistral.mistral import (
 from elleelleaime.generate.strategies.models.huggingface.deepseek.deepseek_fim import (
     DeepSeekFIM,
 )
+from elleelleaime.generate.strategies.models.server.server import (
+    ModelServerClient,
+)
 
 from typing import Tuple
 
@@ -43,8 +49,20 @@ class PatchGenerationStrategyRegistry:
         "anthropic": (AnthropicModels, ("model_name", "max_tokens")),
         "mistral": (MistralModels, ("model_name",)),
         "deepseek-fim": (DeepSeekFIM, ("model_name",)),
+        "model-server": (ModelServerClient, ("address",)),
     }
 
+    @classmethod
+    def is_async(cls, name: str) -> bool:
+        """
+        Returns whether the strategy generates with asyncio (see AsyncPatchGenerationStrategy).
+        """
+        if name.lower().strip() not in cls.__MODELS:
+            raise ValueError(f"Unknown strategy {name}")
+
+        strategy_class, _ = cls.__MODELS[name.lower().strip()]
+        return issubclass(strategy_class, AsyncPatchGenerationStrategy)
+
     @classmethod
     def get_generation(cls, name: str, **kwargs) -> PatchGenerationStrategy:
         if name.lower().strip() not in cls.__MODELS:
@@ -1,6 +1,17 @@
 from abc import ABC, abstractmethod
 
-from typing import List, Any, final
+from typing import Awaitable, Callable, List, Any, Mapping, Optional, TypeVar, final
+from pathlib import Path
+
+from elleelleaime.generate.rate_limiter import RateLimiter
+from elleelleaime.core.caching.generation_cache import GenerationCache
+
+import asyncio
+import logging
+import tempfile
+import json
+
+T = TypeVar("T")
 
 
 class PatchGenerationStrategy(ABC):
@@ -28,3 +39,296 @@ class PatchGenerationStrategy(ABC):
         :return: A tuple containing the generation results.
         """
         return self._generate_impl(chunk)
+
+
+class AsyncPatchGenerationStrategy(PatchGenerationStrategy):
+    """
+    Base class for strategies backed by remote APIs, which generate with asyncio.
+
+    At most `max_in_flight` requests (per strategy instance) are in flight at any time,
+    so a single event loop can keep many requests going without one thread per request.
+    Clients are created per event loop, since async clients cannot be shared across loops.
+
+    Requests are also paced by a RateLimiter shared by all the instances of the same strategy
+    and model, configured with the requests_per_minute/tokens_per_minute kwargs and adjusted
+    from the rate-limit headers of the responses.
+
+    The n_samples samples of a prompt are generated concurrently (see _agenerate_samples),
+    with at most max_concurrent_samples (default: all of them) in flight per prompt.
+
+    Strategies supporting the batch APIs of their provider extend BatchPatchGenerationStrategy;
+    the batch_mode kwarg is rejected by the other strategies.
+
+    Reproducible generations, i.e. with temperature 0 or an explicit seed sent to the provider
+    (see SUPPORTS_SEED), are stored in a GenerationCache (in generation_cache_path, unless
+    use_generation_cache is False) keyed by the strategy, model, prompt and _request_parameters,
+    and are reused instead of being requested again.
+    """
+
+    # Default maximum number of requests in flight, overridden by the max_in_flight kwarg
+    MAX_IN_FLIGHT: int = 16
+    # Whether the strategy can generate through the batch API of its provider
+    SUPPORTS_BATCH_MODE: bool = False
+    # Whether the strategy sends the seed kwarg to its provider
+    SUPPORTS_SEED: bool = False
+
+    def __init__(self, model_name: str, **kwargs) -> None:
+        self.model_name = model_name
+        self.n_samples = kwargs.get("n_samples", 1)
+        self.max_in_flight = kwargs.get("max_in_flight", self.MAX_IN_FLIGHT)
+        self.max_concurrent_samples = kwargs.get(
+            "max_concurrent_samples", self.n_samples
+        )
+        self.rate_limiter = RateLimiter.get_shared(
+            type(self).__name__,
+            model_name,
+            requests_per_minute=kwargs.get("requests_per_minute", None),
+            tokens_per_minute=kwargs.get("tokens_per_minute", None),
+        )
+        self.batch_mode = kwargs.get("batch_mode", False)
+        if self.batch_mode and not self.SUPPORTS_BATCH_MODE:
+            raise ValueError(f"{type(self).__name__} does not support batch mode")
+        self.seed = kwargs.get("seed", None)
+        self.generation_cache = (
+            GenerationCache(
+                kwargs.get(
+                    "generation_cache_path",
+                    Path(__file__).parent.parent.parent.parent / "cache",
+                )
+            )
+            if kwargs.get("use_generation_cache", True)
+            else None
+        )
+        self.__loop: Optional[asyncio.AbstractEventLoop] = None
+        self.__client: Any = None
+        self.__semaphore: Optional[asyncio.Semaphore] = None
+
+    @abstractmethod
+    def _create_client(self) -> Any:
+        """
+        Creates the async client of the provider.
+        """
+        pass
+
+    @abstractmethod
+    async def _agenerate_prompt(self, prompt: str) -> Any:
+        """
+        Implementation method returning the generation results for a single prompt.
+        """
+        pass
+
+    def _request_parameters(self) -> dict:
+        """
+        Returns the parameters, besides the model and the prompt, that determine the generations.
+        """
+        return {
+            "temperature": getattr(self, "temperature", None),
+            "n_samples": self.n_samples,
+        }
+
+    @final
+    def __cache_key(self, prompt: str) -> Optional[str]:
+        """
+        Returns the generation cache key of the prompt, or None if its generations are not reproducible.
+        """
+        parameters = self._request_parameters()
+        # The seed only makes generations reproducible if it is sent to the provider
+        seed = self.seed if self.SUPPORTS_SEED else None
+        if self.generation_cache is None or (
+            parameters.get("temperature") != 0 and seed is None
+        ):
+            return None
+        return GenerationCache.get_key(
+            {
+                "strategy": type(self).__name__,
+                "model": self.model_name,
+                "prompt": prompt,
+                "seed": seed,
+                **parameters,
+            }
+        )
+
+    @staticmethod
+    def __is_complete(generation: Any) -> bool:
+        # Generations with failed samples are not cached, so that they are requested again
+        if generation is None:
+            return False
+        samples = generation if isinstance(generation, list) else [generation]
+        return all(
+            isinstance(sample, dict) and "error" not in sample for sample in samples
+        )
+
+    @final
+    def __refresh_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self.__loop is not loop:
+            self.__loop = loop
+            self.__client = self._create_client()
+            self.__semaphore = asyncio.Semaphore(self.max_in_flight)
+
+    @final
+    def _get_client(self) -> Any:
+        self.__refresh_loop()
+        return self.__client
+
+    @staticmethod
+    def __get_headers(response: Any) -> Optional[Mapping[str, str]]:
+        # Raw responses (and httpx responses) have headers, API errors wrap the response
+        headers = getattr(response, "headers", None)
+        if headers is None:
+            headers = getattr(getattr(response, "response", None), "headers", None)
+        return headers
+
+    @final
+    async def _request(self, request: Callable[[], Awaitable[T]], tokens: int = 0) -> T:
+        """
+        Runs the request once the rate limits allow it and a slot is available.
+
+        :param tokens: The estimated number of tokens of the request.
+        """
+        self.__refresh_loop()
+        assert self.__semaphore is not None
+        await self.rate_limiter.aacquire(tokens)
+        async with self.__semaphore:
+            try:
+                response = await request()
+            except Exception as e:
+                self.rate_limiter.update(self.__get_headers(e))
+                raise
+        self.rate_limiter.update(self.__get_headers(response))
+        return response
+
+    @final
+    def _sample_seed(self, index: int) -> Optional[int]:
+        """
+        Returns the seed of the index-th sample of a prompt, so that samples generated
+        by separate requests differ while staying reproducible.
+        """
+        return self.seed + index if self.seed is not None else None
+
+    @final
+    async def _agenerate_samples(
+        self, generate_sample: Callable[[int], Awaitable[Any]]
+    ) -> List[Any]:
+        """
+        Generates the n_samples samples of a prompt concurrently, in order.
+        generate_sample is called with the index of the sample (see _sample_seed).
+
+        Failed samples are recorded as {"error": ...}, so that the other samples are kept
+        and the failed ones are generated again when generate_patches is resumed.
+        """
+        semaphore = asyncio.Semaphore(max(1, self.max_concurrent_samples))
+
+        async def run(index: int) -> Any:
+            async with semaphore:
+                try:
+                    return await generate_sample(index)
+                except Exception as e:
+                    logging.warning(f"Failed to generate sample: {e}")
+                    return {"error": f"{type(e).__name__}: {e}"}
+
+        return list(await asyncio.gather(*[run(i) for i in range(self.n_samples)]))
+
+    @final
+    async def agenerate(self, chunk: List[str]) -> List[Any]:
+        """
+        Returns the generation results for the given prompts, in order.
+        """
+        generations: List[Any] = [None] * len(chunk)
+        keys = [self.__cache_key(prompt) for prompt in chunk]
+
+        to_generate = []
+        for i, key in enumerate(keys):
+            cached = (
+                self.generation_cache.load(key)
+                if self.generation_cache is not None and key is not None
+                else None
+            )
+            if cached is not None:
+                generations[i] = cached
+            else:
+                to_generate.append(i)
+        if not to_generate:
+            return generations
+
+        results = await self._agenerate_chunk([chunk[i] for i in to_generate])
+
+        for i, generation in zip(to_generate, results):
+            generations[i] = generation
+            key = keys[i]
+            if (
+                self.generation_cache is not None
+                and key is not None
+                and self.__is_complete(generation)
+            ):
+                self.generation_cache.save(key, generation)
+        return generations
+
+    async def _agenerate_chunk(self, chunk: List[str]) -> List[Any]:
+        """
+        Returns the generation results for the given (uncached) prompts, in order.
+
+        A prompt whose generation fails is recorded as {"error": ...}, so that the other
+        prompts are kept and the failed one is generated again when generate_patches is resumed.
+        """
+
+        async def run(prompt: str) -> Any:
+            try:
+                return await self._agenerate_prompt(prompt)
+            except Exception as e:
+                logging.warning(f"Failed to generate prompt: {e}")
+                return {"error": f"{type(e).__name__}: {e}"}
+
+        return list(await asyncio.gather(*[run(prompt) for prompt in chunk]))
+
+    @final
+    def _generate_impl(self, chunk: List[str]) -> Any:
+        return asyncio.run(self.agenerate(chunk))
+
+
+class BatchPatchGenerationStrategy(AsyncPatchGenerationStrategy):
+    """
+    Base class for API strategies that can also generate through the batch API of their provider.
+
+    When the batch_mode kwarg is set, _agenerate_batch is used instead of _agenerate_prompt:
+    all the prompts given to agenerate are then submitted as a single batch, and the results
+    are polled every batch_poll_interval seconds. Batch request files are written to batch_dir.
+    """
+
+    SUPPORTS_BATCH_MODE = True
+
+    def __init__(self, model_name: str, **kwargs) -> None:
+        super().__init__(model_name, **kwargs)
+        self.batch_dir = kwargs.get("batch_dir", None)
+        self.batch_poll_interval = kwargs.get("batch_poll_interval", 60)
+
+    @abstractmethod
+    async def _agenerate_batch(self, chunk: List[str]) -> List[Any]:
+        """
+        Implementation method returning the generation results for the given prompts,
+        generated through the batch API of the provider.
+        """
+        pass
+
+    @final
+    def _write_batch_requests(self, requests: List[dict]) -> Path:
+        """
+        Writes the requests of a batch to a new JSONL file in batch_dir, returning its path.
+        """
+        if self.batch_dir is not None:
+            Path(self.batch_dir).mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w",
+            dir=self.batch_dir,
+            prefix=f"batch_{type(self).__name__}_",
+            suffix=".jsonl",
+            delete=False,
+        ) as f:
+            for request in requests:
+                f.write(json.dumps(request) + "\n")
+        return Path(f.name)
+
+    async def _agenerate_chunk(self, chunk: List[str]) -> List[Any]:
+        if self.batch_mode:
+            return await self._agenerate_batch(chunk)
+        return await super()._agenerate_chunk(chunk)
@@ -0,0 +1,96 @@
+from transformers import AutoTokenizer
+from transformers.tokenization_utils_base import PreTrainedTokenizerBase
+from typing import List, Optional
+
+import logging
+
+
+class PromptLengthChecker:
+    """
+    Counts the tokens of the sample prompts with the tokenizer of the target model,
+    storing the count in the sample (`prompt_tokens`), and handles the prompts longer
+    than max_prompt_tokens according to the over_length policy:
+        - "keep": prompts are kept as they are
+        - "drop": prompts are set to None, so that they are not generated
+        - "truncate": prompts have their middle cut, keeping their beginning and end, except
+          infilling prompts, which are dropped: the infilling strategies rebuild the candidate
+          function from the prompt, which would then be incomplete
+    """
+
+    POLICIES = ("keep", "drop", "truncate")
+    # Mask tokens of the infilling prompts (see InfillingPrompting)
+    MASKS = ("<FILL_ME>", "<｜fim▁hole｜>")
+
+    def __init__(
+        self,
+        tokenizer: PreTrainedTokenizerBase,
+        max_prompt_tokens: Optional[int] = None,
+        over_length: str = "keep",
+    ) -> None:
+        assert (
+            over_length in self.POLICIES
+        ), f"Unknown over-length policy {over_length}, expected one of {self.POLICIES}"
+        self.tokenizer = tokenizer
+        self.max_prompt_tokens = max_prompt_tokens
+        self.over_length = over_length
+
+    @classmethod
+    def from_pretrained(cls, tokenizer_name: str, **kwargs) -> "PromptLengthChecker":
+        return cls(AutoTokenizer.from_pretrained(tokenizer_name), **kwargs)
+
+    def count_tokens(self, prompt: str) -> int:
+        return len(self.tokenizer(prompt)["input_ids"])
+
+    def __budget(self, prompt: str, input_ids: List[int]) -> int:
+        assert self.max_prompt_tokens is not None
+        # Leave room for the tokens of the full prompt that are not in input_ids,
+        # e.g. the special tokens added when the prompt is tokenized for generation
+        return self.max_prompt_tokens - (self.count_tokens(prompt) - len(input_ids))
+
+    def __truncate(self, prompt: str) -> Optional[str]:
+        """
+        Returns the prompt truncated to max_prompt_tokens, or None if it cannot be truncated.
+        """
+        if any(mask in prompt for mask in self.MASKS):
+            return None
+
+        input_ids = self.tokenizer(prompt, add_special_tokens=False)["input_ids"]
+        budget = self.__budget(prompt, input_ids)
+        assert (
+            budget > 0
+        ), f"max_prompt_tokens ({self.max_prompt_tokens}) leaves no room for the prompt"
+        head = budget // 2
+        tail = budget - head
+        return self.tokenizer.decode(input_ids[:head]) + self.tokenizer.decode(
+            input_ids[len(input_ids) - tail :]
+        )
+
+    def check(self, sample: dict) -> dict:
+        """
+        Counts the tokens of the prompt of the sample and applies the over-length policy.
+        """
+        if not sample.get("prompt"):
+            return sample
+
+        prompt_tokens = self.count_tokens(sample["prompt"])
+        sample["prompt_tokens"] = prompt_tokens
+        if self.max_prompt_tokens is None or prompt_tokens <= self.max_prompt_tokens:
+            return sample
+
+        if self.over_length == "drop":
+            logging.warning(
+                f"Dropping prompt of {sample.get('identifier')}: {prompt_tokens} tokens is larger than {self.max_prompt_tokens}"
+            )
+            sample["prompt"] = None
+        elif self.over_length == "truncate":
+            logging.warning(
+                f"Truncating prompt of {sample.get('identifier')}: {prompt_tokens} tokens is larger than {self.max_prompt_tokens}"
+            )
+            sample["prompt"] = self.__truncate(sample["prompt"])
+            if sample["prompt"] is None:
+                logging.warning(
+                    f"Dropping prompt of {sample.get('identifier')}: infilling prompts cannot be truncated"
+                )
+            else:
+                sample["prompt_tokens"] = self.count_tokens(sample["prompt"])
+        return sample
@@ -7,6 +7,7 @@ from elleelleaime.core.utils.java.java import (
     extract_single_function,
     extract_failing_test_cases,
 )
+from elleelleaime.core.utils.workspace import BugWorkspace
 
 
 class InstructPrompting(PromptingStrategy):
@@ -28,13 +29,15 @@ class InstructPrompting(PromptingStrategy):
         Returns:
             Tuple: A tuple of the form (buggy_code, fixed_code, prompt).
         """
-        result = extract_single_function(bug)
-        if result is None:
-            return None, None, None
+        # Share the checkouts of the bug between the extraction steps
+        with BugWorkspace(bug) as workspace:
+            result = extract_single_function(bug, workspace)
+            if result is None:
+                return None, None, None
 
-        buggy_code, fixed_code = result
+            buggy_code, fixed_code = result
 
-        failing_test_cases = extract_failing_test_cases(bug)
+            failing_test_cases = extract_failing_test_cases(bug, workspace)
         failing_test_causes = bug.get_failing_tests()
         if len(failing_test_causes) == 0 or len(failing_test_cases) == 0:
             return None, None, None
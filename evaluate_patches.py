@@ -1,10 +1,18 @@
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 from elleelleaime.core.utils.benchmarks import get_benchmark
 from elleelleaime.core.benchmarks.bug import Bug
-from elleelleaime.core.utils.jsonl import stream_jsonl, write_jsonl
+from elleelleaime.core.caching.cache import Cache
+from elleelleaime.core.utils.jsonl import stream_jsonl, recover_jsonl, JsonlWriter
+from elleelleaime.evaluate.scheduling import (
+    AffinityQueue,
+    DurationHistory,
+    split_sample,
+)
 from elleelleaime.evaluate.strategies.registry import PatchEvaluationStrategyRegistry
+from elleelleaime.evaluate.strategies.text.replace import ReplaceEvaluationStrategy
 
 from pathlib import Path
+from typing import Optional
 
 import numpy as np
 import fire
@@ -13,6 +21,8 @@ import tqdm
 import logging
 import json
 import os
+import time
+import queue
 
 
 def evaluate_candidate(bug: Bug, sample: dict, strategy: str, **kwargs) -> dict:
@@ -29,16 +39,42 @@ def evaluate_candidate(bug: Bug, sample: dict, strategy: str, **kwargs) -> dict:
     return sample
 
 
+def merge_evaluations(evaluations: list) -> Optional[list]:
+    """
+    Merges the evaluations of the units of a sample, in order.
+    """
+    if len(evaluations) == 1:
+        return evaluations[0]
+    return [
+        evaluation
+        for unit_evaluations in evaluations
+        for evaluation in unit_evaluations or []
+    ]
+
+
 def entry_point(
     benchmark: str,
     samples_path: str,
     strategy: str,
     n_workers: int = 4,
+    lazy: bool = False,
+    resume: bool = False,
+    compress: bool = False,
     **kwargs,
 ):
     """
     Evaluates the candidate patches given the samples,
     and writes the results to f"evaluation_{benchmark}_{prompt_strategy}_{model_name}.jsonl"
+
+    If lazy is set, only the bugs referenced by the samples are loaded from the benchmark.
+
+    Work is scheduled per (bug, generation) unit rather than per sample: units are run
+    longest-expected-first, according to the durations recorded in previous runs
+    (f"durations_{benchmark}.json", next to the samples), and the units of each bug are
+    run by the same worker so that they reuse the same warm checkouts (see AffinityQueue).
+
+    Results are written as soon as all the generations of a sample are evaluated (to a .jsonl.gz
+    file if compress is set). If resume is set, samples already present in the output are skipped.
     """
     # Get the benchmark, check if it exists, and initialize it
     samples_file_name = os.path.basename(samples_path)
@@ -46,37 +82,102 @@ def entry_point(
     prompt_strategy = samples_file_name.split("_")[2].split(".")[0]
     model_name = samples_file_name.split("_")[3].split(".")[0]
 
+    output_path = os.path.join(
+        dir_path,
+        f"evaluation_{benchmark}_{prompt_strategy}_{model_name}.jsonl"
+        + (".gz" if compress else ""),
+    )
+
     # Read the samples
     logging.info("Reading samples...")
     samples = list(stream_jsonl(samples_path))
 
-    benchmark_obj = get_benchmark(benchmark)
+    # Skip the samples that were already evaluated
+    if resume and os.path.exists(output_path):
+        evaluated = {sample["identifier"] for sample in recover_jsonl(output_path)}
+        logging.info(f"Resuming evaluation, skipping {len(evaluated)} samples...")
+        samples = [
+            sample for sample in samples if sample["identifier"] not in evaluated
+        ]
+
+    benchmark_obj = get_benchmark(benchmark, lazy=lazy)
     if benchmark_obj is None:
         raise ValueError(f"Unknown benchmark {benchmark}")
-    benchmark_obj.initialize()
-
-    with ThreadPoolExecutor(max_workers=n_workers) as executor:
-        futures = []
-        for sample in tqdm.tqdm(samples, "Lauching candidate evaluation..."):
-            bug = benchmark_obj.get_bug(sample["identifier"])
-            if bug is None:
-                raise ValueError(f"Unknown bug {sample['identifier']}")
-            futures.append(
-                executor.submit(evaluate_candidate, bug, sample, strategy, **kwargs)
-            )
+    if not lazy:
+        benchmark_obj.initialize()
+
+    # A single strategy instance is shared by all units, so that equivalent candidates
+    # of the same bug are only evaluated once
+    evaluation_strategy = PatchEvaluationStrategyRegistry(**kwargs).get_evaluation(
+        strategy
+    )
+    history = DurationHistory(os.path.join(dir_path, f"durations_{benchmark}.json"))
+
+    # Flatten the samples into (bug, generation) units
+    units = []
+    evaluations = []
+    for i, sample in enumerate(samples):
+        bug = benchmark_obj.get_bug(sample["identifier"])
+        if bug is None:
+            raise ValueError(f"Unknown bug {sample['identifier']}")
+        sample_units = split_sample(sample)
+        evaluations.append([None] * len(sample_units))
+        for j, unit in enumerate(sample_units):
+            units.append((i, j, bug, unit))
+    remaining = [len(sample_evaluations) for sample_evaluations in evaluations]
+
+    # Longest expected bugs first, each bug being affine to a worker
+    work_queue = AffinityQueue(
+        units,
+        key=lambda unit: unit[2].get_identifier(),
+        estimate=history.estimate,
+    )
+    results: queue.Queue = queue.Queue()
+
+    def run_worker(worker: int) -> None:
+        while (unit := work_queue.get(worker)) is not None:
+            i, j, bug, sample_unit = unit
+            start = time.monotonic()
+            try:
+                evaluation = evaluation_strategy.evaluate(bug, sample_unit)
+            except Exception as e:
+                results.put((i, j, None, e))
+                continue
+            history.record(bug.get_identifier(), time.monotonic() - start)
+            results.put((i, j, evaluation, None))
+
+    with ThreadPoolExecutor(max_workers=n_workers) as executor, JsonlWriter(
+        output_path, append=resume
+    ) as writer:
+        for worker in range(n_workers):
+            executor.submit(run_worker, worker)
 
         logging.info("Evaluating candidates...")
-        results = []
-        for future in tqdm.tqdm(as_completed(futures), total=len(futures)):
-            results.append(future.result())
-        samples = results
-
-    # Write results to jsonl file
-    write_jsonl(
-        os.path.join(
-            dir_path, f"evaluation_{benchmark}_{prompt_strategy}_{model_name}.jsonl"
-        ),
-        samples,
+        try:
+            for _ in tqdm.tqdm(range(len(units))):
+                i, j, evaluation, error = results.get()
+                if error is not None:
+                    raise error
+                evaluations[i][j] = evaluation
+                remaining[i] -= 1
+                # Write the sample once all its units are evaluated
+                if remaining[i] == 0:
+                    samples[i]["evaluation"] = merge_evaluations(evaluations[i])
+                    writer.write(samples[i])
+        finally:
+            # Stop the workers after their current unit if the evaluation failed
+            work_queue.clear()
+            history.save()
+
+    dedup_statistics = ReplaceEvaluationStrategy.get_dedup_statistics()
+    logging.info(
+        f"Evaluated {dedup_statistics['evaluated']} candidates, "
+        f"reused {dedup_statistics['deduplicated']} evaluations for equivalent candidates"
+    )
+    memo_statistics = Cache.get_memo_statistics()
+    logging.info(
+        f"Evaluation cache memo: {memo_statistics['hits']} hits, "
+        f"{memo_statistics['misses']} misses, {memo_statistics['evictions']} evictions"
     )
 
 
@@ -1,14 +1,58 @@
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from elleelleaime.core.utils.jsonl import stream_jsonl, write_jsonl
+from concurrent.futures import (
+    ALL_COMPLETED,
+    FIRST_COMPLETED,
+    ThreadPoolExecutor,
+    wait,
+)
+from elleelleaime.core.utils.jsonl import stream_jsonl, JsonlWriter
+from elleelleaime.core.caching.generation_cache import GenerationCache
 from elleelleaime.generate.strategies.registry import PatchGenerationStrategyRegistry
+from elleelleaime.generate.strategies.strategy import (
+    PatchGenerationStrategy,
+    AsyncPatchGenerationStrategy,
+)
 
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional
+from contextlib import contextmanager
 from pathlib import Path
 import fire
 import sys
 import os
+import tempfile
 import tqdm
 import logging
+import threading
+import asyncio
+
+
+# Generation strategies are instantiated once per worker thread and set of arguments
+__STRATEGIES = threading.local()
+
+
+def get_generation_strategy(strategy_name: str, **kwargs) -> PatchGenerationStrategy:
+    """
+    Returns the generation strategy of the calling worker thread for the given arguments.
+    """
+    if not hasattr(__STRATEGIES, "strategies"):
+        __STRATEGIES.strategies = {}
+    # Note: values are compared by repr, since kwargs may hold unhashable values (e.g. lists)
+    key = (strategy_name, frozenset((k, repr(v)) for k, v in kwargs.items()))
+    if key not in __STRATEGIES.strategies:
+        __STRATEGIES.strategies[key] = PatchGenerationStrategyRegistry.get_generation(
+            strategy_name, **kwargs
+        )
+    return __STRATEGIES.strategies[key]
+
+
+def needs_generation(sample: dict) -> bool:
+    """
+    Returns whether the sample has a prompt and no generation yet (or a generation with errors).
+    """
+    return bool(sample["prompt"]) and not (
+        "generation" in sample
+        and sample["generation"] is not None
+        and not (any("error" in generation for generation in sample["generation"]))
+    )
 
 
 def generate_candidate(chunk: List[dict], strategy_name: str, **kwargs) -> List[dict]:
@@ -16,23 +60,16 @@ def generate_candidate(chunk: List[dict], strategy_name: str, **kwargs) -> List[
     Generates the candidate patch for the given sample and model.
     """
 
-    generation_strategy = PatchGenerationStrategyRegistry.get_generation(
-        strategy_name, **kwargs
-    )
+    generation_strategy = get_generation_strategy(strategy_name, **kwargs)
 
-    chunk_to_generate = [
-        sample
-        for sample in chunk
-        if sample["prompt"]
-        and not (
-            "generation" in sample
-            and sample["generation"] is not None
-            and not (any("error" in generation for generation in sample["generation"]))
-        )
-    ]
+    chunk_to_generate = [sample for sample in chunk if needs_generation(sample)]
     logging.info(f"Gerating patches for {len(chunk_to_generate)} samples...")
     non_empty_prompt_chunk = [sample["prompt"] for sample in chunk_to_generate]
-    generations = generation_strategy.generate(non_empty_prompt_chunk)
+    generations = (
+        generation_strategy.generate(non_empty_prompt_chunk)
+        if chunk_to_generate
+        else []
+    )
 
     for generation, sample in zip(generations, chunk_to_generate):
         sample["generation"] = generation
@@ -44,58 +81,204 @@ def generate_candidate(chunk: List[dict], strategy_name: str, **kwargs) -> List[
     return chunk
 
 
+def get_output_path(
+    samples_path: str, strategy_name: str, output_dir: Optional[str], **kwargs
+) -> str:
+    samples_file_name = os.path.basename(samples_path)
+    dir_path = output_dir or os.path.dirname(samples_path)
+    benchmark = samples_file_name.split("_")[1]
+    prompt_strategy = samples_file_name.split("_")[2].split(".")[0]
+
+    # FIXME: This is a hack to shorten the kwargs string
+    for key in kwargs:
+        if Path(str(kwargs[key])).exists():
+            kwargs[key] = Path(kwargs[key]).name
+
+    kwargs_str = "_".join([f"{k}={v}" for k, v in kwargs.items()])
+    kwargs_str = kwargs_str.replace("/", "-")
+    return os.path.join(
+        dir_path,
+        f"candidates_{benchmark}_{prompt_strategy}_{strategy_name}_{kwargs_str}.jsonl",
+    )
+
+
+def chunked(samples: Iterable[dict], chunk_size: int) -> Iterator[List[dict]]:
+    chunk = []
+    for sample in samples:
+        chunk.append(sample)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def agenerate_candidates(
+    samples_path: str,
+    generation_strategy: AsyncPatchGenerationStrategy,
+    writer: JsonlWriter,
+    progress: tqdm.tqdm,
+    chunk_size: int = 1,
+):
+    """
+    Generates the candidate patches of all samples in a single event loop.
+    Samples are streamed in chunks of chunk_size samples, keeping at most
+    2 * max_in_flight chunks in flight.
+    """
+
+    async def agenerate_candidate(chunk: List[dict]) -> List[dict]:
+        chunk_to_generate = [sample for sample in chunk if needs_generation(sample)]
+        if chunk_to_generate:
+            generations = await generation_strategy.agenerate(
+                [sample["prompt"] for sample in chunk_to_generate]
+            )
+            for generation, sample in zip(generations, chunk_to_generate):
+                sample["generation"] = generation
+
+        for sample in chunk:
+            if not sample["prompt"]:
+                sample["generation"] = None
+        return chunk
+
+    tasks = set()
+
+    async def write_completed(return_when: str):
+        nonlocal tasks
+        done, tasks = await asyncio.wait(tasks, return_when=return_when)
+        for task in done:
+            chunk = task.result()
+            for sample in chunk:
+                writer.write(sample)
+            progress.update(len(chunk))
+
+    for chunk in chunked(stream_jsonl(samples_path), chunk_size):
+        # Bound the number of chunks in flight, so that memory stays flat
+        if len(tasks) >= 2 * generation_strategy.max_in_flight:
+            await write_completed(asyncio.FIRST_COMPLETED)
+        tasks.add(asyncio.create_task(agenerate_candidate(chunk)))
+
+    if tasks:
+        await write_completed(asyncio.ALL_COMPLETED)
+
+
+@contextmanager
+def open_candidates_writer(
+    samples_path: str, output_path: str
+) -> Iterator[JsonlWriter]:
+    """
+    Opens the writer of the candidates file.
+
+    When the candidates file is the samples file (i.e. when a generation is resumed in place),
+    candidates are written to a temporary file in the same directory, which replaces the samples
+    file once all samples are generated. Otherwise, the samples would be truncated before being read.
+    """
+    if not (
+        os.path.exists(output_path) and os.path.samefile(samples_path, output_path)
+    ):
+        with JsonlWriter(output_path) as writer:
+            yield writer
+        return
+
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(output_path)),
+        prefix=".candidates_",
+        suffix=".jsonl.gz" if output_path.endswith(".gz") else ".jsonl",
+    )
+    os.close(fd)
+    try:
+        with JsonlWriter(tmp_path) as writer:
+            yield writer
+    except BaseException:
+        logging.warning(f"Generation interrupted, candidates so far kept in {tmp_path}")
+        raise
+    os.replace(tmp_path, output_path)
+
+
 def entry_point(
     samples_path: str,
     strategy_name: str,
     n_workers: int = 1,
     output_dir: Optional[str] = None,
+    chunk_size: Optional[int] = None,
     **kwargs,
 ):
     """
     Generates the candidate patches given the samples and the model,
     and writes the results to f"candidates_{benchmark}_{prompt_strategy}_{model_name}.jsonl"
-    """
-    results = []
 
-    with ThreadPoolExecutor(max_workers=n_workers) as executor:
-        futures = []
+    Samples are streamed to the workers in chunks of chunk_size samples, keeping at most
+    2 * n_workers chunks in flight, and each chunk is appended to the candidates file as
+    soon as it is generated. chunk_size defaults to the batch_size of the strategy (1 if it has
+    none), so that each chunk fills the batches of the Hugging Face strategies.
 
-        samples = list(stream_jsonl(samples_path))
-        chunks = [samples[i::n_workers] for i in range(n_workers)]
+    The samples file may be a candidates file of an interrupted generation, in which case only
+    the samples without (successful) generation are generated. If it is also the output file,
+    it is only replaced once all samples are generated.
 
-        for chunk in tqdm.tqdm(chunks, desc="Launching workers", total=len(chunks)):
-            futures.append(
-                executor.submit(generate_candidate, chunk, strategy_name, **kwargs)
+    Strategies backed by remote APIs (see AsyncPatchGenerationStrategy) ignore n_workers:
+    all samples are generated by a single strategy in one event loop, with at most
+    max_in_flight requests in flight. They also ignore chunk_size, unless batch_mode is set,
+    in which case each chunk of chunk_size samples is submitted as one provider batch.
+    """
+    # Note: the kwargs are given to the generation strategies, so the output path is computed from a copy
+    output_path = get_output_path(samples_path, strategy_name, output_dir, **kwargs)
+    chunk_size = chunk_size or kwargs.get("batch_size", 1)
+
+    if PatchGenerationStrategyRegistry.is_async(strategy_name):
+        generation_strategy = PatchGenerationStrategyRegistry.get_generation(
+            strategy_name, **kwargs
+        )
+        assert isinstance(generation_strategy, AsyncPatchGenerationStrategy)
+        with open_candidates_writer(samples_path, output_path) as writer, tqdm.tqdm(
+            desc="Generating candidates", unit="sample"
+        ) as progress:
+            logging.info("Generating candidates...")
+            asyncio.run(
+                agenerate_candidates(
+                    samples_path,
+                    generation_strategy,
+                    writer,
+                    progress,
+                    chunk_size=chunk_size if generation_strategy.batch_mode else 1,
+                )
             )
 
-        logging.info("Generating candidates...")
-        for future in tqdm.tqdm(
-            as_completed(futures),
-            desc="Waiting for chunks to be processed",
-            total=len(futures),
-        ):
-            results.extend(future.result())
-
-    # Write results to jsonl file
-    samples_file_name = os.path.basename(samples_path)
-    dir_path = output_dir or os.path.dirname(samples_path)
-    benchmark = samples_file_name.split("_")[1]
-    prompt_strategy = samples_file_name.split("_")[2].split(".")[0]
+        cache_statistics = GenerationCache.get_statistics()
+        lookups = cache_statistics["hits"] + cache_statistics["misses"]
+        logging.info(
+            f"Generation cache: {cache_statistics['hits']} hits, {cache_statistics['misses']} misses"
+            + (
+                f" ({cache_statistics['hits'] / lookups:.1%} hit rate)"
+                if lookups
+                else ""
+            )
+        )
+        return
 
-    # FIXME: This is a hack to shorten the kwargs string
-    for key in kwargs:
-        if Path(str(kwargs[key])).exists():
-            kwargs[key] = Path(kwargs[key]).name
+    with ThreadPoolExecutor(max_workers=n_workers) as executor, open_candidates_writer(
+        samples_path, output_path
+    ) as writer, tqdm.tqdm(desc="Generating candidates", unit="sample") as progress:
+        futures = set()
 
-    kwargs_str = "_".join([f"{k}={v}" for k, v in kwargs.items()])
-    kwargs_str = kwargs_str.replace("/", "-")
-    write_jsonl(
-        os.path.join(
-            dir_path,
-            f"candidates_{benchmark}_{prompt_strategy}_{strategy_name}_{kwargs_str}.jsonl",
-        ),
-        results,
-    )
+        def write_completed(return_when: str):
+            nonlocal futures
+            done, futures = wait(futures, return_when=return_when)
+            for future in done:
+                chunk = future.result()
+                for sample in chunk:
+                    writer.write(sample)
+                progress.update(len(chunk))
+
+        logging.info("Generating candidates...")
+        for chunk in chunked(stream_jsonl(samples_path), chunk_size):
+            # Bound the number of chunks in flight, so that memory stays flat
+            if len(futures) >= 2 * n_workers:
+                write_completed(FIRST_COMPLETED)
+            futures.add(
+                executor.submit(generate_candidate, chunk, strategy_name, **kwargs)
+            )
+
+        write_completed(ALL_COMPLETED)
 
 
 def main():
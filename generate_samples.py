@@ -4,6 +4,7 @@ from elleelleaime.core.utils.jsonl import write_jsonl
 from elleelleaime.core.benchmarks.bug import Bug
 from typing import Optional, Union
 from elleelleaime.sample.registry import PromptStrategyRegistry
+from elleelleaime.sample.length import PromptLengthChecker
 
 import fire
 import traceback
@@ -27,12 +28,26 @@ def entry_point(
     benchmark: str,
     prompt_strategy: str,
     n_workers: int = 1,
+    tokenizer: Optional[str] = None,
+    max_prompt_tokens: Optional[int] = None,
+    over_length: str = "keep",
     **kwargs,
 ):
     """
     Generates the test samples for the bugs of the given benchmark with the given
     prompt strategy, and writes the results to f"samples_{dataset}_{prompt_strategy}.jsonl"
+
+    If a tokenizer (the name of the target model) is given, the number of tokens of each prompt
+    is stored in the sample (`prompt_tokens`), and prompts longer than max_prompt_tokens are
+    kept, dropped or truncated according to over_length (see PromptLengthChecker).
     """
+    length_checker = (
+        PromptLengthChecker.from_pretrained(
+            tokenizer, max_prompt_tokens=max_prompt_tokens, over_length=over_length
+        )
+        if tokenizer is not None
+        else None
+    )
 
     # Get the benchmark, check if it exists, and initialize it
     benchmark_obj = get_benchmark(benchmark)
@@ -68,6 +83,10 @@ def entry_point(
                     f"Error while generating sample for bug {future_to_bug[future]}: {traceback.format_exc()}"
                 )
 
+    if length_checker is not None:
+        logging.info("Counting the prompt tokens...")
+        results = [length_checker.check(sample) for sample in results]
+
     # Write results to jsonl file
     kwargs_str = "_".join([f"{key}_{value}" for key, value in kwargs.items()])
     write_jsonl(f"samples_{benchmark}_{prompt_strategy}_{kwargs_str}.jsonl", results)
@@ -0,0 +1,30 @@
+from elleelleaime.core.caching.cache import Cache
+
+import fire
+import sys
+import logging
+
+
+def entry_point(
+    cache_path: str = "cache",
+    remove: bool = False,
+):
+    """
+    Imports the evaluations cached with the legacy one-file-per-generation layout
+    (cache/<benchmark>/<bid>/<hash>) into the cache database.
+
+    If remove is set, the imported files are deleted.
+    """
+    cache = Cache(cache_path)
+    imported = cache.migrate(remove=remove)
+    cache.close()
+    logging.info(f"Imported {imported} evaluations into {cache.db_path}")
+
+
+def main():
+    logging.getLogger().setLevel(logging.INFO)
+    fire.Fire(entry_point)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+from elleelleaime.generate.strategies.registry import PatchGenerationStrategyRegistry
+from elleelleaime.generate.server import ModelServer, DEFAULT_ADDRESS
+
+from dotenv import load_dotenv
+
+import fire
+import sys
+import os
+import logging
+import secrets
+
+
+def entry_point(
+    strategy_name: str,
+    address: str = DEFAULT_ADDRESS,
+    max_batch_prompts: int = 16,
+    **kwargs,
+):
+    """
+    Loads the given generation strategy once and serves it at the given address
+    ("host:port" or the path of a Unix socket), so that generate_patches.py workers
+    using the "model-server" strategy share it.
+
+    Clients authenticate with the MODEL_SERVER_AUTHKEY environment variable. If it is not
+    set, a random key is generated and printed, to be exported for the clients.
+    """
+    load_dotenv()
+    authkey = os.getenv("MODEL_SERVER_AUTHKEY")
+    if not authkey:
+        authkey = secrets.token_hex(16)
+        print(
+            f"MODEL_SERVER_AUTHKEY is not set, clients must use: MODEL_SERVER_AUTHKEY={authkey}"
+        )
+    generation_strategy = PatchGenerationStrategyRegistry.get_generation(
+        strategy_name, **kwargs
+    )
+    server = ModelServer(
+        generation_strategy,
+        address=address,
+        authkey=authkey,
+        max_batch_prompts=max_batch_prompts,
+    )
+    server.serve_forever()
+
+
+def main():
+    logging.getLogger().setLevel(logging.INFO)
+    fire.Fire(entry_point)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -23,6 +23,23 @@ class TestDefects4J:
         assert len(set([bug.get_identifier() for bug in bugs])) == 835
         assert all(bug.get_ground_truth().strip() != "" for bug in bugs)
 
+    def test_get_bug_lazy(self):
+        defects4j = get_benchmark("defects4j")
+        assert defects4j is not None
+        defects4j.initialize()
+
+        lazy_defects4j = get_benchmark("defects4j", lazy=True)
+        assert lazy_defects4j is not None
+
+        bug = lazy_defects4j.get_bug("Chart-1")
+        assert bug is not None
+        assert bug.get_ground_truth() == defects4j.get_bug("Chart-1").get_ground_truth()
+        assert (
+            bug.get_failing_tests() == defects4j.get_bug("Chart-1").get_failing_tests()
+        )
+        assert lazy_defects4j.get_bug("Chart-1000") is None
+        assert len(lazy_defects4j.get_bugs()) == 1
+
     def checkout_bug(self, bug: Bug) -> bool:
         buggy_path = f"{tempfile.gettempdir()}/elleelleaime-{getpass.getuser()}/{bug.get_identifier()}-buggy-{uuid.uuid4()}"
         fixed_path = f"{tempfile.gettempdir()}/elleelleaime-{getpass.getuser()}/{bug.get_identifier()}-fixed-{uuid.uuid4()}"
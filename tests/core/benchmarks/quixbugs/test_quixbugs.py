@@ -22,6 +22,16 @@ class TestQuixBugs:
         assert len(bugs) == 40
         assert len(set([bug.get_identifier() for bug in bugs])) == 40
 
+    def test_get_bug_lazy(self):
+        quixbugs = get_benchmark("quixbugs", lazy=True)
+        assert quixbugs is not None
+
+        bug = quixbugs.get_bug("GCD")
+        assert bug is not None
+        assert bug.get_ground_truth().strip() != ""
+        assert quixbugs.get_bug("NOT_A_BUG") is None
+        assert len(quixbugs.get_bugs()) == 1
+
     def checkout_bug(self, bug: Bug) -> bool:
         buggy_path = f"{tempfile.gettempdir()}/elleelleaime-{getpass.getuser()}/{bug.get_identifier()}-buggy-{uuid.uuid4()}"
         fixed_path = f"{tempfile.gettempdir()}/elleelleaime-{getpass.getuser()}/{bug.get_identifier()}-fixed-{uuid.uuid4()}"
@@ -0,0 +1,77 @@
+from elleelleaime.core.caching.cache import Cache
+from concurrent.futures import ThreadPoolExecutor
+
+import hashlib
+import json
+
+
+class TestCache:
+    def test_save_load(self, tmp_path):
+        cache = Cache(str(tmp_path))
+        assert cache.load_from_cache("defects4j", "Chart-1", "patch") is None
+
+        evaluation = {"generation": "patch", "exact_match": True}
+        cache.save_to_cache("defects4j", "Chart-1", "patch", evaluation)
+
+        assert cache.load_from_cache("defects4j", "Chart-1", "patch") == evaluation
+        assert cache.load_from_cache("defects4j", "Chart-2", "patch") is None
+        assert (
+            Cache(str(tmp_path)).load_from_cache("defects4j", "Chart-1", "patch")
+            == evaluation
+        )
+
+    def test_save_existing(self, tmp_path):
+        cache = Cache(str(tmp_path))
+        cache.save_to_cache("defects4j", "Chart-1", "patch", {"exact_match": True})
+        cache.save_to_cache("defects4j", "Chart-1", "patch", {"exact_match": False})
+
+        # The first evaluation is kept
+        assert cache.load_from_cache("defects4j", "Chart-1", "patch") == {
+            "exact_match": True
+        }
+
+    def test_concurrent_writers(self, tmp_path):
+        cache = Cache(str(tmp_path))
+
+        def save(i: int):
+            cache.save_to_cache("defects4j", f"Chart-{i % 4}", f"patch {i}", {"i": i})
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(save, range(200)))
+
+        for i in range(200):
+            assert cache.load_from_cache(
+                "defects4j", f"Chart-{i % 4}", f"patch {i}"
+            ) == {"i": i}
+
+    def test_migrate(self, tmp_path):
+        # Legacy layout: cache/<benchmark>/<bid>/<sha256(generation)>
+        evaluation = {"generation": "patch", "exact_match": True}
+        bug_path = tmp_path / "defects4j" / "Chart-1"
+        bug_path.mkdir(parents=True)
+        evaluation_path = bug_path / hashlib.sha256("patch".encode()).hexdigest()
+        with open(evaluation_path, "w") as f:
+            json.dump(evaluation, f, indent=4)
+
+        cache = Cache(str(tmp_path))
+        assert cache.migrate(remove=True) == 1
+        assert not evaluation_path.exists()
+        assert cache.load_from_cache("defects4j", "Chart-1", "patch") == evaluation
+
+    def test_memo(self, tmp_path):
+        cache = Cache(str(tmp_path))
+        statistics = Cache.get_memo_statistics()
+
+        # Misses are memoized too
+        assert cache.load_from_cache("defects4j", "Chart-1", "memo") is None
+        assert cache.load_from_cache("defects4j", "Chart-1", "memo") is None
+        cache.save_to_cache("defects4j", "Chart-1", "memo", {"exact_match": True})
+        evaluation = cache.load_from_cache("defects4j", "Chart-1", "memo")
+        evaluation["exact_match"] = False
+        assert cache.load_from_cache("defects4j", "Chart-1", "memo") == {
+            "exact_match": True
+        }
+
+        new_statistics = Cache.get_memo_statistics()
+        assert new_statistics["misses"] - statistics["misses"] == 2
+        assert new_statistics["hits"] - statistics["hits"] == 2
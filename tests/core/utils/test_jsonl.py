@@ -0,0 +1,39 @@
+from elleelleaime.core.utils.jsonl import JsonlWriter, recover_jsonl, stream_jsonl
+
+import time
+import pytest
+
+
+class TestJsonl:
+    @pytest.mark.parametrize("extension", [".jsonl", ".jsonl.gz"])
+    def test_writer_append(self, tmp_path, extension):
+        filename = str(tmp_path / f"evaluation{extension}")
+        with JsonlWriter(filename, sync_every=2) as writer:
+            for i in range(5):
+                writer.write({"identifier": i})
+        with JsonlWriter(filename, append=True) as writer:
+            writer.write({"identifier": 5})
+
+        assert [x["identifier"] for x in stream_jsonl(filename)] == list(range(6))
+
+    def test_writer_sync_interval(self, tmp_path):
+        filename = str(tmp_path / "evaluation.jsonl")
+        with JsonlWriter(filename, sync_interval=0.1) as writer:
+            writer.write({"identifier": 0})
+            # Flushed in the background, without any further write
+            for _ in range(50):
+                if list(stream_jsonl(filename)):
+                    break
+                time.sleep(0.1)
+            assert [x["identifier"] for x in stream_jsonl(filename)] == [0]
+
+    def test_recover_truncated(self, tmp_path):
+        filename = str(tmp_path / "evaluation.jsonl")
+        with JsonlWriter(filename) as writer:
+            for i in range(3):
+                writer.write({"identifier": i})
+        with open(filename, "ab") as f:
+            f.write(b'{"identifier": 3, "evalu')
+
+        assert [x["identifier"] for x in recover_jsonl(filename)] == [0, 1, 2]
+        assert [x["identifier"] for x in stream_jsonl(filename)] == [0, 1, 2]
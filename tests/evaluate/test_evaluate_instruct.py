@@ -2,6 +2,7 @@ from evaluate_patches import evaluate_candidate
 from generate_samples import generate_sample
 from elleelleaime.core.utils.benchmarks import get_benchmark
 from elleelleaime.core.benchmarks.benchmark import Benchmark
+from elleelleaime.evaluate.strategies.text.replace import ReplaceEvaluationStrategy
 
 
 class TestEvaluatePatchesInstructDefects4J:
@@ -212,3 +213,35 @@ class TestEvaluatePatchesInstructDefects4J:
         assert sample["evaluation"][0]["test"] == True
         assert sample["evaluation"][0]["exact_match"] == False
         assert sample["evaluation"][0]["ast_match"] == False
+
+    def test_duplicate_patches(self):
+        bug, sample = TestEvaluatePatchesInstructDefects4J.get_incorrect_sample()
+        duplicate_code = "\n".join(
+            f"    {line} " for line in sample["buggy_code"].splitlines()
+        )
+        sample["generation"] = [
+            f"```java\n{sample['buggy_code']}\n```",
+            f"```java\n// duplicate\n{duplicate_code}\n\n```",
+        ]
+
+        deduplicated = ReplaceEvaluationStrategy.get_dedup_statistics()["deduplicated"]
+        sample = evaluate_candidate(
+            bug=bug,
+            sample=sample,
+            strategy=TestEvaluatePatchesInstructDefects4J.EVALUATE_STRATEGY,
+            use_cache=False,
+        )
+
+        assert sample["evaluation"] is not None
+        assert len(sample["evaluation"]) == 2
+        assert (
+            ReplaceEvaluationStrategy.get_dedup_statistics()["deduplicated"]
+            == deduplicated + 1
+        )
+
+        assert sample["evaluation"][1]["generation"].startswith("// duplicate")
+        for evaluation in sample["evaluation"]:
+            assert evaluation["compile"] == True
+            assert evaluation["test"] == False
+            assert evaluation["exact_match"] == False
+            assert evaluation["ast_match"] == False
@@ -311,6 +311,25 @@ class TestEvaluatePatchesOpenAIDefects4J:
         assert sample["evaluation"][0]["exact_match"] == True
         assert sample["evaluation"][0]["ast_match"] == True
 
+    def test_failed_and_exact_match_patch_list(self):
+        bug, sample = self.get_exact_match_sample_list()
+        sample["generation"] = [
+            {"error": "RateLimitError: too many requests"},
+            *sample["generation"],
+        ]
+
+        sample = evaluate_candidate(
+            bug=bug,
+            sample=sample,
+            **self.EVALUATION_KWARGS,
+        )
+
+        assert sample["evaluation"] is not None
+        assert len(sample["evaluation"]) == 2
+
+        assert sample["evaluation"][0] is None
+        assert sample["evaluation"][1]["exact_match"] == True
+
     def test_ast_match_patch(self):
         bug, sample = self.get_ast_match_sample()
 
@@ -2,6 +2,7 @@ from evaluate_patches import evaluate_candidate
 from generate_samples import generate_sample
 from elleelleaime.core.utils.benchmarks import get_benchmark
 from elleelleaime.core.benchmarks.benchmark import Benchmark
+from elleelleaime.evaluate.strategies.text.replace import ReplaceEvaluationStrategy
 
 import pytest
 import os
@@ -591,3 +592,26 @@ class TestEvaluatePatchesReplaceGitBugJava:
         assert sample["evaluation"][0]["test"] == True
         assert sample["evaluation"][0]["ast_match"] == True
         assert sample["evaluation"][0]["exact_match"] == False
+
+
+class TestNormalizeGeneration:
+    STRATEGY = ReplaceEvaluationStrategy(use_cache=False)
+
+    def test_python_floor_division(self):
+        # `//` is floor division in Python, not a comment
+        assert self.STRATEGY.normalize_generation(
+            "    return a // b\n", ".py"
+        ) != self.STRATEGY.normalize_generation("    return a // (b + 1)\n", ".py")
+
+    def test_python_comments(self):
+        assert self.STRATEGY.normalize_generation(
+            "    # fix\n    return a // b  # floor\n", ".py"
+        ) == self.STRATEGY.normalize_generation("    return a // b\n", ".py")
+
+    def test_java_comments(self):
+        assert self.STRATEGY.normalize_generation(
+            "return a; // fix\n", ".java"
+        ) == self.STRATEGY.normalize_generation("return a;\n", ".java")
+
+    def test_unknown_language(self):
+        assert self.STRATEGY.normalize_generation("return a;\n", ".c") is None
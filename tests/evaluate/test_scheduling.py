@@ -0,0 +1,63 @@
+from elleelleaime.evaluate.scheduling import (
+    AffinityQueue,
+    DurationHistory,
+    split_sample,
+)
+
+
+class TestScheduling:
+    def test_split_sample_list(self):
+        sample = {"identifier": "Chart-1", "generation": ["a", "b", "c"]}
+        units = split_sample(sample)
+
+        assert [unit["generation"] for unit in units] == [["a"], ["b"], ["c"]]
+        assert all(unit["identifier"] == "Chart-1" for unit in units)
+
+    def test_split_sample_choices(self):
+        sample = {
+            "identifier": "Chart-1",
+            "generation": {"id": "x", "choices": [{"index": 0}, {"index": 1}]},
+        }
+        units = split_sample(sample)
+
+        assert len(units) == 2
+        assert units[1]["generation"] == {"id": "x", "choices": [{"index": 1}]}
+
+    def test_split_sample_single(self):
+        sample = {"identifier": "Chart-1", "generation": None}
+        assert split_sample(sample) == [sample]
+
+    def test_duration_history(self, tmp_path):
+        path = str(tmp_path / "durations.json")
+        history = DurationHistory(path)
+        assert history.estimate("Chart-1") == float("inf")
+
+        history.record("Chart-1", 10.0)
+        history.record("Chart-1", 20.0)
+        history.save()
+
+        assert DurationHistory(path).estimate("Chart-1") == 15.0
+
+    def test_affinity_queue(self):
+        units = [("Chart-1", 0), ("Lang-1", 0), ("Chart-1", 1), ("Lang-1", 1)]
+        estimates = {"Chart-1": 1.0, "Lang-1": 10.0}
+        work_queue = AffinityQueue(
+            units, key=lambda unit: unit[0], estimate=estimates.get
+        )
+
+        # Longest bug first, then each worker keeps taking the units of its bug
+        assert work_queue.get("a") == ("Lang-1", 0)
+        assert work_queue.get("b") == ("Chart-1", 0)
+        assert work_queue.get("a") == ("Lang-1", 1)
+        # Idle workers take units of the bugs of other workers
+        assert work_queue.get("a") == ("Chart-1", 1)
+        assert work_queue.get("b") is None
+
+    def test_affinity_queue_clear(self):
+        work_queue = AffinityQueue(
+            [("Chart-1", 0), ("Chart-1", 1)],
+            key=lambda unit: unit[0],
+            estimate=lambda key: 1.0,
+        )
+        work_queue.clear()
+        assert work_queue.get("a") is None
@@ -0,0 +1,276 @@
+from elleelleaime.generate.strategies.models.openai.openai import (
+    OpenAIChatCompletionModels,
+)
+from elleelleaime.generate.strategies.models.anthropic.anthropic import (
+    AnthropicModels,
+)
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import json
+import threading
+import pytest
+
+
+class MockBatchServer(BaseHTTPRequestHandler):
+    """
+    Minimal mock of the OpenAI and Anthropic batch APIs. Batches complete on the second poll,
+    each request is answered with its prompt, and requests for the prompt "fail" fail.
+    """
+
+    files: dict = {}
+    batches: dict = {}
+
+    def log_message(self, *args):
+        pass
+
+    def __send(self, body, content_type="application/json"):
+        data = body if isinstance(body, bytes) else json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def __read(self) -> bytes:
+        return self.rfile.read(int(self.headers["Content-Length"]))
+
+    def __new_id(self, prefix: str) -> str:
+        return f"{prefix}_{len(self.files) + len(self.batches)}"
+
+    def do_POST(self):
+        if self.path == "/v1/files":
+            # Keep the JSONL lines of the multipart upload
+            lines = [
+                line
+                for line in self.__read().decode().splitlines()
+                if line.startswith('{"custom_id"')
+            ]
+            file_id = self.__new_id("file")
+            self.files[file_id] = [json.loads(line) for line in lines]
+            self.__send(
+                {
+                    "id": file_id,
+                    "object": "file",
+                    "bytes": 0,
+                    "created_at": 0,
+                    "filename": "batch.jsonl",
+                    "purpose": "batch",
+                    "status": "processed",
+                }
+            )
+        elif self.path == "/v1/batches":
+            body = json.loads(self.__read())
+            batch_id = self.__new_id("batch")
+            self.batches[batch_id] = {"requests": self.files[body["input_file_id"]]}
+            self.__send(self.__openai_batch(batch_id))
+        elif self.path.startswith("/v1/messages/batches"):
+            body = json.loads(self.__read())
+            batch_id = self.__new_id("msgbatch")
+            self.batches[batch_id] = {"requests": body["requests"]}
+            self.__send(self.__anthropic_batch(batch_id))
+        else:
+            self.send_error(404)
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path.startswith("/v1/batches/"):
+            self.__send(self.__openai_batch(path.split("/")[-1]))
+        elif path.startswith("/v1/files/") and path.endswith("/content"):
+            file_id = path.split("/")[-2]
+            self.__send("\n".join(self.files[file_id]).encode(), "application/jsonl")
+        elif path.startswith("/v1/messages/batches/") and path.endswith("/results"):
+            self.__send(
+                self.__anthropic_results(path.split("/")[-2]), "application/jsonl"
+            )
+        elif path.startswith("/v1/messages/batches/"):
+            self.__send(self.__anthropic_batch(path.split("/")[-1]))
+        else:
+            self.send_error(404)
+
+    def __poll(self, batch_id: str) -> bool:
+        batch = self.batches[batch_id]
+        batch["polls"] = batch.get("polls", -1) + 1
+        return batch["polls"] >= 2
+
+    def __openai_batch(self, batch_id: str) -> dict:
+        batch = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": "/v1/chat/completions",
+            "completion_window": "24h",
+            "created_at": 0,
+            "input_file_id": "file",
+            "status": "in_progress",
+        }
+        if not self.__poll(batch_id):
+            return batch
+
+        output, errors = [], []
+        for request in self.batches[batch_id]["requests"]:
+            prompt = request["body"]["messages"][0]["content"]
+            if prompt == "fail":
+                errors.append(
+                    json.dumps(
+                        {
+                            "custom_id": request["custom_id"],
+                            "response": {"status_code": 400, "body": {}},
+                            "error": {"message": "failed"},
+                        }
+                    )
+                )
+                continue
+            choices = [
+                {
+                    "index": i,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": prompt},
+                }
+                for i in range(request["body"].get("n", 1))
+            ]
+            output.append(
+                json.dumps(
+                    {
+                        "custom_id": request["custom_id"],
+                        "response": {
+                            "status_code": 200,
+                            "body": {"object": "chat.completion", "choices": choices},
+                        },
+                    }
+                )
+            )
+        self.files[f"{batch_id}_output"] = output
+        self.files[f"{batch_id}_errors"] = errors
+        batch.update(
+            status="completed",
+            output_file_id=f"{batch_id}_output",
+            error_file_id=f"{batch_id}_errors",
+        )
+        return batch
+
+    def __anthropic_batch(self, batch_id: str) -> dict:
+        ended = self.__poll(batch_id)
+        return {
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {
+                "processing": 0,
+                "succeeded": 0,
+                "errored": 0,
+                "canceled": 0,
+                "expired": 0,
+            },
+            "created_at": "2024-01-01T00:00:00Z",
+            "expires_at": "2024-01-02T00:00:00Z",
+            "results_url": (
+                f"http://{self.headers['Host']}/v1/messages/batches/{batch_id}/results"
+                if ended
+                else None
+            ),
+        }
+
+    def __anthropic_results(self, batch_id: str) -> bytes:
+        results = []
+        for request in self.batches[batch_id]["requests"]:
+            prompt = request["params"]["messages"][0]["content"]
+            if prompt == "fail":
+                result = {
+                    "type": "errored",
+                    "error": {
+                        "type": "error",
+                        "error": {"type": "api_error", "message": "failed"},
+                    },
+                }
+            else:
+                result = {
+                    "type": "succeeded",
+                    "message": {
+                        "id": request["custom_id"],
+                        "type": "message",
+                        "role": "assistant",
+                        "model": request["params"]["model"],
+                        "content": [{"type": "text", "text": prompt}],
+                        "stop_reason": "end_turn",
+                        "stop_sequence": None,
+                        "usage": {"input_tokens": 1, "output_tokens": 1},
+                    },
+                }
+            results.append(
+                json.dumps({"custom_id": request["custom_id"], "result": result})
+            )
+        return "\n".join(results).encode()
+
+
+@pytest.fixture
+def mock_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockBatchServer)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+class TestBatchMode:
+    def test_openai(self, mock_server, tmp_path, monkeypatch):
+        monkeypatch.setenv("OPENAI_API_KEY", "test")
+        strategy = OpenAIChatCompletionModels(
+            model_name="gpt-4o-mini",
+            n_samples=2,
+            batching=False,
+            batch_mode=True,
+            batch_dir=str(tmp_path),
+            generation_cache_path=str(tmp_path),
+            batch_poll_interval=0,
+            seed=1,
+            base_url=f"{mock_server}/v1",
+        )
+        generations = strategy.generate(["first", "fail", "second"])
+
+        assert len(generations) == 3
+        assert [
+            [sample["choices"][0]["message"]["content"] for sample in generation]
+            for generation in (generations[0], generations[2])
+        ] == [["first", "first"], ["second", "second"]]
+        assert all("error" in sample for sample in generations[1])
+        (batch_path,) = tmp_path.glob("batch_*.jsonl")
+        with open(batch_path) as f:
+            # Sample j of each prompt is requested with seed + j
+            requests = [json.loads(line) for line in f]
+        assert [request["body"]["seed"] for request in requests] == [1, 2] * 3
+
+    def test_openai_batching(self, mock_server, tmp_path, monkeypatch):
+        monkeypatch.setenv("OPENAI_API_KEY", "test")
+        strategy = OpenAIChatCompletionModels(
+            model_name="gpt-4o-mini",
+            n_samples=3,
+            batch_mode=True,
+            batch_dir=str(tmp_path),
+            generation_cache_path=str(tmp_path),
+            batch_poll_interval=0,
+            base_url=f"{mock_server}/v1",
+        )
+        generations = strategy.generate(["first"])
+
+        assert len(generations) == 1
+        assert len(generations[0]["choices"]) == 3
+
+    def test_anthropic(self, mock_server, tmp_path, monkeypatch):
+        monkeypatch.setenv("ANTHROPIC_API_KEY", "test")
+        strategy = AnthropicModels(
+            model_name="claude-3-5-sonnet-20241022",
+            max_tokens=16,
+            n_samples=2,
+            batch_mode=True,
+            batch_dir=str(tmp_path),
+            generation_cache_path=str(tmp_path),
+            batch_poll_interval=0,
+            base_url=mock_server,
+        )
+        generations = strategy.generate(["first", "fail"])
+
+        assert [sample["content"][0]["text"] for sample in generations[0]] == [
+            "first",
+            "first",
+        ]
+        assert all("error" in sample for sample in generations[1])
+        assert len(list(tmp_path.glob("batch_*.jsonl"))) == 1
@@ -0,0 +1,52 @@
+from elleelleaime.generate.strategies.models.huggingface.batching import (
+    length_bucketed_batches,
+    tokenize_batch,
+)
+
+import pytest
+
+
+class TestLengthBucketedBatches:
+    def test_batch_size(self):
+        batches = length_bucketed_batches([5, 1, 4, 2, 3], batch_size=2)
+        assert batches == [[1, 3], [4, 2], [0]]
+
+    def test_single_prompt_batches(self):
+        assert length_bucketed_batches([3, 1, 2], batch_size=1) == [[1], [2], [0]]
+
+    def test_max_batch_tokens(self):
+        # Padded batches: 2 * 10 tokens, then 20 and 30 on their own
+        batches = length_bucketed_batches(
+            [10, 30, 10, 20], batch_size=8, max_batch_tokens=25
+        )
+        assert batches == [[0, 2], [3], [1]]
+
+    def test_prompt_over_budget(self):
+        batches = length_bucketed_batches([100, 1], batch_size=8, max_batch_tokens=10)
+        assert batches == [[1], [0]]
+
+    def test_empty(self):
+        assert length_bucketed_batches([], batch_size=4) == []
+
+
+class TestTokenizeBatch:
+    def test_codellama_infilling(self):
+        transformers = pytest.importorskip("transformers")
+        tokenizer = transformers.AutoTokenizer.from_pretrained(
+            "codellama/CodeLlama-7b-hf"
+        )
+        tokenizer.padding_side = "left"
+        tokenizer.pad_token = tokenizer.eos_token
+        prompts = [
+            "def f(x):\n    <FILL_ME>\n    return x\n",
+            "class A:\n    def g(self):\n        <FILL_ME>\n",
+        ]
+
+        inputs = tokenize_batch(tokenizer, prompts)
+
+        # Each batched prompt is the left padded infilling encoding of the prompt
+        for i, prompt in enumerate(prompts):
+            input_ids = tokenizer(prompt)["input_ids"]
+            assert tokenizer.prefix_id in input_ids
+            assert inputs["input_ids"][i, -len(input_ids) :].tolist() == input_ids
+            assert inputs["attention_mask"][i].sum().item() == len(input_ids)
@@ -0,0 +1,74 @@
+from elleelleaime.generate.rate_limiter import RateLimiter, estimate_tokens
+
+import asyncio
+import pytest
+
+
+class TestRateLimiter:
+    def test_unbounded(self):
+        limiter = RateLimiter()
+        for _ in range(1000):
+            assert limiter.try_acquire(tokens=10000) == 0
+
+    def test_requests_per_minute(self):
+        limiter = RateLimiter(requests_per_minute=60 / RateLimiter.HEADROOM)
+        for _ in range(60):
+            assert limiter.try_acquire() == 0
+        # The budget refills at one request per second
+        assert 0 < limiter.try_acquire() <= 1
+
+    def test_tokens_per_minute(self):
+        limiter = RateLimiter(tokens_per_minute=6000 / RateLimiter.HEADROOM)
+        assert limiter.try_acquire(tokens=5000) == 0
+        assert limiter.try_acquire(tokens=2000) > 0
+        assert limiter.try_acquire(tokens=1000) == 0
+
+    def test_oversized_request(self):
+        limiter = RateLimiter(tokens_per_minute=1000)
+        # A request larger than the limit only waits for a full budget
+        assert limiter.try_acquire(tokens=5000) == 0
+        assert limiter.try_acquire(tokens=1) > 0
+
+    def test_update_openai_headers(self):
+        limiter = RateLimiter()
+        limiter.update(
+            {
+                "X-RateLimit-Limit-Requests": "600",
+                "X-RateLimit-Remaining-Requests": "0",
+                "X-RateLimit-Limit-Tokens": "100000",
+                "X-RateLimit-Remaining-Tokens": "100000",
+            }
+        )
+        assert limiter.requests is not None and limiter.tokens is not None
+        assert limiter.requests.limit == pytest.approx(600 * RateLimiter.HEADROOM)
+        assert limiter.tokens.limit == pytest.approx(100000 * RateLimiter.HEADROOM)
+        assert limiter.try_acquire(tokens=10) > 0
+
+    def test_update_anthropic_headers(self):
+        limiter = RateLimiter(tokens_per_minute=100000)
+        # The headroom (5000 tokens) is kept out of the remaining budget
+        limiter.update({"anthropic-ratelimit-tokens-remaining": "10000"})
+        assert limiter.try_acquire(tokens=4000) == 0
+        assert limiter.try_acquire(tokens=2000) > 0
+
+    def test_retry_after(self):
+        limiter = RateLimiter()
+        limiter.update({"retry-after": "1m30s"})
+        assert 60 < limiter.try_acquire() <= 90
+
+    def test_aacquire(self):
+        limiter = RateLimiter(requests_per_minute=6000 / RateLimiter.HEADROOM)
+
+        async def acquire_all():
+            await asyncio.gather(*[limiter.aacquire() for _ in range(6010)])
+
+        asyncio.run(acquire_all())
+
+    def test_get_shared(self):
+        limiter = RateLimiter.get_shared("test", "model-a", requests_per_minute=10)
+        assert RateLimiter.get_shared("test", "model-a") is limiter
+        assert RateLimiter.get_shared("test", "model-b") is not limiter
+
+    def test_estimate_tokens(self):
+        assert estimate_tokens("") == 1
+        assert estimate_tokens("a" * 400) == 101
@@ -0,0 +1,90 @@
+from elleelleaime.generate.server import ModelServer, parse_address
+from elleelleaime.generate.strategies.models.server.server import ModelServerClient
+from elleelleaime.generate.strategies.strategy import PatchGenerationStrategy
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import AuthenticationError
+from typing import Any, List
+
+import os
+import stat
+import threading
+import time
+import pytest
+
+AUTHKEY = "test-authkey"
+
+
+class EchoStrategy(PatchGenerationStrategy):
+    def __init__(self) -> None:
+        self.batches: List[List[str]] = []
+
+    def _generate_impl(self, chunk: List[str]) -> Any:
+        if "fail" in chunk:
+            raise ValueError("generation failed")
+        self.batches.append(chunk)
+        # Leave time for other requests to queue up
+        time.sleep(0.05)
+        return [[prompt.upper()] for prompt in chunk]
+
+
+@pytest.fixture
+def server(tmp_path):
+    address = str(tmp_path / "server.sock")
+    server = ModelServer(
+        EchoStrategy(), authkey=AUTHKEY, address=address, max_batch_prompts=8
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    assert server.wait_ready(10)
+    yield server, address
+    server.close()
+    thread.join(10)
+
+
+class TestModelServer:
+    def test_parse_address(self):
+        assert parse_address("localhost:6000") == ("localhost", 6000)
+        assert parse_address("/tmp/server.sock") == "/tmp/server.sock"
+
+    def test_generate(self, server):
+        _, address = server
+        client = ModelServerClient(address=address, authkey=AUTHKEY)
+        assert client.generate(["a", "b"]) == [["A"], ["B"]]
+        assert client.generate(["c"]) == [["C"]]
+
+    def test_batches_across_clients(self, server):
+        model_server, address = server
+
+        def generate(i: int):
+            client = ModelServerClient(address=address, authkey=AUTHKEY)
+            return client.generate([f"prompt {i}"])
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(generate, range(16)))
+
+        assert results == [[[f"PROMPT {i}"]] for i in range(16)]
+        strategy = model_server.strategy
+        assert sum(len(batch) for batch in strategy.batches) == 16
+        assert len(strategy.batches) < 16
+        assert max(len(batch) for batch in strategy.batches) <= 8
+
+    def test_socket_permissions(self, server):
+        _, address = server
+        assert stat.S_IMODE(os.stat(address).st_mode) == 0o600
+
+    def test_authkey(self, server, monkeypatch):
+        _, address = server
+        monkeypatch.delenv("MODEL_SERVER_AUTHKEY", raising=False)
+        with pytest.raises(ValueError):
+            ModelServerClient(address=address)
+        client = ModelServerClient(address=address, authkey="wrong-authkey")
+        with pytest.raises(AuthenticationError):
+            client.generate(["a"])
+
+    def test_error(self, server):
+        _, address = server
+        client = ModelServerClient(address=address, authkey=AUTHKEY)
+        with pytest.raises(RuntimeError):
+            client.generate(["fail"])
+        # The connection is still usable
+        assert client.generate(["a"]) == [["A"]]
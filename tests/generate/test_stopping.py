@@ -0,0 +1,42 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from elleelleaime.generate.strategies.models.huggingface.stopping import (
+    FencedCodeBlockStoppingCriteria,
+)
+
+
+class CharTokenizer:
+    """
+    Tokenizer with one token per character, the token id being the character code.
+    """
+
+    def encode(self, text: str) -> list:
+        return [ord(c) for c in text]
+
+    def decode(self, ids, skip_special_tokens: bool = False) -> str:
+        return "".join(chr(int(i)) for i in ids)
+
+
+class TestFencedCodeBlockStoppingCriteria:
+    def __call(self, prompt: str, generations: list) -> list:
+        tok = CharTokenizer()
+        criteria = FencedCodeBlockStoppingCriteria(tok, len(prompt))
+        input_ids = torch.tensor([tok.encode(prompt + g) for g in generations])
+        return criteria(input_ids, None).tolist()
+
+    def test_closed_code_block(self):
+        assert self.__call(
+            "Fix ```x```:",
+            [
+                "Sure:\n```java\nreturn 1;\n```",
+                "Sure:\n```java\nreturn 1;\n`` ",
+                "Sure, the bug is ...       ",
+            ],
+        ) == [True, False, False]
+
+    def test_ignores_prompt_code_blocks(self):
+        prompt = "```java\nreturn 0;\n```\n"
+        assert self.__call(prompt, ["```java\nreturn"]) == [False]
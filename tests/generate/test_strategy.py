@@ -0,0 +1,131 @@
+from elleelleaime.generate.strategies.strategy import AsyncPatchGenerationStrategy
+
+from typing import Any
+
+import asyncio
+import pytest
+
+
+class FakeModels(AsyncPatchGenerationStrategy):
+    def __init__(self, model_name: str, **kwargs) -> None:
+        super().__init__(model_name, **kwargs)
+        self.temperature = kwargs.get("temperature", 1.0)
+        self.in_flight = 0
+        self.max_observed_in_flight = 0
+        self.calls = 0
+
+    def _create_client(self) -> Any:
+        return None
+
+    async def _agenerate_prompt(self, prompt: str) -> Any:
+        async def generate_sample(index: int) -> dict:
+            self.calls += 1
+            index = self.calls
+            self.in_flight += 1
+            self.max_observed_in_flight = max(
+                self.max_observed_in_flight, self.in_flight
+            )
+            # Later samples complete first, the order must still be kept
+            await asyncio.sleep(0.01 * (self.n_samples - index))
+            self.in_flight -= 1
+            if prompt == "fail" and index % 2 == 0:
+                raise ValueError("sample failed")
+            return {"prompt": prompt, "index": index}
+
+        return await self._agenerate_samples(generate_sample)
+
+
+class FakeFailingModels(FakeModels):
+    async def _agenerate_prompt(self, prompt: str) -> Any:
+        if prompt == "fail":
+            raise ValueError("prompt failed")
+        return await super()._agenerate_prompt(prompt)
+
+
+class FakeSeededModels(FakeModels):
+    SUPPORTS_SEED = True
+
+    async def _agenerate_prompt(self, prompt: str) -> Any:
+        async def generate_sample(index: int) -> dict:
+            self.calls += 1
+            return {"prompt": prompt, "seed": self._sample_seed(index)}
+
+        return await self._agenerate_samples(generate_sample)
+
+
+class TestAsyncPatchGenerationStrategy:
+    def test_samples_in_order(self):
+        strategy = FakeModels("test-order", n_samples=5)
+        generation = strategy.generate(["prompt"])[0]
+        assert [sample["index"] for sample in generation] == [1, 2, 3, 4, 5]
+        assert strategy.max_observed_in_flight == 5
+
+    def test_max_concurrent_samples(self):
+        strategy = FakeModels("test-bounded", n_samples=6, max_concurrent_samples=2)
+        generation = strategy.generate(["prompt"])[0]
+        assert len(generation) == 6
+        assert strategy.max_observed_in_flight == 2
+
+    def test_partial_failures(self):
+        strategy = FakeModels("test-failures", n_samples=4)
+        generation = strategy.generate(["fail"])[0]
+        assert [sample.get("index") for sample in generation] == [1, None, 3, None]
+        assert generation[1] == {"error": "ValueError: sample failed"}
+
+    def test_failed_prompt(self):
+        strategy = FakeFailingModels(
+            "test-failed-prompt", n_samples=2, use_generation_cache=False
+        )
+        generations = strategy.generate(["a", "fail", "b"])
+        assert generations[1] == {"error": "ValueError: prompt failed"}
+        assert [sample["prompt"] for sample in generations[0]] == ["a", "a"]
+        assert [sample["prompt"] for sample in generations[2]] == ["b", "b"]
+
+    def test_batch_mode_not_supported(self):
+        with pytest.raises(ValueError):
+            FakeModels("test-batch", batch_mode=True)
+
+    def test_generation_cache(self, tmp_path):
+        def generate(prompts, **kwargs):
+            strategy = FakeModels(
+                "test-cache", n_samples=2, generation_cache_path=str(tmp_path), **kwargs
+            )
+            return strategy.generate(prompts), strategy.calls
+
+        # Deterministic generations are cached across instances, failed ones are not
+        generations, calls = generate(["a", "fail"], temperature=0.0)
+        assert calls == 4
+        cached_generations, calls = generate(["a", "fail"], temperature=0.0)
+        assert cached_generations[0] == generations[0]
+        assert calls == 2
+
+        # Different parameters, or non-deterministic generations, are not served from the cache
+        assert generate(["a"], temperature=0.5)[1] == 2
+        assert generate(["a"], temperature=1.0)[1] == 2
+        assert generate(["a"], temperature=1.0)[1] == 2
+
+    def test_sample_seeds(self):
+        strategy = FakeSeededModels(
+            "test-sample-seeds", n_samples=3, seed=10, use_generation_cache=False
+        )
+        generation = strategy.generate(["prompt"])[0]
+        assert [sample["seed"] for sample in generation] == [10, 11, 12]
+
+    def test_generation_cache_seed(self, tmp_path):
+        def generate(strategy_class, **kwargs):
+            strategy = strategy_class(
+                "test-cache-seed",
+                n_samples=2,
+                temperature=1.0,
+                generation_cache_path=str(tmp_path),
+                **kwargs,
+            )
+            strategy.generate(["a"])
+            return strategy.calls
+
+        # Seeded generations are only cached if the seed is sent to the provider
+        assert generate(FakeModels, seed=1) == 2
+        assert generate(FakeModels, seed=1) == 2
+        assert generate(FakeSeededModels, seed=1) == 2
+        assert generate(FakeSeededModels, seed=1) == 0
+        assert generate(FakeSeededModels, seed=2) == 2
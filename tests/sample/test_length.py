@@ -0,0 +1,62 @@
+from elleelleaime.sample.length import PromptLengthChecker
+
+
+class CharTokenizer:
+    """
+    Tokenizer with one token per character, and a BOS token.
+    """
+
+    def __call__(self, text: str, add_special_tokens: bool = True) -> dict:
+        input_ids = [ord(c) for c in text]
+        return {"input_ids": ([0] if add_special_tokens else []) + input_ids}
+
+    def decode(self, input_ids) -> str:
+        return "".join(chr(i) for i in input_ids)
+
+
+class TestPromptLengthChecker:
+    def test_count(self):
+        checker = PromptLengthChecker(CharTokenizer())
+        sample = checker.check({"identifier": "Chart-1", "prompt": "abcd"})
+        assert sample["prompt"] == "abcd"
+        assert sample["prompt_tokens"] == 5
+
+    def test_no_prompt(self):
+        checker = PromptLengthChecker(CharTokenizer(), max_prompt_tokens=1)
+        sample = checker.check({"identifier": "Chart-1", "prompt": None})
+        assert sample == {"identifier": "Chart-1", "prompt": None}
+
+    def test_keep(self):
+        checker = PromptLengthChecker(CharTokenizer(), max_prompt_tokens=3)
+        sample = checker.check({"identifier": "Chart-1", "prompt": "abcd"})
+        assert sample["prompt"] == "abcd"
+
+    def test_drop(self):
+        checker = PromptLengthChecker(
+            CharTokenizer(), max_prompt_tokens=3, over_length="drop"
+        )
+        sample = checker.check({"identifier": "Chart-1", "prompt": "abcd"})
+        assert sample["prompt"] is None
+        assert sample["prompt_tokens"] == 5
+        assert checker.check({"prompt": "ab"})["prompt"] == "ab"
+
+    def test_truncate(self):
+        checker = PromptLengthChecker(
+            CharTokenizer(), max_prompt_tokens=5, over_length="truncate"
+        )
+        sample = checker.check({"identifier": "Chart-1", "prompt": "abcdefgh"})
+        assert sample["prompt"] == "abgh"
+        assert sample["prompt_tokens"] == 5
+
+    def test_truncate_infilling(self):
+        checker = PromptLengthChecker(
+            CharTokenizer(), max_prompt_tokens=16, over_length="truncate"
+        )
+        # Infilling prompts are dropped, since the candidates are rebuilt from them
+        sample = checker.check({"prompt": "abcdefgh<FILL_ME>ijklmnop"})
+        assert sample["prompt"] is None
+        sample = checker.check(
+            {"prompt": "<｜fim▁begin｜>abcdefgh<｜fim▁hole｜>ijklmnop<｜fim▁end｜>"}
+        )
+        assert sample["prompt"] is None
+        assert checker.check({"prompt": "ab<FILL_ME>cd"})["prompt"] == "ab<FILL_ME>cd"